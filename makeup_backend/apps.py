@@ -3,5 +3,10 @@ from django.apps import AppConfig
 
 class MakeupBackendConfig(AppConfig):
     name = "makeup_backend"
-def ready(self):
-    import makeup_backend.signals
\ No newline at end of file
+
+    def ready(self):
+        import makeup_backend.signals  # noqa: F401
+        from makeup_backend import attendance_buffer
+
+        # Recover marks a previous process acknowledged but never flushed.
+        attendance_buffer.start()
@@ -0,0 +1,175 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import MakeUpClass, Student, Attendance
+from . import code_pool, events, forecasting, rollups, stats
+
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID_CODE = "invalid_code"
+UNKNOWN_STUDENT = "unknown_student"
+
+
+# Marks attendance for many (roll_number, remedial_code) pairs with a fixed
+# number of queries however long the batch is (up to INSERT_BATCH pairs):
+# one lookup each for codes and students, then a single INSERT ... ON
+# CONFLICT DO NOTHING RETURNING. Pairs the INSERT didn't return were already
+# marked, whether before the batch or by a concurrent insert, so statuses and
+# every counter follow what was actually written. Returns one status per
+# input pair, in input order.
+def mark_bulk(pairs):
+    pairs = [(str(roll).strip(), str(code).strip()) for roll, code in pairs]
+    if not pairs:
+        return []
+
+    # Codes failing the check character report invalid_code unqueried.
+    class_ids = dict(
+        MakeUpClass.objects.filter(remedial_code__in={c for _, c in pairs if code_pool.is_valid(c)})
+        .values_list("remedial_code", "id")
+    )
+    student_ids = dict(
+        Student.objects.filter(roll_number__in={r for r, _ in pairs})
+        .values_list("roll_number", "id")
+    )
+
+    keys = []
+    for roll, code in pairs:
+        class_id = class_ids.get(code)
+        student_id = student_ids.get(roll)
+        if class_id is None:
+            keys.append(INVALID_CODE)
+        elif student_id is None:
+            keys.append(UNKNOWN_STUDENT)
+        else:
+            keys.append((student_id, class_id))
+
+    marked_at = timezone.now()
+    inserted = _insert({key: marked_at for key in keys if isinstance(key, tuple)})
+
+    results = []
+    for key in keys:
+        if not isinstance(key, tuple):
+            results.append(key)
+        elif key in inserted:
+            # A pair repeated within the batch is created once.
+            inserted.discard(key)
+            results.append(CREATED)
+        else:
+            results.append(DUPLICATE)
+    return results
+
+
+# Marks one student present with a single INSERT ... ON CONFLICT DO NOTHING
+# on the (student, makeup_class) unique key, so concurrent marks can't race
+# between a check and the insert. Returns False if it was already marked.
+def mark_one(student_id, class_id):
+    meta = Attendance._meta
+    qn = connection.ops.quote_name
+    student_col = meta.get_field("student").column
+    class_col = meta.get_field("makeup_class").column
+    marked_col = meta.get_field("marked_at").column
+
+    sql = (
+        f"INSERT INTO {qn(meta.db_table)} "
+        f"({qn(student_col)}, {qn(class_col)}, {qn(marked_col)}) "
+        f"VALUES (%s, %s, %s) "
+        f"ON CONFLICT ({qn(student_col)}, {qn(class_col)}) DO NOTHING"
+    )
+    marked_at = timezone.now()
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                student_id, class_id,
+                connection.ops.adapt_datetimefield_value(marked_at)
+            ])
+            created = cursor.rowcount == 1
+
+        # Raw SQL skips post_save, so keep the counters, class count,
+        # rollups, forecast and live events in step here.
+        if created:
+            stats.bump("attendance", 1)
+            MakeUpClass.objects.add_attendance({class_id: 1})
+            rollups.add_marks({class_id: 1}, marked_at)
+            forecasting.add_marks({class_id: 1})
+            events.attendance_changed({class_id: 1}, marked_at)
+
+    return created
+
+
+# Inserts queued marks [(student_id, class_id, marked_at)] (the write-behind
+# buffer's flush). Marks whose class or student has been deleted since are
+# dropped. Returns the number of rows inserted.
+def insert_marks(marks):
+    marks = {(student_id, class_id): marked_at for student_id, class_id, marked_at in marks}
+    if not marks:
+        return 0
+
+    class_ids = set(
+        MakeUpClass.objects.filter(id__in={c for _, c in marks}).values_list("id", flat=True)
+    )
+    student_ids = set(
+        Student.objects.filter(id__in={s for s, _ in marks}).values_list("id", flat=True)
+    )
+    return len(_insert({
+        (s, c): at for (s, c), at in marks.items() if s in student_ids and c in class_ids
+    }))
+
+
+# Rows per INSERT; keeps the statement's parameters (three per row) under
+# SQLite's and PostgreSQL's limits.
+INSERT_BATCH = 5000
+
+
+# Writes {(student_id, class_id): marked_at} with multi-row INSERT ... ON
+# CONFLICT DO NOTHING RETURNING, one statement per INSERT_BATCH rows. Unlike
+# bulk_create, which stamps marked_at with the insert time (auto_now_add),
+# each row keeps the moment it was marked, and RETURNING tells exactly which
+# pairs were new, so counters, class counts, rollups, the forecast and
+# events only see those. Returns the set of inserted pairs.
+def _insert(marks):
+    if not marks:
+        return set()
+
+    meta = Attendance._meta
+    qn = connection.ops.quote_name
+    student_col = meta.get_field("student").column
+    class_col = meta.get_field("makeup_class").column
+    marked_col = meta.get_field("marked_at").column
+    items = list(marks.items())
+    inserted = []
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), INSERT_BATCH):
+                batch = items[start:start + INSERT_BATCH]
+                cursor.execute(
+                    f"INSERT INTO {qn(meta.db_table)} "
+                    f"({qn(student_col)}, {qn(class_col)}, {qn(marked_col)}) "
+                    f"VALUES {', '.join(['(%s, %s, %s)'] * len(batch))} "
+                    f"ON CONFLICT ({qn(student_col)}, {qn(class_col)}) DO NOTHING "
+                    f"RETURNING {qn(student_col)}, {qn(class_col)}",
+                    [
+                        v for (s, c), at in batch
+                        for v in (s, c, connection.ops.adapt_datetimefield_value(at))
+                    ],
+                )
+                inserted.extend(tuple(row) for row in cursor.fetchall())
+
+        if inserted:
+            stats.bump("attendance", len(inserted))
+            class_counts = Counter(c for _, c in inserted)
+            MakeUpClass.objects.add_attendance(class_counts)
+            per_day = {}
+            for s, c in inserted:
+                day = timezone.localtime(marks[s, c]).date()
+                per_day.setdefault(day, (marks[s, c], Counter()))[1][c] += 1
+            for marked_at, counts in per_day.values():
+                rollups.add_marks(counts, marked_at)
+            forecasting.add_marks(class_counts)
+            events.attendance_changed(class_counts)
+
+    return set(inserted)
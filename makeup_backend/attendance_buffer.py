@@ -0,0 +1,245 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import attendance
+
+
+logger = logging.getLogger(__name__)
+
+
+# Optional write-behind mode for mark_attendance (ENABLED in
+# settings.ATTENDANCE_BUFFER). During a check-in burst the view resolves
+# the code and student from their caches, appends the mark to a local
+# SQLite file in WAL mode and answers 202 without touching the main
+# database; a background flusher drains the file FLUSH_INTERVAL seconds at
+# a time into Attendance via attendance.insert_marks().
+#
+# - Durability: a mark is acknowledged only after its buffer INSERT has
+#   committed (fsync'd with SYNCHRONOUS = "FULL").
+# - Idempotency: (student, class) is unique in the buffer, so a re-submit
+#   is answered 409 while the mark is pending and for RETENTION seconds
+#   after its flush; pairs already in Attendance are skipped by the
+#   flush's ON CONFLICT DO NOTHING.
+# - Crash recovery: a flusher claims a batch before inserting it and marks
+#   it flushed after its transaction commits. Rows left unflushed by a
+#   crashed process are picked up again once their claim is CLAIM_TIMEOUT
+#   seconds old (or straight away if never claimed) by the next flusher.
+#   With the buffer enabled every process starts one as it boots (see
+#   start()), so acknowledged marks left behind by a crash reach
+#   Attendance after a restart even if no new check-in arrives. A batch
+#   flushed twice inserts nothing the second time.
+#
+# Every process sharing PATH (one file per host) can enqueue and flush.
+ATTENDANCE_BUFFER = getattr(settings, "ATTENDANCE_BUFFER", {})
+
+ENABLED = ATTENDANCE_BUFFER.get("ENABLED", False)
+PATH = ATTENDANCE_BUFFER.get("PATH", os.path.join(settings.BASE_DIR, "var", "attendance-buffer.sqlite3"))
+FLUSH_INTERVAL = ATTENDANCE_BUFFER.get("FLUSH_INTERVAL", 0.5)
+BATCH_SIZE = ATTENDANCE_BUFFER.get("BATCH_SIZE", 1000)
+CLAIM_TIMEOUT = ATTENDANCE_BUFFER.get("CLAIM_TIMEOUT", 60)
+RETENTION = ATTENDANCE_BUFFER.get("RETENTION", 24 * 60 * 60)
+SYNCHRONOUS = ATTENDANCE_BUFFER.get("SYNCHRONOUS", "FULL")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS marks ("
+    " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " student_id INTEGER NOT NULL,"
+    " class_id INTEGER NOT NULL,"
+    " marked_at REAL NOT NULL,"
+    " claimed_at REAL,"
+    " flushed_at REAL,"
+    " UNIQUE (student_id, class_id))",
+    "CREATE INDEX IF NOT EXISTS marks_pending ON marks (seq) WHERE flushed_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS marks_flushed ON marks (flushed_at) WHERE flushed_at IS NOT NULL",
+)
+
+
+def _moment(timestamp):
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+
+class AttendanceBuffer:
+
+    def __init__(self, path=PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flusher = None
+        self.flushed_total = 0
+        self.inserted_total = 0
+        self.flush_errors_total = 0
+        self.last_flush_seconds = 0.0
+
+    def _db(self):
+        # One connection per thread; statements run in autocommit unless
+        # wrapped in an explicit BEGIN.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+            for statement in SCHEMA:
+                db.execute(statement)
+            self._local.db = db
+        return db
+
+    def enqueue(self, student_id, class_id, marked_at=None):
+        # Returns False if this student's mark for the class is already
+        # buffered.
+        marked_at = time.time() if marked_at is None else marked_at.timestamp()
+        cursor = self._db().execute(
+            "INSERT OR IGNORE INTO marks (student_id, class_id, marked_at) VALUES (?, ?, ?)",
+            (student_id, class_id, marked_at),
+        )
+        return cursor.rowcount == 1
+
+    def _claim(self, limit):
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT seq, student_id, class_id, marked_at FROM marks "
+                "WHERE flushed_at IS NULL AND (claimed_at IS NULL OR claimed_at < ?) "
+                "ORDER BY seq LIMIT ?",
+                (now - CLAIM_TIMEOUT, limit),
+            ).fetchall()
+            db.executemany("UPDATE marks SET claimed_at = ? WHERE seq = ?", [(now, r[0]) for r in rows])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return rows
+
+    def flush(self, limit=BATCH_SIZE):
+        # Moves up to ``limit`` pending marks into Attendance. Returns the
+        # number of buffered marks handled.
+        rows = self._claim(limit)
+        if not rows:
+            return 0
+
+        started = time.perf_counter()
+        seqs = [(r[0],) for r in rows]
+        try:
+            inserted = attendance.insert_marks(
+                (student_id, class_id, _moment(marked_at)) for _, student_id, class_id, marked_at in rows
+            )
+        except Exception:
+            self._db().executemany("UPDATE marks SET claimed_at = NULL WHERE seq = ?", seqs)
+            self.flush_errors_total += 1
+            raise
+
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        flushed_at = time.time()
+        db.executemany("UPDATE marks SET flushed_at = ? WHERE seq = ?", [(flushed_at, *s) for s in seqs])
+        db.execute("COMMIT")
+
+        self.flushed_total += len(rows)
+        self.inserted_total += inserted
+        self.last_flush_seconds = time.perf_counter() - started
+        return len(rows)
+
+    def drain(self):
+        total = 0
+        while True:
+            flushed = self.flush()
+            total += flushed
+            if flushed < BATCH_SIZE:
+                return total
+
+    def prune(self):
+        # Flushed marks only serve as duplicate guards once RETENTION passes.
+        self._db().execute(
+            "DELETE FROM marks WHERE flushed_at IS NOT NULL AND flushed_at < ?",
+            (time.time() - RETENTION,),
+        )
+
+    def stats(self):
+        pending, oldest = self._db().execute(
+            "SELECT COUNT(*), MIN(marked_at) FROM marks WHERE flushed_at IS NULL"
+        ).fetchone()
+        return {
+            "pending": pending,
+            "lag_seconds": time.time() - oldest if oldest is not None else 0.0,
+            "flushed_total": self.flushed_total,
+            "inserted_total": self.inserted_total,
+            "flush_errors_total": self.flush_errors_total,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    def ensure_flusher(self):
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = BufferFlusher(self)
+                self._flusher.start()
+            return self._flusher
+
+    def stop_flusher(self):
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.stop()
+
+
+class BufferFlusher(threading.Thread):
+    # Drains the buffer every FLUSH_INTERVAL seconds; a failed flush (the
+    # database being unreachable, say) is logged and retried next round.
+
+    def __init__(self, buffer):
+        super().__init__(name="makeup-attendance-flusher", daemon=True)
+        self.buffer = buffer
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+    def run(self):
+        # Waits an interval before the first drain, so a flusher started
+        # from AppConfig.ready() doesn't query while apps are still loading.
+        last_prune = 0.0
+        try:
+            while not self._stopping.wait(FLUSH_INTERVAL):
+                close_old_connections()
+                try:
+                    self.buffer.drain()
+                    if time.monotonic() - last_prune > 60:
+                        self.buffer.prune()
+                        last_prune = time.monotonic()
+                except Exception:
+                    logger.exception("Attendance buffer flush failed")
+            # Final drain so a clean shutdown leaves nothing behind.
+            self.buffer.drain()
+        finally:
+            connections.close_all()
+
+
+buffer = AttendanceBuffer()
+
+
+def start():
+    # Called from MakeupBackendConfig.ready().
+    if ENABLED:
+        buffer.ensure_flusher()
+
+
+def mark(student_id, class_id):
+    buffer.ensure_flusher()
+    return buffer.enqueue(student_id, class_id)
+
+
+def metrics():
+    # Gauges for /metrics/; scraping also (re)starts this process's
+    # flusher, which picks up anything a crashed process left behind.
+    buffer.ensure_flusher()
+    return {f"makeup_attendance_buffer_{name}": value for name, value in buffer.stats().items()}
+
@@ -0,0 +1,248 @@
+import json
+import math
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.signals import request_finished, request_started
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import throttling, urls
+from .models import MakeUpClass, Student
+
+
+# Drives every route in makeup_backend/urls.py through the Django test
+# client and records latency percentiles, query counts and response size.
+# Write endpoints run inside a transaction that is rolled back, so a run
+# leaves the database as it found it (and on_commit hooks never fire).
+# Throttling is off for the run, or the rate limits would turn most
+# iterations of a throttled view into 429s; every status seen is reported,
+# so timings of error responses never pass for the real thing.
+
+BENCH_USERNAME = "bench-staff"
+
+
+class Fixtures:
+
+    def __init__(self):
+        self.user, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME,
+            defaults={"email": "bench-staff@example.com", "is_staff": True},
+        )
+        self.makeup = MakeUpClass.objects.order_by("-id").first()
+        self.rolls = list(
+            Student.objects.order_by("id").values_list("roll_number", flat=True)[:100]
+        )
+
+    @property
+    def class_id(self):
+        return self.makeup.id if self.makeup else 0
+
+    @property
+    def code(self):
+        return self.makeup.remedial_code if self.makeup else "RC-000000"
+
+    def class_body(self):
+        day = self.makeup.date if self.makeup else None
+        return {
+            "subject": self.makeup.subject if self.makeup else "Mathematics",
+            "classroom": self.makeup.classroom if self.makeup else "Room 101",
+            "date": day.strftime("%Y-%m-%d") if day else "2030-01-01",
+            "time": "10:00",
+        }
+
+    def free_slots_query(self):
+        day = self.makeup.date if self.makeup else None
+        return {
+            "classroom": self.makeup.classroom if self.makeup else "Room 101",
+            "date_from": day.strftime("%Y-%m-%d") if day else "2030-01-01",
+            "date_to": (day + timedelta(days=6)).strftime("%Y-%m-%d") if day else "2030-01-07",
+        }
+
+    def schedule_body(self):
+        # A term of weekly classes in five rooms.
+        return {
+            "subject": "Mathematics",
+            "classrooms": [f"Bench Room {i}" for i in range(1, 6)],
+            "start_date": "2030-01-07",
+            "time": "10:00",
+            "frequency": "weekly",
+            "count": 12,
+        }
+
+
+# url name -> callable(fixtures) returning (method, args, query/body)
+ENDPOINTS = {
+    "admin_login": lambda f: ("get", (), {}),
+    "admin_logout": lambda f: ("get", (), {}),
+    "dashboard": lambda f: ("get", (), {}),
+    "faculty": lambda f: ("get", (), {}),
+    "student": lambda f: ("get", (), {}),
+    "ai": lambda f: ("get", (), {}),
+    "dashboard_data": lambda f: ("get", (), {}),
+    "code_cache_stats": lambda f: ("get", (), {}),
+    "event_stream": lambda f: ("get", (), {}),
+    "metrics": lambda f: ("get", (), {}),
+    "create_class": lambda f: ("post", (), f.class_body()),
+    "schedule_classes": lambda f: ("post", (), f.schedule_body()),
+    "faculty_classes": lambda f: ("get", (), {}),
+    "class_roster": lambda f: ("get", (f.class_id,), {}),
+    "classroom_free_slots": lambda f: ("get", (), f.free_slots_query()),
+    "mark_attendance": lambda f: ("post", (), {"remedial_code": f.code}),
+    "mark_attendance_bulk": lambda f: ("post", (), {
+        "records": [{"roll_number": r, "remedial_code": f.code} for r in f.rolls]
+    }),
+    "student_history": lambda f: ("get", (), {}),
+    "student_metrics": lambda f: ("get", (), {}),
+    "student_dashboard": lambda f: ("get", (), {}),
+    "export_attendance": lambda f: ("get", (), {"class_id": f.class_id}),
+    "ai_analytics": lambda f: ("get", (), {}),
+    "slot_recommendations": lambda f: ("get", (), {
+        "subject": f.makeup.subject if f.makeup else "Mathematics"
+    }),
+    "forecast_turnout": lambda f: ("get", (), {"days": 30}),
+    "delete_class": lambda f: ("post", (f.class_id,), {}),
+    "edit_class": lambda f: ("post", (f.class_id,), f.class_body()),
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def _request(client, method, path, payload):
+    if method == "post":
+        return client.post(path, json.dumps(payload), content_type="application/json")
+    return client.get(path, payload)
+
+
+def _consume(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def bench_endpoint(client, fixtures, name, spec, iterations):
+    method, args, payload = spec(fixtures)
+    path = reverse(name, args=args)
+    timings = []
+    queries = []
+    size = status = None
+    statuses = Counter()
+
+    for _ in range(iterations):
+        client.force_login(fixtures.user)
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = _request(client, method, path, payload)
+                size = _consume(response)
+                timings.append((time.perf_counter() - started) * 1000)
+            if method == "post":
+                transaction.set_rollback(True)
+
+        queries.append(len(ctx.captured_queries))
+        status = response.status_code
+        statuses[status] += 1
+
+    return {
+        "method": method.upper(),
+        "path": path,
+        "status": status,
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p90_ms": round(percentile(timings, 90), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "queries": round(sum(queries) / len(queries), 2),
+        "bytes": size,
+    }
+
+
+def non_2xx(results):
+    # {url name: {status: count}} for endpoints that answered anything but
+    # 2xx; their timings are of those responses.
+    return {
+        name: {code: n for code, n in r["statuses"].items() if not code.startswith("2")}
+        for name, r in results.items()
+        if any(not code.startswith("2") for code in r["statuses"])
+    }
+
+
+def run(iterations=50, only=None):
+    fixtures = Fixtures()
+    client = Client()
+    results = {}
+    skipped = []
+
+    throttled, throttling.ENABLED = throttling.ENABLED, False
+    try:
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            if only and pattern.name not in only:
+                continue
+            spec = ENDPOINTS.get(pattern.name)
+            if spec is None:
+                skipped.append(pattern.name)
+                continue
+            results[pattern.name] = bench_endpoint(client, fixtures, pattern.name, spec, iterations)
+    finally:
+        throttling.ENABLED = throttled
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "database": connection.vendor,
+        "iterations": iterations,
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def bench_connection_reuse(iterations=200):
+    # Request-cycle cost of a trivial query with a new connection per
+    # request (CONN_MAX_AGE = 0) against a reused one, driven by the same
+    # request_started / request_finished signals that open and close
+    # connections around real requests.
+    original = connection.settings_dict["CONN_MAX_AGE"]
+    results = {}
+
+    try:
+        for label, max_age in (("per_request", 0), ("persistent", 600)):
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = max_age
+            timings = []
+
+            for _ in range(iterations):
+                started = time.perf_counter()
+                request_started.send(sender=__name__)
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                request_finished.send(sender=__name__)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            results[label] = {
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p90_ms": round(percentile(timings, 90), 3),
+                "p99_ms": round(percentile(timings, 99), 3),
+            }
+    finally:
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = original
+
+    return {
+        "database": connection.vendor,
+        "iterations": iterations,
+        "results": results,
+        "p50_gain_ms": round(results["per_request"]["p50_ms"] - results["persistent"]["p50_ms"], 3),
+    }
+
@@ -0,0 +1,154 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import MakeUpClass, DEFAULT_DURATION_MINUTES, MAX_DURATION_MINUTES
+
+
+# Classroom double-booking detection. On PostgreSQL the exclusion
+# constraint added by migration 0010 is the final word; the checks here
+# answer 409 with the clashing classes before an insert is attempted, and
+# are the only guard on other databases.
+#
+# A single slot is checked with MakeUpClassQuerySet.overlapping(), one short
+# index range scan. Batches (scheduling.py) and free-slot searches load the
+# rooms' bookings for the window once into an IntervalIndex and check each
+# slot against it in memory.
+
+MAX_DURATION = timedelta(minutes=MAX_DURATION_MINUTES)
+
+Booking = namedtuple("Booking", "start end id subject")
+
+
+def local_moment(day, at):
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+def class_span(day, start_time, duration_minutes):
+    # Python twin of the starts_at / ends_at generated columns.
+    start = local_moment(day, start_time)
+    return start, start + timedelta(minutes=duration_minutes)
+
+
+def parse_duration(value):
+    if value is None:
+        return DEFAULT_DURATION_MINUTES
+    if isinstance(value, bool) or not isinstance(value, int) \
+            or not 1 <= value <= MAX_DURATION_MINUTES:
+        raise ValueError(f"duration must be 1 to {MAX_DURATION_MINUTES} minutes")
+    return value
+
+
+class IntervalIndex:
+    # Per-classroom bookings sorted by start. Any booking overlapping
+    # [start, end) starts within MAX_DURATION before ``start``, so a lookup is
+    # two bisects plus a scan of that short window, however many classes a
+    # room holds.
+
+    def __init__(self):
+        self._starts = defaultdict(list)
+        self._bookings = defaultdict(list)
+
+    @classmethod
+    def load(cls, classrooms, start, end):
+        # One query for every class in ``classrooms`` that could overlap
+        # [start, end).
+        index = cls()
+        rows = MakeUpClass.objects.filter(classroom__in=classrooms)\
+            .overlapping(start, end)\
+            .values_list("classroom", "starts_at", "ends_at", "id", "subject")
+        for classroom, *booking in rows:
+            index.add(classroom, Booking(*booking))
+        return index
+
+    def add(self, classroom, booking):
+        i = bisect_right(self._starts[classroom], booking.start)
+        self._starts[classroom].insert(i, booking.start)
+        self._bookings[classroom].insert(i, booking)
+
+    def _window(self, classroom, start, end):
+        starts = self._starts.get(classroom, ())
+        lo = bisect_right(starts, start - MAX_DURATION)
+        hi = bisect_left(starts, end)
+        return self._bookings[classroom][lo:hi] if hi > lo else []
+
+    def conflicts(self, classroom, start, end):
+        return [b for b in self._window(classroom, start, end) if b.end > start]
+
+    def free_slots(self, classroom, start, end, min_length):
+        # Gaps of at least ``min_length`` inside [start, end).
+        busy = sorted(
+            (max(b.start, start), min(b.end, end))
+            for b in self.conflicts(classroom, start, end)
+        )
+        slots = []
+        cursor = start
+        for busy_start, busy_end in busy:
+            if busy_start - cursor >= min_length:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if end - cursor >= min_length:
+            slots.append((cursor, end))
+        return slots
+
+
+def find_conflicts(classroom, start, end, exclude_id=None):
+    clashes = MakeUpClass.objects.filter(classroom=classroom).overlapping(start, end)
+    if exclude_id is not None:
+        clashes = clashes.exclude(id=exclude_id)
+    return [
+        Booking(*row)
+        for row in clashes.order_by("starts_at")
+        .values_list("starts_at", "ends_at", "id", "subject")
+    ]
+
+
+def free_slots(classroom, date_from, date_to, duration_minutes, day_start, day_end):
+    # Free [start, end) windows of at least ``duration_minutes`` in
+    # ``classroom``, between day_start and day_end (local time) on each day
+    # from date_from to date_to inclusive.
+    index = IntervalIndex.load(
+        [classroom], local_moment(date_from, day_start), local_moment(date_to, day_end)
+    )
+
+    min_length = timedelta(minutes=duration_minutes)
+    slots = []
+    day = date_from
+    while day <= date_to:
+        slots.extend(index.free_slots(
+            classroom, local_moment(day, day_start), local_moment(day, day_end), min_length
+        ))
+        day += timedelta(days=1)
+    return slots
+
+
+def find_double_bookings():
+    # Yields (earlier, later) class id pairs that overlap in the same room,
+    # streaming every class once in (classroom, starts_at) order.
+    rows = MakeUpClass.objects.order_by("classroom", "starts_at", "id")\
+        .values_list("classroom", "starts_at", "ends_at", "id").iterator(chunk_size=2000)
+
+    room = None
+    latest_end = latest_id = None
+    for classroom, start, end, pk in rows:
+        if classroom != room:
+            room, latest_end, latest_id = classroom, end, pk
+            continue
+        if start < latest_end:
+            yield latest_id, pk
+        if end > latest_end:
+            latest_end, latest_id = end, pk
+
+
+def describe(bookings):
+    return [
+        {
+            "id": b.id,
+            "subject": b.subject,
+            "start": timezone.localtime(b.start).strftime("%Y-%m-%d %H:%M"),
+            "end": timezone.localtime(b.end).strftime("%Y-%m-%d %H:%M"),
+        }
+        for b in bookings
+    ]
@@ -0,0 +1,158 @@
+import re
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils import timezone
+
+from .models import MakeUpClass, RemedialCode
+
+
+# Remedial codes are drawn from a pool of pre-generated, unique codes in the
+# RemedialCode table. allocate() claims free rows with one
+# UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING, so
+# concurrent class creations never wait on each other or get the same code.
+# `manage.py refill_code_pool` keeps the pool topped up; if it runs dry,
+# allocate() refills it inline instead of failing.
+#
+# A code is PREFIX + LENGTH random characters from ALPHABET + one Luhn
+# mod N check character, which catches every single-character typo and
+# most adjacent swaps before any cache or DB lookup.
+CODE_POOL = getattr(settings, "REMEDIAL_CODE_POOL", {})
+
+PREFIX = CODE_POOL.get("PREFIX", "RC-")
+ALPHABET = CODE_POOL.get("ALPHABET", "23456789ABCDEFGHJKLMNPQRSTUVWXYZ")
+LENGTH = CODE_POOL.get("LENGTH", 7)
+POOL_SIZE = CODE_POOL.get("POOL_SIZE", 5000)
+REFILL_BATCH = CODE_POOL.get("REFILL_BATCH", 500)
+# Codes issued before the pool existed (RC- + 6 hex digits) stay valid.
+LEGACY_PATTERN = CODE_POOL.get("LEGACY_PATTERN", r"RC-[0-9A-F]{6}")
+
+CODE_MAX_LENGTH = MakeUpClass._meta.get_field("remedial_code").max_length
+CODE_LENGTH = len(PREFIX) + LENGTH + 1
+
+if len(set(ALPHABET)) != len(ALPHABET) or len(ALPHABET) < 2:
+    raise ImproperlyConfigured("REMEDIAL_CODE_POOL ALPHABET needs at least two distinct characters")
+if CODE_LENGTH > CODE_MAX_LENGTH:
+    raise ImproperlyConfigured(
+        f"REMEDIAL_CODE_POOL codes would be {CODE_LENGTH} characters; "
+        f"remedial_code holds {CODE_MAX_LENGTH}"
+    )
+
+_index = {ch: i for i, ch in enumerate(ALPHABET)}
+_legacy = re.compile(LEGACY_PATTERN) if LEGACY_PATTERN else None
+
+
+class CodePoolExhausted(Exception):
+    pass
+
+
+def check_character(body):
+    base = len(ALPHABET)
+    factor = 2
+    total = 0
+
+    for ch in reversed(body):
+        addend = factor * _index[ch]
+        total += addend // base + addend % base
+        factor = 3 - factor
+
+    return ALPHABET[-total % base]
+
+
+def generate():
+    body = "".join(secrets.choice(ALPHABET) for _ in range(LENGTH))
+    return PREFIX + body + check_character(body)
+
+
+def is_valid(code):
+    if not isinstance(code, str):
+        return False
+
+    if len(code) == CODE_LENGTH and code.startswith(PREFIX):
+        body, check = code[len(PREFIX):-1], code[-1]
+        if all(ch in _index for ch in body) and check in _index:
+            return check_character(body) == check
+
+    return bool(_legacy and _legacy.fullmatch(code))
+
+
+def _claim(count):
+    meta = RemedialCode._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    pk = qn(meta.pk.column)
+    code_col = qn(meta.get_field("code").column)
+    allocated_col = qn(meta.get_field("allocated_at").column)
+
+    # SQLite has no row locks (writers are serialised anyway), so the
+    # locking clause is only added where the backend supports it.
+    skip_locked = ""
+    if connection.features.has_select_for_update_skip_locked:
+        skip_locked = " FOR UPDATE SKIP LOCKED"
+
+    sql = (
+        f"UPDATE {table} SET {allocated_col} = %s "
+        f"WHERE {pk} IN ("
+        f"SELECT {pk} FROM {table} WHERE {allocated_col} IS NULL "
+        f"ORDER BY {pk} LIMIT %s{skip_locked}"
+        f") RETURNING {code_col}"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            connection.ops.adapt_datetimefield_value(timezone.now()), count
+        ])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def allocate(count=1):
+    if count <= 0:
+        return []
+
+    codes = _claim(count)
+    if len(codes) < count:
+        refill(max(count - len(codes), REFILL_BATCH))
+        codes += _claim(count - len(codes))
+
+    if len(codes) < count:
+        raise CodePoolExhausted(f"needed {count} remedial codes, got {len(codes)}")
+    return codes
+
+
+def refill(count):
+    # Adds up to ``count`` fresh codes. Codes already in the pool are skipped
+    # by ignore_conflicts; codes typed in by hand on a class are left out.
+    added = 0
+
+    while count > 0:
+        batch = set()
+        while len(batch) < min(count, REFILL_BATCH):
+            batch.add(generate())
+
+        taken = set(
+            MakeUpClass.objects.filter(remedial_code__in=batch)
+            .values_list("remedial_code", flat=True)
+        )
+        fresh = batch - taken
+        RemedialCode.objects.bulk_create(
+            [RemedialCode(code=code) for code in fresh], ignore_conflicts=True
+        )
+
+        added += len(fresh)
+        count -= len(batch)
+
+    return added
+
+
+def free_count():
+    return RemedialCode.objects.filter(allocated_at__isnull=True).count()
+
+
+def top_up(target=None):
+    # Refills the pool to ``target`` free codes (POOL_SIZE by default) and
+    # returns how many were added.
+    target = POOL_SIZE if target is None else target
+    missing = target - free_count()
+    return refill(missing) if missing > 0 else 0
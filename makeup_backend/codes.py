@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import MakeUpClass
+from . import code_pool
+
+
+# remedial_code -> MakeUpClass id, resolved through two tiers:
+#
+#   1. a bounded in-process LRU (no network hop at all), then
+#   2. the shared Django cache, so every worker benefits from one DB read.
+#
+# Codes never change once generated, so entries only go stale when a class
+# is edited or deleted; signals.py forgets them on commit. Unknown codes are
+# cached briefly too, so brute-force probing doesn't reach the DB each time.
+CODE_CACHE = getattr(settings, "REMEDIAL_CODE_CACHE", {})
+
+CACHE_ALIAS = CODE_CACHE.get("ALIAS", "default")
+CACHE_TIMEOUT = CODE_CACHE.get("TIMEOUT", 60 * 60)
+NEGATIVE_TIMEOUT = CODE_CACHE.get("NEGATIVE_TIMEOUT", 30)
+LOCAL_SIZE = CODE_CACHE.get("LOCAL_SIZE", 4096)
+LOCAL_TIMEOUT = CODE_CACHE.get("LOCAL_TIMEOUT", 5 * 60)
+
+# Stored for codes known not to exist; real ids start at 1.
+NOT_FOUND = 0
+
+
+class LRUCache:
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LRUCache(LOCAL_SIZE)
+
+_stats_lock = threading.Lock()
+_stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "negative_hits": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _shared():
+    return caches[CACHE_ALIAS]
+
+
+def _cache_key(code):
+    return f"remedial_code:{code}"
+
+
+def _timeout(class_id):
+    return CACHE_TIMEOUT if class_id != NOT_FOUND else NEGATIVE_TIMEOUT
+
+
+def _store(code, class_id):
+    _local.set(code, class_id, min(_timeout(class_id), LOCAL_TIMEOUT))
+    _shared().set(_cache_key(code), class_id, _timeout(class_id))
+
+
+def resolve_class_id(code):
+    # Typos fail the check character here, before either cache tier.
+    if not code_pool.is_valid(code):
+        return None
+
+    source = "local_hits"
+    class_id = _local.get(code)
+
+    if class_id is None:
+        source = "shared_hits"
+        class_id = _shared().get(_cache_key(code))
+        if class_id is not None:
+            _local.set(code, class_id, min(_timeout(class_id), LOCAL_TIMEOUT))
+
+    if class_id is None:
+        source = "misses"
+        class_id = MakeUpClass.objects.filter(remedial_code=code)\
+            .values_list("id", flat=True).first() or NOT_FOUND
+        _store(code, class_id)
+    elif class_id == NOT_FOUND:
+        source = "negative_hits"
+
+    _count(source)
+    return class_id or None
+
+
+def remember(code, class_id):
+    transaction.on_commit(lambda: _store(code, class_id))
+
+
+def forget(code):
+    if not code_pool.is_valid(code):
+        return
+
+    def drop():
+        _local.delete(code)
+        _shared().delete(_cache_key(code))
+
+    # Drop now so this request stops using it, and again on commit so a
+    # concurrent read can't re-cache the old row before the change lands.
+    drop()
+    transaction.on_commit(drop)
+
+
+def cache_stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+
+    hits = snapshot["local_hits"] + snapshot["shared_hits"] + snapshot["negative_hits"]
+    lookups = hits + snapshot["misses"]
+    snapshot["lookups"] = lookups
+    snapshot["hit_ratio"] = round(hits / lookups, 4) if lookups else 0
+    snapshot["local_size"] = len(_local)
+    return snapshot
+
+
+def reset():
+    _local.clear()
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,72 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import stats
+
+
+# Conditional GET for the JSON read APIs. The ETag is derived from the
+# version of every counted table the response reads (see StatCounter),
+# plus the URL and user, so one indexed read of the counter rows decides
+# whether to answer 304 before the view runs any aggregate query. The
+# counter rows are left on request.counters, and the extra key below on
+# request.version_extra, for the view to reuse.
+#
+# ``extra(request)`` adds state that changes without a write (e.g. a class
+# turning Expired as time passes); such responses get no Last-Modified.
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def _validators(request, user_id, counters, tables, extra):
+    versions = ",".join(f"{t}:{counters[t].version}" for t in tables)
+    key = f"{request.get_full_path()}|{user_id}|{versions}|{extra}"
+    etag = '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+    last_modified = None
+    if extra is None:
+        last_modified = int(max(counters[t].updated_at for t in tables).timestamp())
+
+    return etag, last_modified
+
+
+def _add_headers(request, response, etag, last_modified):
+    if request.method in ("GET", "HEAD") and response.status_code in (200, 304):
+        response.headers.setdefault("ETag", etag)
+        if last_modified:
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+        response.headers.setdefault("Cache-Control", CACHE_CONTROL)
+    return response
+
+
+def versioned(*tables, extra=None):
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                request.counters = await stats.aget_counters()
+                key = request.version_extra = await sync_to_async(extra)(request) if extra else None
+                etag, last_modified = _validators(request, user.pk, request.counters, tables, key)
+
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return _add_headers(request, response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            request.counters = stats.get_counters()
+            key = request.version_extra = extra(request) if extra else None
+            etag, last_modified = _validators(request, request.user.pk, request.counters, tables, key)
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return _add_headers(request, response, etag, last_modified)
+        return wrapper
+    return decorator
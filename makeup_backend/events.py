@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
+
+from . import stats
+from .models import MakeUpClass, StatCounter
+
+
+logger = logging.getLogger(__name__)
+
+
+# Live attendance / class events for the SSE stream (views.event_stream).
+#
+# Writers call emit() and the event is published once their transaction
+# commits. With PostgreSQL it goes out as a NOTIFY on one channel and every
+# process fans it out from a single LISTEN connection, so any number of
+# open dashboards cost the database one idle connection per process. On
+# other databases (or with BACKEND = "local") events are delivered only to
+# subscribers in the publishing process.
+#
+# Every event carries the dashboard counters as they stand after the write
+# (read inside the NOTIFY statement itself on PostgreSQL), and attendance
+# events the subjects of the classes involved, so clients never re-run the
+# dashboard aggregates. A stream opens with a snapshot of the counters and
+# re-sends one whenever events may have been missed.
+LIVE_EVENTS = getattr(settings, "LIVE_EVENTS", {})
+
+BACKEND = LIVE_EVENTS.get("BACKEND", "auto")
+CHANNEL = LIVE_EVENTS.get("CHANNEL", "makeup_events")
+KEEPALIVE = LIVE_EVENTS.get("KEEPALIVE", 15)
+QUEUE_SIZE = LIVE_EVENTS.get("QUEUE_SIZE", 100)
+
+# NOTIFY payloads must stay under 8000 bytes. The limit applies to the
+# final text, counters and subjects included, so _notify checks it in SQL.
+MAX_PAYLOAD = 7900
+
+# Delivered in place of events a subscriber (or the listener) missed.
+RESYNC = {"type": "resync"}
+
+# How often the listener wakes up to check whether it should stop.
+LISTEN_POLL = 1
+
+
+def _use_postgres():
+    if BACKEND == "auto":
+        return connections[DEFAULT_DB_ALIAS].vendor == "postgresql"
+    return BACKEND == "postgres"
+
+
+class Broker:
+    # Fans events out to the asyncio queues of this process's open streams.
+    # deliver() may be called from any thread.
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._listener = None
+
+    def subscribe(self):
+        if _use_postgres():
+            self._ensure_listener()
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # Loop already closed; the stream is gone.
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _put(queue, event):
+        if queue.full():
+            # A slow client: drop what it hasn't read and have the stream
+            # send a fresh snapshot instead.
+            while not queue.empty():
+                queue.get_nowait()
+            event = RESYNC
+        queue.put_nowait(event)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = PostgresListener(self)
+                self._listener.start()
+            return self._listener
+
+    def stop_listener(self):
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+
+class PostgresListener(threading.Thread):
+    # One LISTEN connection per process, outside Django's per-thread
+    # connection handling. Reconnects with backoff; after a reconnect the
+    # streams resync, since NOTIFYs sent meanwhile are lost.
+
+    def __init__(self, broker):
+        super().__init__(name="makeup-events-listener", daemon=True)
+        self.broker = broker
+        self.ready = threading.Event()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+    def run(self):
+        delay = 1
+        while not self._stopping.is_set():
+            db = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                db.ensure_connection()
+                raw = db.connection
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {db.ops.quote_name(CHANNEL)}")
+                self.ready.set()
+                delay = 1
+                self._receive(raw)
+            except Exception:
+                logger.exception("Event listener lost its connection")
+            finally:
+                self.ready.clear()
+                db.close()
+
+            if not self._stopping.is_set():
+                self.broker.deliver(RESYNC)
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 30)
+
+    def _receive(self, raw):
+        while not self._stopping.is_set():
+            if select.select([raw], [], [], LISTEN_POLL) == ([], [], []):
+                continue
+            raw.poll()
+            while raw.notifies:
+                notify = raw.notifies.pop(0)
+                self.broker.deliver(json.loads(notify.payload))
+
+
+broker = Broker()
+
+
+def _notify(event, class_ids):
+    # The counters and subjects are added inside the statement, so whether
+    # the payload fits is only known there: an event that grew past
+    # MAX_PAYLOAD (e.g. a bulk mark over hundreds of classes) goes out as
+    # RESYNC rather than failing pg_notify after the commit.
+    resync = json.dumps(RESYNC)
+    payload = json.dumps(event, cls=DjangoJSONEncoder)
+    if len(payload.encode()) > MAX_PAYLOAD:
+        payload, class_ids = resync, []
+
+    qn = connection.ops.quote_name
+    names = list(stats.COUNTED_MODELS)
+    sql = (
+        f"SELECT pg_notify(%s, CASE WHEN octet_length(e.body) <= %s THEN e.body ELSE %s END) "
+        f"FROM (SELECT (%s::jsonb || jsonb_build_object("
+        f"'counts', (SELECT jsonb_object_agg({qn('name')}, {qn('value')}) "
+        f"FROM {qn(StatCounter._meta.db_table)} "
+        f"WHERE {qn('name')} IN ({', '.join(['%s'] * len(names))})), "
+        f"'subjects', COALESCE((SELECT jsonb_object_agg({qn('id')}, {qn('subject')}) "
+        f"FROM {qn(MakeUpClass._meta.db_table)} WHERE {qn('id')} = ANY(%s::bigint[])), '{{}}'::jsonb)"
+        f"))::text AS body) AS e"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [CHANNEL, MAX_PAYLOAD, resync, payload, *names, list(class_ids)])
+
+
+def publish(event, class_ids=()):
+    if _use_postgres():
+        _notify(event, class_ids)
+        return
+    if not broker.subscriber_count():
+        # Nobody in this process is listening, so skip the reads below.
+        return
+
+    subjects = MakeUpClass.objects.filter(id__in=class_ids).values_list("id", "subject")
+    broker.deliver({
+        **event,
+        "counts": stats.get_counts(),
+        "subjects": {str(pk): subject for pk, subject in subjects} if class_ids else {},
+    })
+
+
+def emit(event_type, data=None, class_ids=()):
+    # Publishes once the surrounding transaction commits (immediately in
+    # autocommit). class_ids: classes whose subjects the event should carry.
+    event = {"type": event_type, "data": data or {}}
+    transaction.on_commit(partial(publish, event, list(class_ids)), robust=True)
+
+
+def attendance_changed(class_counts, marked_at=None):
+    # class_counts: {class_id: rows added}, negative for rows removed.
+    class_counts = {pk: n for pk, n in class_counts.items() if n}
+    if not class_counts:
+        return
+    event_type = "attendance.marked" if min(class_counts.values()) > 0 else "attendance.removed"
+    emit(event_type, {
+        "classes": {str(pk): n for pk, n in class_counts.items()},
+        "marked_at": marked_at or timezone.now(),
+    }, class_counts)
+
+
+def format_sse(event):
+    return f"data: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
@@ -0,0 +1,111 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Attendance
+
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = (
+    ("roll_number", "student__roll_number"),
+    ("student_name", "student__name"),
+    ("subject", "makeup_class__subject"),
+    ("classroom", "makeup_class__classroom"),
+    ("class_date", "makeup_class__date"),
+    ("class_time", "makeup_class__time"),
+    ("remedial_code", "makeup_class__remedial_code"),
+    ("marked_at", "marked_at"),
+)
+
+
+class Echo:
+    # File-like object whose write() hands the line back, so csv.writer can
+    # format one row at a time without buffering the whole export.
+    def write(self, value):
+        return value
+
+
+def _day_start(value):
+    day = datetime.strptime(value, "%Y-%m-%d").date()
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _export_queryset(date_from=None, date_to=None, class_id=None):
+    records = Attendance.objects.all()
+
+    if date_from:
+        records = records.filter(marked_at__gte=_day_start(date_from))
+    if date_to:
+        records = records.filter(marked_at__lt=_day_start(date_to) + timedelta(days=1))
+    if class_id:
+        records = records.filter(makeup_class_id=int(class_id))
+
+    return records.order_by("id")
+
+
+def export_rows(date_from=None, date_to=None, class_id=None):
+    # Streams attendance joined with student and class as tuples in
+    # EXPORT_COLUMNS order. iterator() uses a server-side cursor on
+    # Postgres, so memory stays flat however many rows match.
+    return _export_queryset(date_from, date_to, class_id).values_list(
+        *(source for _, source in EXPORT_COLUMNS)
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def aexport_rows(date_from=None, date_to=None, class_id=None):
+    # export_rows() as an async iterator, for responses served over ASGI,
+    # where Django would read a sync iterator to the end before sending it.
+    # Filters are validated here, before the first row is awaited. Built on
+    # values() because aiterator() runs a values_list() query in the event
+    # loop rather than in its worker thread.
+    records = _export_queryset(date_from, date_to, class_id)
+    sources = [source for _, source in EXPORT_COLUMNS]
+
+    async def rows():
+        async for row in records.values(*sources).aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield tuple(row[source] for source in sources)
+
+    return rows()
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+# Each format is a factory returning (header line or None, row -> line).
+
+def _csv_format():
+    writer = csv.writer(Echo())
+    header = writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    return header, lambda row: writer.writerow([_isoformat(v) for v in row])
+
+
+def _ndjson_format():
+    names = [name for name, _ in EXPORT_COLUMNS]
+    return None, lambda row: json.dumps(dict(zip(names, map(_isoformat, row)))) + "\n"
+
+
+RENDERERS = {
+    "csv": (_csv_format, "text/csv"),
+    "ndjson": (_ndjson_format, "application/x-ndjson"),
+}
+
+
+def render(export_format, rows):
+    header, line = RENDERERS[export_format][0]()
+    if header is not None:
+        yield header
+    for row in rows:
+        yield line(row)
+
+
+async def arender(export_format, rows):
+    header, line = RENDERERS[export_format][0]()
+    if header is not None:
+        yield header
+    async for row in rows:
+        yield line(row)
@@ -0,0 +1,194 @@
+import threading
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, Greatest
+from django.utils import timezone
+
+from .models import MakeUpClass, Attendance, TurnoutStat
+from . import stats
+
+
+# Expected turnout of upcoming classes for the AI Insights page.
+#
+# The model is a small shrinkage regression over subject, ISO weekday and
+# start hour. Its whole state is TurnoutStat: held classes and attendance
+# rows per (subject, weekday, hour), a few rows per subject. A prediction
+# starts from the subject's mean turnout (shrunk toward the global mean),
+# scales it by the subject's weekday and hour effects (each shrunk toward
+# 1), then blends in the exact cell's own mean.
+#
+# Attendance updates the statistics as it is marked (add_marks, called next
+# to rollups.add_marks) with one INSERT ... SELECT ... ON CONFLICT. A class
+# counts as held once its first attendance row arrives. Everything the
+# incremental path cannot see is settled by the nightly
+# `manage.py refit_forecast`: classes that passed with nobody present,
+# class edits, student deletions and concurrent first marks. Processes
+# serve predictions from an in-memory copy that is reloaded when the
+# attendance or classes version moves.
+
+# Weight, in classes, of the prior each level is shrunk toward.
+PRIOR_WEIGHT = 3.0
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def add_marks(class_counts):
+    # Attendance added (or, with negative counts, removed) per class:
+    # {class_id: rows}. Runs after the rows are written and their classes'
+    # attendance_count moved (every caller runs add_attendance first), so a
+    # class whose count moved from zero (to zero) gains (loses) one held
+    # class, without counting its rows again.
+    class_counts = {cid: n for cid, n in class_counts.items() if n}
+    if not class_counts:
+        return
+
+    delta = Case(
+        *[When(id=cid, then=Value(n)) for cid, n in class_counts.items()],
+        default=Value(0), output_field=IntegerField(),
+    )
+    held = (
+        Case(When(Q(attendance_count__gt=0), then=Value(1)), default=Value(0))
+        - Case(When(Q(attendance_count__gt=F("delta")), then=Value(1)), default=Value(0))
+    )
+    rows = MakeUpClass.objects.filter(id__in=class_counts).order_by().annotate(
+        weekday=ExtractIsoWeekDay("date"), hour=ExtractHour("time"), delta=delta,
+    ).annotate(held=held).values("subject", "weekday", "hour").annotate(
+        classes=Sum("held"), attended=Sum("delta")
+    ).values_list("subject", "weekday", "hour", "classes", "attended")
+    select, params = rows.query.sql_with_params()
+
+    table = _qn(TurnoutStat._meta.db_table)
+    keys = ("subject", "weekday", "hour")
+    sql = (
+        f"INSERT INTO {table} ({', '.join(map(_qn, (*keys, 'classes', 'attended')))}) "
+        f"{select} "
+        f"ON CONFLICT ({', '.join(map(_qn, keys))}) DO UPDATE SET "
+        + ", ".join(
+            f"{_qn(c)} = {table}.{_qn(c)} + EXCLUDED.{_qn(c)}" for c in ("classes", "attended")
+        )
+    )
+    with transaction.atomic(savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def remove_class(makeup, attended=None):
+    # Called before a class (and its attendance) is deleted; ``attended`` is
+    # its attendance count if the caller already has it. Mirrors add_marks:
+    # only a class with attendance was counted as held, so only that one is
+    # taken back. A class that passed empty was counted by refit, if at
+    # all, and is left to the next refit; the clamp keeps that from going
+    # below zero in the meantime.
+    if attended is None:
+        attended = Attendance.objects.filter(makeup_class=makeup).count()
+    if not attended:
+        return
+    TurnoutStat.objects.filter(
+        subject=makeup.subject,
+        weekday=makeup.date.isoweekday(),
+        hour=makeup.time.hour,
+    ).update(
+        classes=Greatest(F("classes") - 1, 0),
+        attended=Greatest(F("attended") - attended, 0),
+    )
+
+
+def refit(now=None):
+    # Recomputes every row from MakeUpClass x Attendance in one grouped
+    # query: a class is held once it has started or has any attendance.
+    # Touches the attendance version so every process reloads its model.
+    now = now or timezone.now()
+    rows = MakeUpClass.objects.order_by().annotate(
+        weekday=ExtractIsoWeekDay("date"), hour=ExtractHour("time")
+    ).values("subject", "weekday", "hour").annotate(
+        classes=Count(
+            "id", distinct=True,
+            filter=Q(starts_at__lte=now) | Q(attendance__isnull=False),
+        ),
+        attended=Count("attendance"),
+    ).values_list("subject", "weekday", "hour", "classes", "attended")
+
+    with transaction.atomic():
+        TurnoutStat.objects.all().delete()
+        fitted = TurnoutStat.objects.bulk_create([
+            TurnoutStat(subject=s, weekday=w, hour=h, classes=c, attended=a)
+            for s, w, h, c, a in rows
+            if c or a
+        ], batch_size=500)
+        stats.touch("attendance")
+    return len(fitted)
+
+
+def _shrunk(attended, classes, prior):
+    # Statistics between refits can drift; never let them flip the sign of
+    # the denominator.
+    weight = max(classes, 0) + PRIOR_WEIGHT
+    return (attended + PRIOR_WEIGHT * prior) / weight if weight > 0 else prior
+
+
+class TurnoutModel:
+
+    def __init__(self, rows):
+        # rows: (subject, weekday, hour, classes, attended).
+        self.cells = {}
+        self.subjects = Counter()
+        self.days = Counter()
+        self.hours = Counter()
+        total = Counter()
+
+        for subject, weekday, hour, classes, attended in rows:
+            self.cells[(subject, weekday, hour)] = (classes, attended)
+            for bucket, key in (
+                (self.subjects, subject), (self.days, (subject, weekday)),
+                (self.hours, (subject, hour)), (total, None),
+            ):
+                bucket[key, "classes"] += classes
+                bucket[key, "attended"] += attended
+
+        self.mean = total[None, "attended"] / total[None, "classes"] if total[None, "classes"] > 0 else 0.0
+
+    @staticmethod
+    def _level(bucket, key, prior):
+        return _shrunk(bucket[key, "attended"], bucket[key, "classes"], prior)
+
+    def predict(self, subject, weekday, hour):
+        # Returns (expected turnout, held classes it is based on).
+        subject_mean = self._level(self.subjects, subject, self.mean)
+        if not subject_mean:
+            return 0.0, 0
+
+        day = self._level(self.days, (subject, weekday), subject_mean) / subject_mean
+        at_hour = self._level(self.hours, (subject, hour), subject_mean) / subject_mean
+        classes, attended = self.cells.get((subject, weekday, hour), (0, 0))
+        return _shrunk(attended, classes, subject_mean * day * at_hour), \
+            self.subjects[subject, "classes"]
+
+
+_model = None
+_model_key = None
+_model_lock = threading.Lock()
+
+
+def get_model(key):
+    # ``key`` is the (attendance, classes) version pair the model was read
+    # at; a new key reloads TurnoutStat once.
+    global _model, _model_key
+
+    with _model_lock:
+        if _model is None or _model_key != key:
+            _model = TurnoutModel(
+                TurnoutStat.objects.values_list("subject", "weekday", "hour", "classes", "attended")
+            )
+            _model_key = key
+        return _model
+
+
+def reset():
+    global _model, _model_key
+
+    with _model_lock:
+        _model = _model_key = None
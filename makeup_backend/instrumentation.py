@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+# Per-request query count, SQL time, view time and response size, reported
+# in a Server-Timing header and aggregated per URL name for /metrics/.
+# Views declare how many queries they may run with @query_budget(n), counted
+# from the moment the view is called (so including the session and user
+# loads its login check triggers). Going over is logged, and raises when
+# settings.QUERY_BUDGET_STRICT is on (QueryBudgetTests turn it on) so an
+# N+1 fails the test that triggered it.
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class QueryCollector:
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsStore:
+
+    FIELDS = ("requests", "queries", "db_seconds", "view_seconds", "response_bytes", "budget_exceeded")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, queries, db_seconds, view_seconds, response_bytes, over_budget):
+        with self._lock:
+            row = self._views.setdefault(view, dict.fromkeys(self.FIELDS, 0))
+            row["requests"] += 1
+            row["queries"] += queries
+            row["db_seconds"] += db_seconds
+            row["view_seconds"] += view_seconds
+            row["response_bytes"] += response_bytes or 0
+            row["budget_exceeded"] += int(over_budget)
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(row) for view, row in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+metrics = MetricsStore()
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        collector, started = self._start(request)
+        with ExitStack() as stack:
+            self._wrap_connections(stack, collector)
+            response = self.get_response(request)
+        return self._finish(request, response, collector, started)
+
+    async def __acall__(self, request):
+        # Async ORM calls run in the request's thread-sensitive executor
+        # thread, which has its own connection objects, so the wrappers are
+        # installed (and removed) from that thread rather than the loop's.
+        collector, started = self._start(request)
+        stack = ExitStack()
+        await sync_to_async(self._wrap_connections)(stack, collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, collector, started)
+
+    def _wrap_connections(self, stack, collector):
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(collector))
+
+    def _start(self, request):
+        collector = QueryCollector()
+        request._query_collector = collector
+        request._view_started = None
+        return collector, time.perf_counter()
+
+    def _finish(self, request, response, collector, started):
+        total_seconds = time.perf_counter() - started
+        view_started = request._view_started or (started, 0)
+        view_seconds = time.perf_counter() - view_started[0]
+        view_queries = collector.count - view_started[1]
+
+        match = request.resolver_match
+        view_name = match.url_name if match and match.url_name else "unresolved"
+        budget = getattr(match.func, "query_budget", None) if match else None
+        over_budget = budget is not None and view_queries > budget
+
+        # Streamed bodies are produced after this returns, so their size
+        # (and any queries made while streaming) can't be counted here.
+        size = None if response.streaming else len(response.content)
+
+        metrics.record(view_name, collector.count, collector.seconds, view_seconds, size, over_budget)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={collector.seconds * 1000:.2f};desc="{collector.count} queries"',
+            f"view;dur={view_seconds * 1000:.2f}",
+            f"total;dur={total_seconds * 1000:.2f}",
+        ])
+
+        if over_budget:
+            message = f"{view_name} ran {view_queries} queries, budget is {budget}"
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        collector = getattr(request, "_query_collector", None)
+        if collector is not None:
+            request._view_started = (time.perf_counter(), collector.count)
+        return None
+
+
+def _format(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+def render_prometheus(extra=None):
+    # Prometheus text exposition of the per-view aggregates. ``extra`` is a
+    # {metric_name: value} dict of process-wide gauges/counters.
+    series = (
+        ("makeup_requests_total", "requests", "Requests served."),
+        ("makeup_db_queries_total", "queries", "SQL queries executed."),
+        ("makeup_db_seconds_total", "db_seconds", "Time spent executing SQL."),
+        ("makeup_view_seconds_total", "view_seconds", "Time spent in the view."),
+        ("makeup_response_bytes_total", "response_bytes", "Response body bytes (non-streaming)."),
+        ("makeup_query_budget_exceeded_total", "budget_exceeded", "Requests over their view's query budget."),
+    )
+    snapshot = metrics.snapshot()
+    lines = []
+
+    for name, field, help_text in series:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for view, row in sorted(snapshot.items()):
+            lines.append(f'{name}{{view="{view}"}} {_format(row[field])}')
+
+    for name, value in (extra or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,84 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from makeup_backend import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Benchmark every makeup_backend endpoint and report latency percentiles and query counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--iterations", type=int, default=50, help="Requests per endpoint (default: 50).")
+        parser.add_argument("--only", nargs="+", metavar="URL_NAME", help="Only benchmark these URL names.")
+        parser.add_argument("-o", "--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--baseline", help="Earlier JSON results to compare p50 latency and query counts against.")
+        parser.add_argument(
+            "--connection-reuse", action="store_true",
+            help="Instead, compare a new database connection per request with a persistent one.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be positive")
+
+        if options["connection_reuse"]:
+            self._connection_reuse(options["iterations"])
+            return
+
+        baseline = {}
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as fh:
+                    baseline = json.load(fh)["results"]
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Can't read baseline: {e}")
+
+        report = benchmarks.run(options["iterations"], options["only"])
+
+        self.stdout.write(
+            f"{'endpoint':<24} {'status':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'queries':>8}"
+        )
+        for name, r in report["results"].items():
+            line = (
+                f"{name:<24} {r['status']:>6} {r['p50_ms']:>9.2f} "
+                f"{r['p90_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['queries']:>8}"
+            )
+            before = baseline.get(name)
+            if before:
+                line += (
+                    f"  (p50 {r['p50_ms'] - before['p50_ms']:+.2f} ms, "
+                    f"queries {r['queries'] - before['queries']:+g})"
+                )
+            self.stdout.write(line)
+
+        failing = benchmarks.non_2xx(report["results"])
+        if failing:
+            self.stdout.write(self.style.WARNING(
+                "Non-2xx responses, timed as they are: "
+                + ", ".join(
+                    f"{name} " + "/".join(f"{code} x{n}" for code, n in statuses.items())
+                    for name, statuses in failing.items()
+                )
+            ))
+
+        if report["skipped"]:
+            self.stdout.write(self.style.WARNING(
+                f"No request spec for: {', '.join(report['skipped'])}"
+            ))
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _connection_reuse(self, iterations):
+        report = benchmarks.bench_connection_reuse(iterations)
+
+        self.stdout.write(f"{'connections':<24} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+        for label, r in report["results"].items():
+            self.stdout.write(f"{label:<24} {r['p50_ms']:>9.3f} {r['p90_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reusing connections saves {report['p50_gain_ms']:.3f} ms at p50 ({report['database']})."
+        ))
+
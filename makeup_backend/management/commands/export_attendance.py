@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from makeup_backend import exports
+
+
+class Command(BaseCommand):
+    help = "Stream attendance joined with student and class details as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=exports.EXPORT_FORMATS,
+            default="csv",
+            help="Output format (default: csv).",
+        )
+        parser.add_argument("--date-from", help="First marked_at day to include (YYYY-MM-DD).")
+        parser.add_argument("--date-to", help="Last marked_at day to include (YYYY-MM-DD).")
+        parser.add_argument("--class-id", type=int, help="Only export this make-up class.")
+        parser.add_argument("-o", "--output", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            rows = exports.export_rows(
+                date_from=options["date_from"],
+                date_to=options["date_to"],
+                class_id=options["class_id"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = exports.render(options["format"], rows)
+
+        if not options["output"]:
+            self._write(self.stdout, lines)
+            return
+
+        with open(options["output"], "w", newline="") as fh:
+            self._write(fh, lines)
+
+    def _write(self, fh, lines):
+        for line in lines:
+            fh.write(line)
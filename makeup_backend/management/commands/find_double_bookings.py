@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import bookings
+from makeup_backend.models import MakeUpClass
+
+
+class Command(BaseCommand):
+    help = "List classes booked into the same classroom at overlapping times."
+
+    def handle(self, *args, **options):
+        pairs = list(bookings.find_double_bookings())
+
+        if not pairs:
+            self.stdout.write(self.style.SUCCESS("No double bookings."))
+            return
+
+        classes = MakeUpClass.objects.in_bulk({pk for pair in pairs for pk in pair})
+        for first, second in pairs:
+            a, b = classes[first], classes[second]
+            self.stdout.write(
+                f"{a.classroom}: #{a.id} {a.subject} {a.date} {a.time:%H:%M} ({a.duration_minutes} min) "
+                f"overlaps #{b.id} {b.subject} {b.date} {b.time:%H:%M} ({b.duration_minutes} min)"
+            )
+
+        self.stdout.write(self.style.WARNING(f"{len(pairs)} overlapping pair(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import attendance_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Flush every pending mark in the write-behind attendance buffer into the "
+        "database, e.g. after a crash or before a deploy."
+    )
+
+    def handle(self, *args, **options):
+        buffer = attendance_buffer.buffer
+        flushed = buffer.drain()
+        buffer.prune()
+        stats = buffer.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Flushed {flushed} mark(s), {buffer.inserted_total} new; "
+            f"{stats['pending']} still pending."
+        ))
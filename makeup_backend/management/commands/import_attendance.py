@@ -0,0 +1,64 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from makeup_backend import attendance
+
+
+class Command(BaseCommand):
+    help = "Bulk-mark attendance from a CSV of roll_number,remedial_code rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import, or - for stdin.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Rows marked per batch (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        if options["path"] == "-":
+            self._import(sys.stdin, chunk_size)
+            return
+
+        try:
+            with open(options["path"], newline="") as fh:
+                self._import(fh, chunk_size)
+        except OSError as e:
+            raise CommandError(str(e))
+
+    def _import(self, fh, chunk_size):
+        reader = csv.DictReader(fh)
+        missing = {"roll_number", "remedial_code"} - set(reader.fieldnames or ())
+        if missing:
+            raise CommandError(f"Missing CSV column(s): {', '.join(sorted(missing))}")
+
+        summary = {}
+        chunk = []
+        line = 1
+
+        for row in reader:
+            chunk.append((row["roll_number"], row["remedial_code"]))
+            if len(chunk) >= chunk_size:
+                line = self._flush(chunk, line, summary)
+                chunk = []
+
+        if chunk:
+            self._flush(chunk, line, summary)
+
+        for status, count in sorted(summary.items()):
+            self.stdout.write(f"{status}: {count}")
+
+    def _flush(self, chunk, line, summary):
+        for (roll, code), status in zip(chunk, attendance.mark_bulk(chunk)):
+            line += 1
+            summary[status] = summary.get(status, 0) + 1
+            if status in (attendance.INVALID_CODE, attendance.UNKNOWN_STUDENT):
+                self.stderr.write(f"line {line}: {roll},{code}: {status}")
+        return line
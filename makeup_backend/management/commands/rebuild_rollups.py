@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import rollups
+from makeup_backend.models import MonthlyAttendanceRollup, DailyAttendanceRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily and monthly attendance rollups from the Attendance table."
+
+    def handle(self, *args, **options):
+        rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {DailyAttendanceRollup.objects.count()} daily and "
+            f"{MonthlyAttendanceRollup.objects.count()} monthly bucket(s)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import stats
+
+
+class Command(BaseCommand):
+    help = "Recount classes, students and attendance and repair the dashboard counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without writing the corrected values.",
+        )
+
+    def handle(self, *args, **options):
+        drift = stats.rebuild_counters(dry_run=options["dry_run"])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters are in sync."))
+            return
+
+        for name, (stored, actual) in drift.items():
+            self.stdout.write(f"{name}: stored={stored} actual={actual}")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} counter(s) out of sync."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} counter(s)."))
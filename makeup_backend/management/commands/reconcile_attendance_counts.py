@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import stats
+
+
+class Command(BaseCommand):
+    help = "Recount attendance per class and repair MakeUpClass.attendance_count."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without writing the corrected values.",
+        )
+
+    def handle(self, *args, **options):
+        drift = stats.reconcile_attendance_counts(dry_run=options["dry_run"])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Class attendance counts are in sync."))
+            return
+
+        for class_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"class {class_id}: stored={stored} actual={actual}")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} class count(s) out of sync."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} class count(s)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import code_pool
+
+
+class Command(BaseCommand):
+    help = "Top up the pool of pre-generated remedial codes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            type=int,
+            default=code_pool.POOL_SIZE,
+            help=f"Free codes to keep in the pool (default: {code_pool.POOL_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        added = code_pool.top_up(options["target"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {added} code(s); {code_pool.free_count()} free in the pool."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from makeup_backend import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        "Refit the turnout forecast from the MakeUpClass and Attendance tables. "
+        "Run nightly (e.g. from cron) to settle what incremental updates miss."
+    )
+
+    def handle(self, *args, **options):
+        cells = forecasting.refit()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refit the turnout forecast: {cells} subject/weekday/hour cell(s)."
+        ))
@@ -0,0 +1,178 @@
+import random
+import time as clock
+from datetime import time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from makeup_backend import bookings, code_pool, forecasting, rollups, stats
+from makeup_backend.models import MakeUpClass, Student, Attendance, DEFAULT_DURATION_MINUTES
+
+
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "English", "Computer Science"]
+ROOMS = [f"Room {n}" for n in range(101, 141)]
+
+# Random placements tried per class before giving up on finding a free slot.
+PLACEMENT_ATTEMPTS = 100
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic students, classes and attendance for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=1000, help="Students to create (default: 1000).")
+        parser.add_argument("--classes", type=int, default=200, help="Classes to create (default: 200).")
+        parser.add_argument(
+            "--density",
+            type=float,
+            default=0.05,
+            help="Average fraction of students attending each past class (default: 0.05).",
+        )
+        parser.add_argument("--days", type=int, default=365, help="History spread over this many days (default: 365).")
+        parser.add_argument(
+            "--upcoming",
+            type=float,
+            default=0.1,
+            help="Fraction of classes scheduled in the future (default: 0.1).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk INSERT (default: 5000).")
+        parser.add_argument("--prefix", default="LOAD", help="Roll number prefix for generated students (default: LOAD).")
+        parser.add_argument("--seed", type=int, help="Random seed for reproducible data.")
+
+    def handle(self, *args, **options):
+        if not 0 <= options["density"] <= 1 or not 0 <= options["upcoming"] <= 1:
+            raise CommandError("--density and --upcoming must be between 0 and 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        started = clock.perf_counter()
+
+        student_ids = self._seed_students(options["students"], options["prefix"])
+        past_class_ids = self._seed_classes(options["classes"], options["days"], options["upcoming"])
+        marked = self._seed_attendance(student_ids, past_class_ids, options["density"])
+
+        # bulk_create skips the signals that maintain these tables.
+        stats.rebuild_counters()
+        stats.reconcile_attendance_counts()
+        rollups.rebuild()
+        forecasting.refit()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(student_ids)} students, {options['classes']} classes and "
+            f"{marked} attendance rows in {clock.perf_counter() - started:.1f}s."
+        ))
+
+    def _batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _seed_students(self, count, prefix):
+        token = f"{self.rng.getrandbits(24):06x}"
+        rows = (
+            Student(
+                name=f"Load Student {i}",
+                roll_number=f"{prefix}{token}{i:07d}",
+                email=f"{prefix.lower()}{token}{i}@example.com",
+            )
+            for i in range(count)
+        )
+
+        ids = []
+        for batch in self._batches(rows):
+            ids.extend(s.id for s in Student.objects.bulk_create(batch))
+        return ids
+
+    def _seed_classes(self, count, days, upcoming):
+        today = timezone.localdate()
+        days = max(days, 1)
+
+        # Bookings already in the window, plus each class placed below, so no
+        # seeded class double-books a room (which PostgreSQL's exclusion
+        # constraint would reject, failing the whole batch).
+        index = bookings.IntervalIndex.load(
+            ROOMS,
+            bookings.local_moment(today - timedelta(days=days), time(0, 0)),
+            bookings.local_moment(today + timedelta(days=31), time(0, 0)),
+        )
+        rows = []
+
+        for code in code_pool.allocate(count):
+            for _ in range(PLACEMENT_ATTEMPTS):
+                if self.rng.random() < upcoming:
+                    day = today + timedelta(days=self.rng.randint(1, 30))
+                else:
+                    day = today - timedelta(days=self.rng.randint(1, days))
+                classroom = self.rng.choice(ROOMS)
+                at = time(self.rng.randint(8, 17), self.rng.choice([0, 30]))
+                start, end = bookings.class_span(day, at, DEFAULT_DURATION_MINUTES)
+                if not index.conflicts(classroom, start, end):
+                    break
+            else:
+                raise CommandError(
+                    f"No free classroom slot left after {len(rows)} classes; "
+                    "raise --days or lower --classes"
+                )
+
+            subject = self.rng.choice(SUBJECTS)
+            index.add(classroom, bookings.Booking(start, end, None, subject))
+            rows.append(MakeUpClass(
+                subject=subject,
+                classroom=classroom,
+                date=day,
+                time=at,
+                remedial_code=code,
+            ))
+
+        first_id = None
+        for batch in self._batches(rows):
+            created = MakeUpClass.objects.bulk_create(batch)
+            first_id = first_id or created[0].id
+
+        if first_id is None:
+            return []
+
+        # auto_now_add stamps every row with "now"; spread created_at back to
+        # a week before each class so keyset pages look like real history.
+        seeded = MakeUpClass.objects.filter(id__gte=first_id)
+        seeded.update(created_at=F("starts_at") - timedelta(days=7))
+
+        now = timezone.now()
+        return list(seeded.filter(starts_at__lt=now).values_list("id", flat=True))
+
+    def _seed_attendance(self, student_ids, class_ids, density):
+        if not student_ids or not class_ids or not density:
+            return 0
+
+        mean = density * len(student_ids)
+
+        def rows():
+            for class_id in class_ids:
+                size = min(len(student_ids), max(0, round(self.rng.gauss(mean, mean / 4))))
+                for student_id in self.rng.sample(student_ids, size):
+                    yield Attendance(student_id=student_id, makeup_class_id=class_id)
+
+        first_id = None
+        marked = 0
+        for batch in self._batches(rows()):
+            created = Attendance.objects.bulk_create(batch)
+            first_id = first_id or created[0].id
+            marked += len(created)
+
+        if first_id:
+            # Likewise, backdate marked_at to the start of each class.
+            Attendance.objects.filter(id__gte=first_id).update(
+                marked_at=Subquery(
+                    MakeUpClass.objects.filter(pk=OuterRef("makeup_class_id"))
+                    .values("starts_at")[:1]
+                )
+            )
+        return marked
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    StatCounter = apps.get_model("makeup_backend", "StatCounter")
+    counted = {
+        "classes": apps.get_model("makeup_backend", "MakeUpClass"),
+        "students": apps.get_model("makeup_backend", "Student"),
+        "attendance": apps.get_model("makeup_backend", "Attendance"),
+    }
+    StatCounter.objects.bulk_create(
+        StatCounter(name=name, value=model.objects.count())
+        for name, model in counted.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0003_remove_makeupclass_description_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:39
+
+import makeup_backend.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0004_statcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="makeupclass",
+            name="starts_at",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=makeup_backend.models.ClassStart("date", "time", zone="UTC"),
+                output_field=models.DateTimeField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="makeupclass",
+            index=models.Index(
+                fields=["starts_at", "id"], name="makeupclass_starts_at_idx"
+            ),
+        ),
+    ]
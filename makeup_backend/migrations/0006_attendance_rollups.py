@@ -0,0 +1,99 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:41
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Attendance = apps.get_model("makeup_backend", "Attendance")
+    Daily = apps.get_model("makeup_backend", "DailyAttendanceRollup")
+    Monthly = apps.get_model("makeup_backend", "MonthlyAttendanceRollup")
+
+    grouped = (
+        Attendance.objects.annotate(
+            day=TruncDate("marked_at", tzinfo=timezone.get_current_timezone())
+        )
+        .values("day", "makeup_class__subject")
+        .annotate(n=Count("id"))
+    )
+
+    daily = []
+    monthly = {}
+    for row in grouped:
+        day, subject = row["day"], row["makeup_class__subject"]
+        daily.append(
+            Daily(
+                year=day.year,
+                month=day.month,
+                day=day.day,
+                subject=subject,
+                count=row["n"],
+            )
+        )
+        key = (day.year, day.month, subject)
+        monthly[key] = monthly.get(key, 0) + row["n"]
+
+    Daily.objects.bulk_create(daily, batch_size=500)
+    Monthly.objects.bulk_create(
+        [
+            Monthly(year=year, month=month, subject=subject, count=count)
+            for (year, month, subject), count in monthly.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0005_makeupclass_starts_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyAttendanceRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                ("month", models.PositiveSmallIntegerField()),
+                ("day", models.PositiveSmallIntegerField()),
+                ("subject", models.CharField(max_length=100)),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {("year", "month", "day", "subject")},
+            },
+        ),
+        migrations.CreateModel(
+            name="MonthlyAttendanceRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField()),
+                ("month", models.PositiveSmallIntegerField()),
+                ("subject", models.CharField(max_length=100)),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {("year", "month", "subject")},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0006_attendance_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["student", "-marked_at"], name="attendance_student_marked_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["-marked_at", "-id"], name="attendance_marked_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="makeupclass",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="makeupclass_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="makeupclass",
+            index=models.Index(
+                fields=["subject", "-created_at", "-id"],
+                name="makeupclass_subj_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0007_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="statcounter",
+            name="updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="statcounter",
+            name="version",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0008_statcounter_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RemedialCode",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=20, unique=True)),
+                ("allocated_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("allocated_at__isnull", True)),
+                        fields=["id"],
+                        name="remedialcode_free_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:29
+
+import makeup_backend.models
+from django.db import migrations, models
+
+
+CONSTRAINT = "makeupclass_no_double_booking"
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # PostgreSQL enforces "one class per room at a time" itself; other
+    # databases rely on the checks in bookings.py.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    table = schema_editor.quote_name(apps.get_model("makeup_backend", "MakeUpClass")._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT a.id, b.id FROM {table} a JOIN {table} b "
+            f"ON a.classroom = b.classroom AND a.id < b.id "
+            f"AND a.starts_at < b.ends_at AND b.starts_at < a.ends_at LIMIT 10"
+        )
+        clashes = cursor.fetchall()
+
+    if clashes:
+        pairs = ", ".join(f"{a}/{b}" for a, b in clashes)
+        raise RuntimeError(
+            f"Existing classes are double-booked (ids {pairs}). Run "
+            f"`manage.py find_double_bookings`, move or shorten them, then migrate again."
+        )
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {schema_editor.quote_name(CONSTRAINT)} "
+        f"EXCLUDE USING gist (classroom WITH =, tstzrange(starts_at, ends_at) WITH &&)"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    table = schema_editor.quote_name(apps.get_model("makeup_backend", "MakeUpClass")._meta.db_table)
+    schema_editor.execute(
+        f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {schema_editor.quote_name(CONSTRAINT)}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0009_remedial_code_pool"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="makeupclass",
+            name="duration_minutes",
+            field=models.PositiveSmallIntegerField(default=60),
+        ),
+        migrations.AddField(
+            model_name="makeupclass",
+            name="ends_at",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=makeup_backend.models.ClassEnd(
+                    "date", "time", "duration_minutes", zone="UTC"
+                ),
+                output_field=models.DateTimeField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="makeupclass",
+            index=models.Index(
+                fields=["classroom", "starts_at"], name="makeupclass_room_starts_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="makeupclass",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("duration_minutes__gte", 1), ("duration_minutes__lte", 480)
+                ),
+                name="makeupclass_duration_range",
+            ),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
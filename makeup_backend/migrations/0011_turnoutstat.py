@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0010_class_duration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TurnoutStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=100)),
+                ("weekday", models.PositiveSmallIntegerField()),
+                ("hour", models.PositiveSmallIntegerField()),
+                ("classes", models.BigIntegerField(default=0)),
+                ("attended", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {("subject", "weekday", "hour")},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_attendance_count(apps, schema_editor):
+    MakeUpClass = apps.get_model("makeup_backend", "MakeUpClass")
+    Attendance = apps.get_model("makeup_backend", "Attendance")
+    counts = Attendance.objects.filter(makeup_class=OuterRef("pk")).order_by()\
+        .values("makeup_class").annotate(n=Count("id")).values("n")
+    MakeUpClass.objects.update(attendance_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0011_turnoutstat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="makeupclass",
+            name="attendance_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_attendance_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["makeup_class", "-marked_at", "-id"], name="attendance_class_marked_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:20
+
+from django.db import migrations
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+
+def backfill_turnout(apps, schema_editor):
+    # Same fit as forecasting.refit(): 0011 created the table empty, so
+    # forecasts on an existing database would otherwise only cover classes
+    # marked since.
+    MakeUpClass = apps.get_model("makeup_backend", "MakeUpClass")
+    TurnoutStat = apps.get_model("makeup_backend", "TurnoutStat")
+
+    rows = (
+        MakeUpClass.objects.order_by()
+        .annotate(weekday=ExtractIsoWeekDay("date"), hour=ExtractHour("time"))
+        .values("subject", "weekday", "hour")
+        .annotate(
+            classes=Count(
+                "id",
+                distinct=True,
+                filter=Q(starts_at__lte=timezone.now()) | Q(attendance__isnull=False),
+            ),
+            attended=Count("attendance"),
+        )
+        .values_list("subject", "weekday", "hour", "classes", "attended")
+    )
+
+    TurnoutStat.objects.all().delete()
+    TurnoutStat.objects.bulk_create(
+        [
+            TurnoutStat(subject=s, weekday=w, hour=h, classes=c, attended=a)
+            for s, w, h, c, a in rows
+            if c or a
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("makeup_backend", "0012_makeupclass_attendance_count"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_turnout, migrations.RunPython.noop),
+    ]
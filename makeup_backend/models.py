@@ -37,27 +37,180 @@ import uuid
 from django.db import models
 
 
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 
 
+class ClassStart(models.Func):
+    # date + time as an aware timestamp, reading the wall-clock values in
+    # ``zone`` (settings.TIME_ZONE). The default SQL is standard date +
+    # time arithmetic with AT TIME ZONE (what PostgreSQL runs). SQLite has
+    # neither and keeps datetimes as naive UTC text, so it gets its own
+    # string form and the zone is assumed to be UTC.
+    output_field = models.DateTimeField()
+
+    def __init__(self, date, time, zone="UTC", **extra):
+        super().__init__(date, time, zone=zone, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="((%(expressions)s) AT TIME ZONE '%(zone)s')",
+            arg_joiner=" + ",
+            **extra_context
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="(%(expressions)s)",
+            arg_joiner=" || ' ' || ",
+            **extra_context
+        )
+
+
+class ClassEnd(models.Func):
+    # ClassStart plus ``minutes``. The minutes are added to the local
+    # timestamp before it is zoned: timestamptz + interval is only STABLE on
+    # PostgreSQL and a generated column needs an IMMUTABLE expression.
+    output_field = models.DateTimeField()
+
+    def __init__(self, date, time, minutes, zone="UTC", **extra):
+        super().__init__(date, time, minutes, zone=zone, **extra)
+
+    def _compile_sources(self, compiler):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return sqls, params
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (date, time, minutes), params = self._compile_sources(compiler)
+        sql = f"(({date} + {time} + {minutes} * INTERVAL '1' MINUTE) AT TIME ZONE '{self.extra['zone']}')"
+        return sql, params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        (date, time, minutes), params = self._compile_sources(compiler)
+        return f"datetime({date} || ' ' || {time}, '+' || {minutes} || ' minutes')", params
+
+
+class MakeUpClassQuerySet(models.QuerySet):
+
+    def active(self, now=None):
+        return self.filter(starts_at__gte=now or timezone.now())
+
+    def expired(self, now=None):
+        return self.filter(starts_at__lt=now or timezone.now())
+
+    def upcoming(self, limit, now=None):
+        return self.active(now).order_by("starts_at", "id")[:limit]
+
+    def overlapping(self, start, end):
+        # Classes whose [starts_at, ends_at) overlaps [start, end), found by a
+        # short range scan of makeupclass_room_starts_idx.
+        return self.filter(
+            starts_at__gt=start - timedelta(minutes=MAX_DURATION_MINUTES),
+            starts_at__lt=end,
+            ends_at__gt=start,
+        )
+
+    def add_attendance(self, class_counts):
+        # Applies {class_id: rows added (negative: removed)} to the
+        # denormalized attendance_count in one UPDATE of F() increments, so
+        # concurrent marks never lose an update.
+        class_counts = {pk: n for pk, n in class_counts.items() if n}
+        if not class_counts:
+            return 0
+        return self.filter(id__in=class_counts).update(
+            attendance_count=models.F("attendance_count") + models.Case(
+                *[models.When(id=pk, then=models.Value(n)) for pk, n in class_counts.items()],
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            )
+        )
+
+    def with_status(self, now=None):
+        # SQL twin of MakeUpClass.status; named current_status because an
+        # annotation can't shadow the property.
+        return self.annotate(
+            current_status=models.Case(
+                models.When(starts_at__lt=now or timezone.now(), then=models.Value("Expired")),
+                default=models.Value("Active"),
+                output_field=models.CharField()
+            )
+        )
+
+
+# Class length bounds. The upper bound is also what lets an overlap check
+# scan only the classes starting within MAX_DURATION_MINUTES before a slot.
+DEFAULT_DURATION_MINUTES = 60
+MAX_DURATION_MINUTES = 8 * 60
+
+
 class MakeUpClass(models.Model):
     subject = models.CharField(max_length=100)
     classroom = models.CharField(max_length=50)
     date = models.DateField()
     time = models.TimeField()
+    duration_minutes = models.PositiveSmallIntegerField(default=DEFAULT_DURATION_MINUTES)
+    starts_at = models.GeneratedField(
+        expression=ClassStart("date", "time", zone=settings.TIME_ZONE),
+        output_field=models.DateTimeField(),
+        db_persist=True,
+    )
+    ends_at = models.GeneratedField(
+        expression=ClassEnd("date", "time", "duration_minutes", zone=settings.TIME_ZONE),
+        output_field=models.DateTimeField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     remedial_code = models.CharField(max_length=20, unique=True, blank=True)
+    # Attendance rows for this class, kept in step by every marking path
+    # (MakeUpClassQuerySet.add_attendance) and reconciled by
+    # `manage.py reconcile_attendance_counts`.
+    attendance_count = models.PositiveIntegerField(default=0)
+
+    objects = MakeUpClassQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["starts_at", "id"], name="makeupclass_starts_at_idx"),
+            # faculty_classes keyset pages, optionally narrowed to a subject
+            models.Index(fields=["-created_at", "-id"], name="makeupclass_created_idx"),
+            models.Index(fields=["subject", "-created_at", "-id"], name="makeupclass_subj_created_idx"),
+            # double-booking checks and free-slot lookups per room
+            models.Index(fields=["classroom", "starts_at"], name="makeupclass_room_starts_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(duration_minutes__gte=1, duration_minutes__lte=MAX_DURATION_MINUTES),
+                name="makeupclass_duration_range",
+            ),
+        ]
+        # On PostgreSQL, migration 0010 also adds makeupclass_no_double_booking:
+        # EXCLUDE USING gist (classroom WITH =, tstzrange(starts_at, ends_at) WITH &&)
 
     def save(self, *args, **kwargs):
         if not self.remedial_code:
             self.remedial_code = self.generate_code()
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # attendance_count only moves through add_attendance's F()
+            # increments; writing back the loaded value on an edit would undo
+            # every mark made since the instance was read.
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and not f.generated and f.name != "attendance_count"
+            ]
         super().save(*args, **kwargs)
 
     def generate_code(self):
-        return "RC-" + uuid.uuid4().hex[:6].upper()
+        from .code_pool import allocate
+        return allocate(1)[0]
 
     @property
     def status(self):
@@ -74,10 +227,98 @@ class MakeUpClass(models.Model):
         return f"{self.subject} - {self.remedial_code}"
 
 
+class RemedialCode(models.Model):
+    # Pool of pre-generated remedial codes handed out by code_pool.py and
+    # topped up by `manage.py refill_code_pool`. Rows stay after they are
+    # allocated, so no code is ever issued twice.
+    code = models.CharField(max_length=20, unique=True)
+    allocated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the free-code scan in code_pool.allocate()
+            models.Index(
+                fields=["id"], name="remedialcode_free_idx",
+                condition=models.Q(allocated_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return self.code
+
+
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     makeup_class = models.ForeignKey(MakeUpClass, on_delete=models.CASCADE)
     marked_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('student', 'makeup_class')
\ No newline at end of file
+        unique_together = ('student', 'makeup_class')
+        indexes = [
+            # student history / metrics, newest first
+            models.Index(fields=["student", "-marked_at"], name="attendance_student_marked_idx"),
+            # dashboard recent activity and date-bounded exports
+            models.Index(fields=["-marked_at", "-id"], name="attendance_marked_idx"),
+            # class rosters, newest first
+            models.Index(fields=["makeup_class", "-marked_at", "-id"], name="attendance_class_marked_idx"),
+        ]
+
+class StatCounter(models.Model):
+    # Running totals for the dashboard, kept in step by signals.py and
+    # reconciled by `manage.py rebuild_stats`. ``version`` and
+    # ``updated_at`` move on every write to the counted table (edits
+    # included) and back the ETag / Last-Modified validators.
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class MonthlyAttendanceRollup(models.Model):
+    # Pre-aggregated attendance per subject, bucketed by marked_at in
+    # settings.TIME_ZONE. Maintained by rollups.py, rebuilt by
+    # `manage.py rebuild_rollups`.
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    subject = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('year', 'month', 'subject')
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} {self.subject}: {self.count}"
+
+
+class DailyAttendanceRollup(models.Model):
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    day = models.PositiveSmallIntegerField()
+    subject = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('year', 'month', 'day', 'subject')
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d}-{self.day:02d} {self.subject}: {self.count}"
+
+
+class TurnoutStat(models.Model):
+    # Sufficient statistics of the turnout forecast (forecasting.py): held
+    # classes and attendance rows per subject, ISO weekday and start hour.
+    # Updated as attendance is marked, refit by `manage.py refit_forecast`.
+    subject = models.CharField(max_length=100)
+    weekday = models.PositiveSmallIntegerField()
+    hour = models.PositiveSmallIntegerField()
+    classes = models.BigIntegerField(default=0)
+    attended = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('subject', 'weekday', 'hour')
+
+    def __str__(self):
+        return f"{self.subject} {self.weekday}/{self.hour:02d}h: {self.attended}/{self.classes}"
@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.autoreload import file_changed
+from django.utils.cache import get_conditional_response
+
+
+# Page shells for the template views. Their content doesn't depend on the
+# request (every figure is fetched from the APIs), so each page is rendered
+# once per (template, role) and process, and later hits only swap in the
+# request's CSRF token: the shell is rendered with CSRF_PLACEHOLDER in its
+# {% csrf_token %} and get_token() supplies the real (masked) one, setting
+# the csrftoken cookie as usual.
+#
+# Responses are "private, max-age=MAX_AGE" with an ETag of the shell and
+# the CSRF secret, so a repeat visit within MAX_AGE never reaches the
+# server, and one after it is a 304 unless the page or the CSRF secret
+# changed. The auth check runs first, and the session adds Vary: Cookie, so
+# a new login never reuses a shell cached under the previous one. CSS and
+# JS are separate static files with hashed names (see STORAGES), cached by
+# the browser for good.
+PAGE_SHELLS = getattr(settings, "PAGE_SHELLS", {})
+
+ENABLED = PAGE_SHELLS.get("ENABLED", True)
+MAX_AGE = PAGE_SHELLS.get("MAX_AGE", 60 * 60)
+
+CSRF_PLACEHOLDER = "CSRF-TOKEN-PLACEHOLDER"
+
+_shells = {}
+_shells_lock = threading.Lock()
+
+
+def role(user):
+    return "superuser" if user.is_superuser else "staff" if user.is_staff else "user"
+
+
+def _shell(template_name, user_role):
+    # Returns (html, digest); rendered outside the lock, so two first hits
+    # may both render, and the second simply replaces the first. The shells
+    # don't read the role; keying on it keeps one role's page from ever
+    # being served to another should a template start to.
+    key = (template_name, user_role)
+    with _shells_lock:
+        shell = _shells.get(key)
+    if shell is None:
+        html = render_to_string(template_name, {"csrf_token": CSRF_PLACEHOLDER})
+        shell = (html, hashlib.blake2b(html.encode(), digest_size=12).hexdigest())
+        with _shells_lock:
+            _shells[key] = shell
+    return shell
+
+
+def render_shell(request, template_name):
+    if not ENABLED:
+        return render(request, template_name)
+
+    html, digest = _shell(template_name, role(request.user))
+    token = get_token(request)
+    secret = hashlib.blake2b(request.META["CSRF_COOKIE"].encode(), digest_size=6).hexdigest()
+    etag = f'"{digest}-{secret}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(html.replace(CSRF_PLACEHOLDER, token))
+    response["ETag"] = etag
+    response["Cache-Control"] = f"private, max-age={MAX_AGE}"
+    return response
+
+
+def clear():
+    with _shells_lock:
+        _shells.clear()
+
+
+def shell_stats():
+    with _shells_lock:
+        return {"shells": len(_shells), "bytes": sum(len(html) for html, _ in _shells.values())}
+
+
+@receiver(file_changed, dispatch_uid="makeup_page_shells_file_changed")
+def _template_changed(sender, file_path, **kwargs):
+    # The dev server resets its template loaders on a template edit rather
+    # than restarting, so drop the shells with them.
+    if Path(file_path).suffix == ".html":
+        clear()
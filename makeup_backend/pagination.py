@@ -0,0 +1,76 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+# Keyset ("seek") pagination over rows ordered newest-first by a datetime
+# column with the primary key as tie-breaker, e.g. ("created_at", "id").
+# Each page is an index range scan from the cursor, so page 500 costs the
+# same as page 1. Works on values() querysets; raises ValueError for a bad
+# limit or cursor so views can answer 400.
+
+def encode_cursor(moment, pk):
+    raw = f"{moment.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        moment, pk = raw.split("|")
+        return datetime.fromisoformat(moment), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    if value in (None, ""):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
+
+
+def _page(queryset, params, order, default_limit):
+    moment_field, pk_field = order
+    limit = parse_limit(params.get("limit"), default_limit)
+
+    queryset = queryset.order_by(f"-{moment_field}", f"-{pk_field}")
+
+    cursor = params.get("cursor")
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f"{moment_field}__lt": moment})
+            | Q(**{moment_field: moment, f"{pk_field}__lt": pk})
+        )
+
+    return queryset[:limit + 1], limit
+
+
+def _trim(rows, limit, order):
+    moment_field, pk_field = order
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[moment_field], last[pk_field])
+
+    return rows, next_cursor
+
+
+def paginate(queryset, params, order=("created_at", "id"), default_limit=DEFAULT_LIMIT):
+    page, limit = _page(queryset, params, order, default_limit)
+    return _trim(list(page), limit, order)
+
+
+async def apaginate(queryset, params, order=("created_at", "id"), default_limit=DEFAULT_LIMIT):
+    page, limit = _page(queryset, params, order, default_limit)
+    return _trim([row async for row in page], limit, order)
@@ -0,0 +1,153 @@
+import threading
+
+import numpy as np
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+from .models import MakeUpClass
+
+
+# Room / slot recommendations for the AI Insights page. A candidate is a
+# (classroom, ISO weekday, start hour) cell; its score is the attendance a
+# class of the requested subject can expect there, judged by history.
+#
+# The history is one GROUP BY query of attendance and classes per
+# (classroom, subject, weekday, hour). Everything
+# after that is NumPy over flat (room * 168 + weekday * 24 + hour) cell
+# indexes: bincounts give per-cell sums and counts, and the subject's cell
+# means are shrunk toward the all-subject mean of the cell (itself shrunk
+# toward the subject's overall mean), so a slot tried once doesn't top the
+# list on luck. Only held classes (started, or with attendance) count, so
+# booking a slot ahead doesn't read as a class nobody came to. The model is
+# rebuilt when the attendance or classes version moves or the next class
+# starts, and scores per subject are cached on it.
+
+SLOTS = 7 * 24
+
+# Weight, in classes, of the prior a cell's own mean is shrunk toward.
+PRIOR_WEIGHT = 3.0
+
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def _mean(attended, classes):
+    total = classes.sum()
+    return float(attended.sum() / total) if total else 0.0
+
+
+class SlotModel:
+
+    def __init__(self, rows):
+        # rows: (classroom, subject, ISO weekday, hour, classes, attended).
+        columns = list(zip(*rows)) or [()] * 6
+        rooms, subjects, weekdays, hours, classes, attended = columns
+
+        self.rooms, room_index = np.unique(np.array(rooms, dtype=object), return_inverse=True)
+        self.subjects, self.subject_index = np.unique(
+            np.array(subjects, dtype=object), return_inverse=True
+        )
+        slot = (np.asarray(weekdays, dtype=np.int64) - 1) * 24 + np.asarray(hours, dtype=np.int64)
+        self.cells = room_index.astype(np.int64) * SLOTS + slot
+        self.classes = np.asarray(classes, dtype=np.float64)
+        self.attended = np.asarray(attended, dtype=np.float64)
+        self.size = len(self.rooms) * SLOTS
+
+        self.cell_sum = np.bincount(self.cells, weights=self.attended, minlength=self.size)
+        self.cell_classes = np.bincount(self.cells, weights=self.classes, minlength=self.size)
+        self.mean = _mean(self.attended, self.classes)
+
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def _score(self, subject):
+        position = np.searchsorted(self.subjects, subject)
+        if position == len(self.subjects) or self.subjects[position] != subject:
+            mask = np.zeros(len(self.cells), dtype=bool)
+        else:
+            mask = self.subject_index == position
+
+        cells = self.cells[mask]
+        subject_sum = np.bincount(cells, weights=self.attended[mask], minlength=self.size)
+        subject_classes = np.bincount(cells, weights=self.classes[mask], minlength=self.size)
+        subject_mean = _mean(self.attended[mask], self.classes[mask]) if mask.any() else self.mean
+
+        prior = (self.cell_sum + PRIOR_WEIGHT * subject_mean) / (self.cell_classes + PRIOR_WEIGHT)
+        score = (subject_sum + PRIOR_WEIGHT * prior) / (subject_classes + PRIOR_WEIGHT)
+
+        # Only cells a class has actually been held in are candidates.
+        score[self.cell_classes == 0] = -np.inf
+        return score, subject_classes
+
+    def recommend(self, subject, limit=10):
+        with self._lock:
+            scored = self._scores.get(subject)
+            if scored is None:
+                scored = self._scores[subject] = self._score(subject)
+        score, subject_classes = scored
+
+        candidates = np.flatnonzero(np.isfinite(score))
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-score[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((candidates, -score[candidates]))]
+
+        recommendations = []
+        for cell in candidates.tolist():
+            room, slot = divmod(cell, SLOTS)
+            weekday, hour = divmod(slot, 24)
+            recommendations.append({
+                "classroom": self.rooms[room],
+                "weekday": weekday + 1,
+                "day": DAY_NAMES[weekday],
+                "hour": hour,
+                "time": f"{hour:02d}:00",
+                "expected_attendance": round(float(score[cell]), 2),
+                "subject_classes": int(subject_classes[cell]),
+                "all_classes": int(self.cell_classes[cell]),
+            })
+        return recommendations
+
+
+def load_rows(now=None):
+    # Attendance x MakeUpClass in one query. Weekday and hour come from the
+    # wall-clock date and time columns, so no time zone conversion is
+    # involved. A class is held once it has started or has any attendance,
+    # as in forecasting.refit().
+    now = now or timezone.now()
+    return list(
+        MakeUpClass.objects.order_by()
+        .annotate(weekday=ExtractIsoWeekDay("date"), hour=ExtractHour("time"))
+        .values("classroom", "subject", "weekday", "hour")
+        .annotate(
+            classes=Count(
+                "id", distinct=True,
+                filter=Q(starts_at__lte=now) | Q(attendance__isnull=False),
+            ),
+            attended=Count("attendance"),
+        )
+        .values_list("classroom", "subject", "weekday", "hour", "classes", "attended")
+    )
+
+
+_model = None
+_model_key = None
+_model_lock = threading.Lock()
+
+
+def get_model(key):
+    # ``key`` identifies the data the model was built from (the attendance
+    # and classes versions, and the next class start, since the held
+    # classes change as classes start); a new key rebuilds it once.
+    global _model, _model_key
+
+    with _model_lock:
+        if _model is None or _model_key != key:
+            _model, _model_key = SlotModel(load_rows()), key
+        return _model
+
+
+def reset():
+    global _model, _model_key
+
+    with _model_lock:
+        _model = _model_key = None
@@ -0,0 +1,125 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    MakeUpClass, Attendance, MonthlyAttendanceRollup, DailyAttendanceRollup
+)
+
+
+# Daily and monthly attendance per subject, bucketed by marked_at in
+# settings.TIME_ZONE. Every path that inserts or deletes Attendance feeds
+# the delta in here so analytics reads scale with the number of buckets,
+# not the number of rows. `manage.py rebuild_rollups` recomputes both
+# tables from scratch.
+
+UPSERT_BATCH_SIZE = 500
+
+ROLLUPS = (
+    (DailyAttendanceRollup, ("year", "month", "day", "subject")),
+    (MonthlyAttendanceRollup, ("year", "month", "subject")),
+)
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _bucket_values(day, subject, keys):
+    values = {"year": day.year, "month": day.month, "day": day.day, "subject": subject}
+    return [values[k] for k in keys]
+
+
+def _upsert(model, keys, buckets):
+    # buckets: {(key values...): delta}. One INSERT ... ON CONFLICT DO UPDATE
+    # adds each delta to the existing row or creates it.
+    buckets = {k: n for k, n in buckets.items() if n}
+    if not buckets:
+        return
+
+    table = _qn(model._meta.db_table)
+    columns = [*keys, "count"]
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    items = list(buckets.items())
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            batch = items[start:start + UPSERT_BATCH_SIZE]
+            sql = (
+                f"INSERT INTO {table} ({', '.join(map(_qn, columns))}) "
+                f"VALUES {', '.join([row] * len(batch))} "
+                f"ON CONFLICT ({', '.join(map(_qn, keys))}) "
+                f"DO UPDATE SET {_qn('count')} = {table}.{_qn('count')} + EXCLUDED.{_qn('count')}"
+            )
+            cursor.execute(sql, [v for key, n in batch for v in (*key, n)])
+
+
+def _apply(per_day_subject):
+    # per_day_subject: Counter {(date, subject): delta}
+    for model, keys in ROLLUPS:
+        buckets = Counter()
+        for (day, subject), n in per_day_subject.items():
+            buckets[tuple(_bucket_values(day, subject, keys))] += n
+        _upsert(model, keys, buckets)
+
+
+def add_marks(class_counts, marked_at=None):
+    # Attendance added (or, with negative counts, removed) by the marking
+    # paths: {class_id: rows}, all marked at ``marked_at``. The subject is
+    # read inside the INSERT ... SELECT, so the hot path gains no extra
+    # round trip.
+    class_counts = {cid: n for cid, n in class_counts.items() if n}
+    if not class_counts:
+        return
+
+    day = timezone.localtime(marked_at or timezone.now()).date()
+    class_table = _qn(MakeUpClass._meta.db_table)
+    counts = " ".join(["WHEN %s THEN %s"] * len(class_counts))
+    ids = ", ".join(["%s"] * len(class_counts))
+    count_params = [v for item in class_counts.items() for v in item]
+
+    with transaction.atomic(savepoint=False):
+        for model, keys in ROLLUPS:
+            table = _qn(model._meta.db_table)
+            columns = [*keys, "count"]
+            date_keys = [k for k in keys if k != "subject"]
+            sql = (
+                f"INSERT INTO {table} ({', '.join(map(_qn, columns))}) "
+                f"SELECT {', '.join(['%s'] * len(date_keys))}, {_qn('subject')}, "
+                f"SUM(CASE {_qn('id')} {counts} END) "
+                f"FROM {class_table} WHERE {_qn('id')} IN ({ids}) "
+                f"GROUP BY {_qn('subject')} "
+                f"ON CONFLICT ({', '.join(map(_qn, keys))}) "
+                f"DO UPDATE SET {_qn('count')} = {table}.{_qn('count')} + EXCLUDED.{_qn('count')}"
+            )
+            params = [
+                *_bucket_values(day, None, date_keys),
+                *count_params,
+                *class_counts,
+            ]
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+
+
+def apply_queryset(attendance, sign):
+    # Adds (sign=1) or removes (sign=-1) the buckets for an Attendance
+    # queryset with one GROUP BY, e.g. before a class cascade deletes rows.
+    grouped = attendance.order_by().annotate(
+        day=TruncDate("marked_at", tzinfo=timezone.get_current_timezone())
+    ).values("day", "makeup_class__subject").annotate(n=Count("id"))
+
+    per_day_subject = Counter()
+    for row in grouped:
+        per_day_subject[(row["day"], row["makeup_class__subject"])] += sign * row["n"]
+
+    _apply(per_day_subject)
+
+
+def rebuild():
+    with transaction.atomic():
+        for model, _ in ROLLUPS:
+            model.objects.all().delete()
+        apply_queryset(Attendance.objects.all(), 1)
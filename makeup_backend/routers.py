@@ -0,0 +1,77 @@
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Read-replica routing. Views decorated with @read_replica (the read-only
+# analytics and history APIs) run their ORM reads on the "replica" alias
+# when settings.DATABASES defines one; everything else, and every write,
+# stays on "default". The flag lives in a context variable, so it follows
+# an async view into the threads its queries run on and never leaks into
+# another request.
+#
+# Replica reads can trail the primary by the replication lag; the views
+# using it only serve aggregates and history, whose ETags are built from
+# the same (replica) counters they read.
+
+REPLICA_ALIAS = "replica"
+
+_use_replica = contextvars.ContextVar("makeup_use_replica", default=False)
+
+
+def _target(settings_dict):
+    return tuple(settings_dict.get(key) for key in ("ENGINE", "HOST", "PORT", "NAME"))
+
+
+def replica_configured():
+    # A replica alias pointing at the primary itself (as TEST MIRROR makes
+    # it during test runs) gains nothing, so reads stay on "default".
+    databases = connections.settings
+    return REPLICA_ALIAS in databases and \
+        _target(databases[REPLICA_ALIAS]) != _target(databases[DEFAULT_DB_ALIAS])
+
+
+def read_replica(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica mirrors the primary, so rows read from either relate.
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
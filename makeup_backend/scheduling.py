@@ -0,0 +1,206 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MakeUpClass
+from . import bookings, code_pool, codes, events, stats
+
+
+CREATED = "created"
+CONFLICT = "conflict"
+PAST = "past"
+
+FREQUENCIES = ("once", "daily", "weekly")
+
+# Most classes one request may expand to, across all its classrooms.
+MAX_OCCURRENCES = 500
+
+
+Occurrence = namedtuple("Occurrence", "subject classroom date time duration")
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+
+
+def _positive_int(value, name):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return value
+
+
+def _classrooms(rule):
+    rooms = rule.get("classrooms")
+    if rooms is None:
+        rooms = [rule["classroom"]] if rule.get("classroom") else []
+    if not isinstance(rooms, list) or not rooms:
+        raise ValueError("classroom or classrooms required")
+
+    cleaned = []
+    for room in rooms:
+        if not isinstance(room, str) or not room.strip():
+            raise ValueError("classrooms must be non-empty strings")
+        if room.strip() not in cleaned:
+            cleaned.append(room.strip())
+    return cleaned
+
+
+def _dates(rule, start):
+    frequency = rule.get("frequency", "once")
+    if frequency not in FREQUENCIES:
+        raise ValueError("frequency must be once, daily or weekly")
+    if frequency == "once":
+        return [start]
+
+    interval = _positive_int(rule.get("interval", 1), "interval")
+    count = rule.get("count")
+    until = rule.get("until")
+    if count is None and until is None:
+        raise ValueError("count or until required for a recurring schedule")
+    if count is not None:
+        count = _positive_int(count, "count")
+    if until is not None:
+        until = _parse_date(until, "until")
+
+    if frequency == "daily":
+        def candidates():
+            day = start
+            while True:
+                yield day
+                day += timedelta(days=interval)
+    else:
+        weekdays = rule.get("weekdays", [start.weekday()])
+        if not isinstance(weekdays, list) or not weekdays or any(
+            isinstance(d, bool) or d not in range(7) for d in weekdays
+        ):
+            raise ValueError("weekdays must be a list of 0 (Monday) to 6 (Sunday)")
+
+        def candidates():
+            week = start - timedelta(days=start.weekday())
+            while True:
+                for weekday in sorted(set(weekdays)):
+                    day = week + timedelta(days=weekday)
+                    if day >= start:
+                        yield day
+                week += timedelta(weeks=interval)
+
+    dates = []
+    for day in candidates():
+        if (count is not None and len(dates) >= count) or (until is not None and day > until):
+            break
+        if len(dates) >= MAX_OCCURRENCES:
+            raise ValueError(f"A schedule may expand to at most {MAX_OCCURRENCES} classes")
+        dates.append(day)
+    return dates
+
+
+# Expands a schedule rule into one Occurrence per (date, classroom):
+#
+#   subject, time (HH:MM), duration (minutes), start_date, classroom | classrooms,
+#   frequency once|daily|weekly, interval, count | until,
+#   weekdays (weekly; 0 = Monday), exclude_dates
+#
+# Raises ValueError for a malformed rule so the view can answer 400.
+def expand(rule):
+    if not isinstance(rule, dict):
+        raise ValueError("Schedule rule must be an object")
+
+    subject = rule.get("subject")
+    if not isinstance(subject, str) or not subject.strip():
+        raise ValueError("subject required")
+
+    rooms = _classrooms(rule)
+    start = _parse_date(rule.get("start_date"), "start_date")
+    try:
+        start_time = datetime.strptime(rule.get("time"), "%H:%M").time()
+    except (TypeError, ValueError):
+        raise ValueError("time must be HH:MM")
+    duration = bookings.parse_duration(rule.get("duration"))
+
+    excluded = rule.get("exclude_dates") or []
+    if not isinstance(excluded, list):
+        raise ValueError("exclude_dates must be a list of YYYY-MM-DD dates")
+    excluded = {_parse_date(d, "exclude_dates") for d in excluded}
+    dates = [d for d in _dates(rule, start) if d not in excluded]
+
+    if len(dates) * len(rooms) > MAX_OCCURRENCES:
+        raise ValueError(f"A schedule may expand to at most {MAX_OCCURRENCES} classes")
+
+    return [
+        Occurrence(subject.strip(), room, day, start_time, duration)
+        for day in dates
+        for room in rooms
+    ]
+
+
+# Creates the classes for ``occurrences`` in one transaction: one load of
+# the bookings in those rooms over the schedule's span into an
+# IntervalIndex, one code allocation and one bulk INSERT. Occurrences in the
+# past or overlapping a booked class (or an earlier occurrence) are reported
+# and skipped; the rest are still created. Returns one result dict per
+# occurrence, in input order.
+def schedule(occurrences, now=None):
+    if not occurrences:
+        return []
+    now = now or timezone.now()
+
+    spans = [bookings.class_span(o.date, o.time, o.duration) for o in occurrences]
+    index = bookings.IntervalIndex.load(
+        {o.classroom for o in occurrences},
+        min(start for start, _ in spans),
+        max(end for _, end in spans),
+    )
+
+    statuses = []
+    new_rows = []
+
+    for occurrence, (start, end) in zip(occurrences, spans):
+        if start < now:
+            statuses.append(PAST)
+        elif index.conflicts(occurrence.classroom, start, end):
+            statuses.append(CONFLICT)
+        else:
+            index.add(occurrence.classroom, bookings.Booking(start, end, None, occurrence.subject))
+            new_rows.append(MakeUpClass(
+                subject=occurrence.subject,
+                classroom=occurrence.classroom,
+                date=occurrence.date,
+                time=occurrence.time,
+                duration_minutes=occurrence.duration,
+            ))
+            statuses.append(CREATED)
+
+    if new_rows:
+        with transaction.atomic():
+            # bulk_create skips save() and the post_save receivers, so codes,
+            # counters, the code cache and live events are handled here.
+            for row, code in zip(new_rows, code_pool.allocate(len(new_rows))):
+                row.remedial_code = code
+            created = MakeUpClass.objects.bulk_create(new_rows)
+            stats.bump("classes", len(created))
+            for makeup in created:
+                codes.remember(makeup.remedial_code, makeup.id)
+            events.emit("class.scheduled", {"ids": [m.id for m in created]})
+
+    created = iter(new_rows)
+    results = []
+    for occurrence, status in zip(occurrences, statuses):
+        result = {
+            "subject": occurrence.subject,
+            "classroom": occurrence.classroom,
+            "date": occurrence.date.strftime("%Y-%m-%d"),
+            "time": occurrence.time.strftime("%H:%M"),
+            "duration": occurrence.duration,
+            "status": status,
+        }
+        if status == CREATED:
+            makeup = next(created)
+            result["id"] = makeup.id
+            result["remedial_code"] = makeup.remedial_code
+        results.append(result)
+    return results
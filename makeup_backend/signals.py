@@ -1,10 +1,219 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import Count, QuerySet
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import UserProfile, MakeUpClass, Student, Attendance
+from . import codes, events, forecasting, rollups, stats
+
+
+# =====================================================
+# 📊 DASHBOARD COUNTERS
+# =====================================================
+
+COUNTER_NAMES = {
+    MakeUpClass: "classes",
+    Student: "students",
+    Attendance: "attendance",
+}
+
+
+@receiver(post_save, sender=MakeUpClass)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Attendance)
+def count_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.bump(COUNTER_NAMES[sender], 1)
+    else:
+        # Edits leave the count alone but must still move the version the
+        # conditional GET validators are built from.
+        stats.touch(COUNTER_NAMES[sender])
+
+
+@receiver(pre_delete, sender=MakeUpClass)
+@receiver(pre_delete, sender=Student)
+def count_cascaded_attendance(sender, instance, **kwargs):
+    # Attendance rows removed by a class/student cascade are settled here
+    # with one indexed COUNT instead of one UPDATE per row in post_delete.
+    lookup = "makeup_class" if sender is MakeUpClass else "student"
+    cascaded = Attendance.objects.filter(**{lookup: instance}).count()
+    stats.bump("attendance", -cascaded)
+    instance._cascaded_attendance = cascaded
+
+
+@receiver(post_delete, sender=MakeUpClass)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Attendance)
+def count_deleted(sender, instance, origin=None, **kwargs):
+    if sender is Attendance and not _deleted_directly(origin):
+        return
+    stats.bump(COUNTER_NAMES[sender], -1)
+
+
+def _deleted_directly(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model is Attendance
+    return origin is None or isinstance(origin, Attendance)
+
+
+# =====================================================
+# 🧮 PER-CLASS ATTENDANCE COUNTS
+# =====================================================
+
+@receiver(post_save, sender=Attendance)
+def count_class_attendance(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        MakeUpClass.objects.add_attendance({instance.makeup_class_id: 1})
+
+
+@receiver(post_delete, sender=Attendance)
+def uncount_class_attendance(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin):
+        MakeUpClass.objects.add_attendance({instance.makeup_class_id: -1})
+
+
+@receiver(pre_delete, sender=Student)
+def uncount_cascaded_class_attendance(sender, instance, **kwargs):
+    # One GROUP BY over the student's rows rather than one UPDATE per row.
+    counts = Attendance.objects.filter(student=instance).order_by()\
+        .values("makeup_class_id").annotate(n=Count("id")).values_list("makeup_class_id", "n")
+    MakeUpClass.objects.add_attendance({pk: -n for pk, n in counts})
+
+
+# =====================================================
+# 🎯 REMEDIAL CODE CACHE
+# =====================================================
+
+@receiver(post_save, sender=MakeUpClass)
+def cache_saved_code(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        codes.remember(instance.remedial_code, instance.id)
+    else:
+        codes.forget(instance.remedial_code)
+
+
+@receiver(post_delete, sender=MakeUpClass)
+def forget_deleted_code(sender, instance, **kwargs):
+    codes.forget(instance.remedial_code)
+
+
+# =====================================================
+# 📈 ANALYTICS ROLLUPS
+# =====================================================
+
+@receiver(post_save, sender=Attendance)
+def roll_up_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.add_marks({instance.makeup_class_id: 1}, instance.marked_at)
+
+
+@receiver(post_delete, sender=Attendance)
+def roll_up_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin):
+        rollups.add_marks({instance.makeup_class_id: -1}, instance.marked_at)
+
+
+@receiver(pre_delete, sender=MakeUpClass)
+@receiver(pre_delete, sender=Student)
+def roll_up_cascaded(sender, instance, **kwargs):
+    lookup = "makeup_class" if sender is MakeUpClass else "student"
+    rollups.apply_queryset(Attendance.objects.filter(**{lookup: instance}), -1)
 
 
 @receiver(pre_save, sender=MakeUpClass)
-def generate_remedial_code(sender, instance, **kwargs):
-    if not instance.remedial_code:
-        instance.remedial_code = f"RC-{uuid.uuid4().hex[:6].upper()}"
+def roll_up_subject_change(sender, instance, raw=False, **kwargs):
+    # Rollups are keyed by subject, so renaming a class's subject moves its
+    # attendance from the old buckets (removed here) to the new ones.
+    if raw or instance.pk is None:
+        return
+    old_subject = MakeUpClass.objects.filter(pk=instance.pk)\
+        .values_list("subject", flat=True).first()
+    instance._subject_changed = old_subject is not None and old_subject != instance.subject
+    if instance._subject_changed:
+        rollups.apply_queryset(Attendance.objects.filter(makeup_class_id=instance.pk), -1)
+
+
+@receiver(post_save, sender=MakeUpClass)
+def roll_up_subject_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw and getattr(instance, "_subject_changed", False):
+        rollups.apply_queryset(Attendance.objects.filter(makeup_class_id=instance.pk), 1)
+        instance._subject_changed = False
+
+
+# =====================================================
+# 🔮 TURNOUT FORECAST
+# =====================================================
+
+@receiver(post_save, sender=Attendance)
+def forecast_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        forecasting.add_marks({instance.makeup_class_id: 1})
+
+
+@receiver(post_delete, sender=Attendance)
+def forecast_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin):
+        forecasting.add_marks({instance.makeup_class_id: -1})
+
+
+@receiver(pre_delete, sender=MakeUpClass)
+def forecast_class_deleted(sender, instance, **kwargs):
+    # Runs after count_cascaded_attendance, which already counted the rows.
+    forecasting.remove_class(instance, getattr(instance, "_cascaded_attendance", None))
+
+
+# =====================================================
+# 📡 LIVE EVENTS (SSE)
+# =====================================================
+
+def _class_data(instance):
+    return {
+        "id": instance.id,
+        "subject": instance.subject,
+        "classroom": instance.classroom,
+        "date": instance.date.strftime("%Y-%m-%d"),
+        "time": instance.time.strftime("%H:%M"),
+        "duration": instance.duration_minutes,
+        "remedial_code": instance.remedial_code,
+        "status": instance.status,
+    }
+
+
+@receiver(post_save, sender=MakeUpClass)
+def announce_class_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.emit("class.created" if created else "class.updated", {"class": _class_data(instance)})
+
+
+@receiver(post_delete, sender=MakeUpClass)
+def announce_class_deleted(sender, instance, **kwargs):
+    events.emit("class.deleted", {
+        "id": instance.id,
+        "attendance_removed": getattr(instance, "_cascaded_attendance", 0),
+    })
+
+
+@receiver(post_save, sender=Student)
+def announce_student_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        events.emit("student.created")
+
+
+@receiver(post_delete, sender=Student)
+def announce_student_deleted(sender, instance, **kwargs):
+    events.emit("student.deleted")
+
+
+@receiver(post_save, sender=Attendance)
+def announce_attendance_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        events.attendance_changed({instance.makeup_class_id: 1}, instance.marked_at)
+
+
+@receiver(post_delete, sender=Attendance)
+def announce_attendance_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin):
+        events.attendance_changed({instance.makeup_class_id: -1})
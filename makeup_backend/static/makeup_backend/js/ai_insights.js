@@ -0,0 +1,96 @@
+
+// ===============================
+// LOAD AI ANALYTICS (DB DRIVEN)
+// ===============================
+async function loadAIAnalytics() {
+
+    try {
+        const data = await fetchJSON("/api/ai/analytics/");
+        const trend = data.trend;
+
+        if (!trend || trend.length === 0) return;
+
+        // ==========================
+        // DRAW SIMPLE TREND CHART
+        // ==========================
+        const canvas = document.getElementById("trendChart");
+        const ctx = canvas.getContext("2d");
+
+        const width = canvas.width;
+        const height = canvas.height;
+
+        ctx.clearRect(0, 0, width, height);
+
+        const maxAttendance = Math.max(...trend.map(t => t.attendance));
+        const padding = 40;
+        const stepX = (width - padding * 2) / (trend.length - 1);
+
+        ctx.strokeStyle = "#3b82f6";
+        ctx.lineWidth = 3;
+        ctx.beginPath();
+
+        trend.forEach((point, index) => {
+            const x = padding + index * stepX;
+            const y = height - padding - (point.attendance / maxAttendance) * (height - padding * 2);
+
+            if (index === 0) ctx.moveTo(x, y);
+            else ctx.lineTo(x, y);
+
+            ctx.fillStyle = "#3b82f6";
+            ctx.beginPath();
+            ctx.arc(x, y, 4, 0, Math.PI * 2);
+            ctx.fill();
+        });
+
+        ctx.stroke();
+
+        // ==========================
+        // COMPUTE RISK LEVEL
+        // ==========================
+
+        const latest = trend[trend.length - 1].attendance;
+        const avg = trend.reduce((a,b) => a + b.attendance, 0) / trend.length;
+
+        let risk = "Low";
+        let capacity = Math.round((latest / (avg || 1)) * 100);
+
+        if (capacity > 120) risk = "High";
+        else if (capacity > 90) risk = "Medium";
+
+        const badge = document.getElementById("riskBadge");
+        badge.innerText = risk;
+
+        badge.className = "badge " +
+            (risk === "Low" ? "badge-low" :
+             risk === "Medium" ? "badge-medium" :
+             "badge-high");
+
+        document.getElementById("capacityValue").innerText = capacity;
+
+    } catch (error) {
+        console.error("AI Analytics Error:", error);
+    }
+}
+
+// ===============================
+// LOAD TURNOUT FORECAST
+// ===============================
+async function loadForecast() {
+    try {
+        const data = await fetchJSON("/api/ai/forecast/");
+        const body = document.getElementById("forecastBody");
+        body.innerHTML = "";
+
+        data.classes.forEach(c => {
+            const row = body.insertRow();
+            [c.date, c.time, c.subject, c.classroom, c.expected_attendance]
+                .forEach(value => { row.insertCell().textContent = value; });
+        });
+    } catch (error) {
+        console.error("Forecast Error:", error);
+    }
+}
+
+document.addEventListener("DOMContentLoaded", loadAIAnalytics);
+document.addEventListener("DOMContentLoaded", loadForecast);
+
@@ -0,0 +1,29 @@
+
+// Helpers shared by the page scripts; every page shell loads this file
+// before its own script.
+
+// ==========================
+// CONDITIONAL FETCH (ETAG)
+// ==========================
+async function fetchJSON(url) {
+    // Revalidates with the ETag of the copy kept in sessionStorage, so
+    // unchanged data comes back as an empty 304.
+    const key = "etag:" + url;
+    const cached = JSON.parse(sessionStorage.getItem(key) || "null");
+    const headers = cached ? { "If-None-Match": cached.etag } : {};
+
+    const response = await fetch(url, { headers });
+    if (response.status === 304 && cached) return cached.data;
+
+    const data = await response.json();
+    const etag = response.headers.get("ETag");
+    if (response.ok && etag) {
+        try {
+            sessionStorage.setItem(key, JSON.stringify({ etag, data }));
+        } catch (e) {
+            // Storage full or disabled: just skip caching.
+        }
+    }
+    return data;
+}
+
@@ -0,0 +1,100 @@
+
+// ==========================
+// LOAD DASHBOARD DATA
+// ==========================
+function renderMetrics(totalClasses, totalStudents, totalAttendance) {
+    let rate = 0;
+    if (totalClasses > 0 && totalStudents > 0) {
+        rate = Math.round(totalAttendance / (totalStudents * totalClasses) * 10000) / 100;
+    }
+
+    document.getElementById("metricsGrid").innerHTML = `
+        <div class="metric-card">
+            <h3>Total Classes</h3>
+            <p>${totalClasses}</p>
+        </div>
+
+        <div class="metric-card">
+            <h3>Total Students</h3>
+            <p>${totalStudents}</p>
+        </div>
+
+        <div class="metric-card">
+            <h3>Total Attendance</h3>
+            <p>${totalAttendance}</p>
+        </div>
+
+        <div class="metric-card">
+            <h3>Attendance Rate</h3>
+            <p>${rate}%</p>
+        </div>
+    `;
+}
+
+async function loadDashboard() {
+    try {
+        const data = await fetchJSON("/api/dashboard/");
+
+        // Metrics
+        renderMetrics(data.total_classes, data.total_students, data.total_attendance);
+
+        // Recent Activity (DB Driven)
+        const tbody = document.getElementById("recentActivityBody");
+        tbody.innerHTML = "";
+
+        data.recent_activity.forEach(activity => {
+            tbody.innerHTML += `
+                <tr>
+                    <td>${activity.subject}</td>
+                    <td style="text-align:right; color:#94a3b8;">
+                        ${activity.date}
+                    </td>
+                </tr>
+            `;
+        });
+
+    } catch (error) {
+        console.error("Dashboard Load Error:", error);
+    }
+}
+
+// ==========================
+// LIVE UPDATES (SERVER-SENT EVENTS)
+// ==========================
+function prependActivity(subject, date) {
+    const tbody = document.getElementById("recentActivityBody");
+    tbody.insertAdjacentHTML("afterbegin", `
+        <tr>
+            <td>${subject}</td>
+            <td style="text-align:right; color:#94a3b8;">
+                ${date}
+            </td>
+        </tr>
+    `);
+    while (tbody.children.length > 5) tbody.lastElementChild.remove();
+}
+
+function connectLiveEvents() {
+    const source = new EventSource("/api/events/");
+
+    source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+
+        if (event.counts) {
+            renderMetrics(event.counts.classes, event.counts.students, event.counts.attendance);
+        }
+
+        if (event.type === "attendance.marked") {
+            const date = event.data.marked_at.slice(0, 16).replace("T", " ");
+            Object.keys(event.data.classes).forEach(id => {
+                prependActivity(event.subjects[id] || "", date);
+            });
+        }
+    };
+}
+
+document.addEventListener("DOMContentLoaded", async () => {
+    await loadDashboard();
+    connectLiveEvents();
+});
+
@@ -0,0 +1,230 @@
+
+// =============================
+// CSRF TOKEN
+// =============================
+function getCSRFToken() {
+    return document.querySelector('#csrf-form [name=csrfmiddlewaretoken]').value;
+}
+
+// =============================
+// MODAL CONTROL
+// =============================
+function openModal() {
+    document.getElementById("scheduleModal").classList.add("active");
+}
+function closeModal() {
+    document.getElementById("scheduleModal").classList.remove("active");
+}
+
+// =============================
+// LOAD CLASSES (KEYSET PAGES)
+// =============================
+let nextCursor = null;
+
+function classQuery(cursor) {
+    const params = new URLSearchParams();
+    const filters = new FormData(document.getElementById("filterForm"));
+
+    for (const [key, value] of filters.entries()) {
+        if (value) params.set(key, value);
+    }
+    if (cursor) params.set("cursor", cursor);
+
+    return "/api/faculty/classes/?" + params.toString();
+}
+
+async function loadMetrics() {
+    const data = await fetchJSON("/api/dashboard/");
+
+    document.getElementById("totalClasses").innerText = data.total_classes;
+    document.getElementById("totalStudents").innerText = data.total_attendance;
+}
+
+function appendClasses(classes) {
+    const codesTable = document.getElementById("codesTable");
+    const scheduleTable = document.getElementById("scheduleTable");
+
+    classes.forEach(cls => {
+
+        // Remedial Codes Table
+        codesTable.insertAdjacentHTML("beforeend", `
+            <tr data-class-id="${cls.id}">
+                <td>${cls.remedial_code}</td>
+                <td>${cls.subject}</td>
+                <td>${cls.date}</td>
+                <td>
+                    <span class="badge" style="
+                        background:${cls.status === 'Active' ? '#10b981' : '#ef4444'};">
+                        ${cls.status}
+                    </span>
+                </td>
+                <td class="student-count" style="cursor:pointer;" title="Show roster"
+                    onclick="showRoster(${cls.id})">${cls.attendance_count}</td>
+            </tr>
+        `);
+
+        // Scheduled Classes Table
+        scheduleTable.insertAdjacentHTML("beforeend", `
+            <tr data-class-id="${cls.id}">
+                <td>${cls.subject}</td>
+                <td>${cls.date}</td>
+                <td>${cls.time}</td>
+                <td>${cls.classroom}</td>
+                <td class="student-count">${cls.attendance_count}</td>
+            </tr>
+        `);
+    });
+}
+
+async function loadMoreClasses() {
+    const result = await fetchJSON(classQuery(nextCursor));
+
+    appendClasses(result.classes || []);
+
+    nextCursor = result.next_cursor;
+    document.getElementById("loadMore").style.display = nextCursor ? "inline-block" : "none";
+}
+
+async function loadClasses() {
+    const codesTable = document.getElementById("codesTable");
+    const scheduleTable = document.getElementById("scheduleTable");
+
+    codesTable.innerHTML = "";
+    scheduleTable.innerHTML = "";
+    nextCursor = null;
+
+    loadMetrics();
+    await loadMoreClasses();
+
+    if (codesTable.children.length === 0) {
+        codesTable.innerHTML = `
+            <tr>
+                <td colspan="5" style="text-align:center;">No classes found</td>
+            </tr>
+        `;
+    }
+}
+
+document.getElementById("filterForm").addEventListener("submit", function(e) {
+    e.preventDefault();
+    loadClasses();
+});
+// =============================
+// CREATE CLASS
+// =============================
+document.getElementById("scheduleForm").addEventListener("submit", async function(e) {
+    e.preventDefault();
+
+    const formData = new FormData(this);
+
+    try {
+        const response = await fetch("/api/faculty/create-class/", {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": getCSRFToken()
+            },
+            body: JSON.stringify({
+                subject: formData.get("subject"),
+                date: formData.get("date"),
+                time: formData.get("time"),
+                duration: Number(formData.get("duration")),
+                classroom: formData.get("classroom")
+            })
+        });
+        
+
+       if (response.ok) {
+    const result = await response.json();
+    alert("Created: " + result.remedial_code);
+    loadClasses(); // refresh table
+
+        } else if (response.status === 409) {
+            const result = await response.json();
+            alert("Classroom already booked: " + result.conflicts.map(c => `${c.subject} ${c.start}–${c.end.slice(11)}`).join(", "));
+        } else {
+            alert("Failed to create class");
+        }
+
+    } catch (error) {
+        console.error("Error creating class:", error);
+    }
+});
+function openEdit(id, subject, date, time, classroom) {
+    const newSubject = prompt("Subject:", subject);
+    const newDate = prompt("Date (YYYY-MM-DD):", date);
+    const newTime = prompt("Time (HH:MM):", time);
+    const newClassroom = prompt("Classroom:", classroom);
+
+    fetch(`/api/faculty/edit-class/${id}/`, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": getCSRFToken()
+        },
+        body: JSON.stringify({
+            subject: newSubject,
+            date: newDate,
+            time: newTime,
+            classroom: newClassroom
+        })
+    }).then(() => loadClasses());
+}
+// =============================
+// LIVE UPDATES (SERVER-SENT EVENTS)
+// =============================
+function connectLiveEvents() {
+    const source = new EventSource("/api/events/");
+
+    source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+
+        if (event.counts) {
+            document.getElementById("totalClasses").innerText = event.counts.classes;
+            document.getElementById("totalStudents").innerText = event.counts.attendance;
+        }
+
+        if (event.type === "attendance.marked" || event.type === "attendance.removed") {
+            Object.entries(event.data.classes).forEach(([id, change]) => {
+                document.querySelectorAll(`tr[data-class-id="${id}"] .student-count`).forEach(cell => {
+                    cell.innerText = Number(cell.innerText) + change;
+                });
+            });
+        } else if (event.type === "class.deleted") {
+            document.querySelectorAll(`tr[data-class-id="${event.data.id}"]`).forEach(row => row.remove());
+        } else if (["class.created", "class.updated", "class.scheduled"].includes(event.type)) {
+            loadClasses();
+        }
+    };
+}
+
+// =============================
+// INIT
+// =============================
+document.addEventListener("DOMContentLoaded", async () => {
+    await loadClasses();
+    connectLiveEvents();
+});
+async function showRoster(id) {
+    const data = await fetchJSON(`/api/faculty/classes/${id}/attendance/`);
+    if (!data.students) return;
+
+    const lines = data.students.map(s => `${s.roll_number}  ${s.name}  (${s.marked_at})`);
+    if (data.next_cursor) lines.push(`… ${data.class.attendance_count - data.students.length} more`);
+    alert(`${data.class.subject} (${data.class.remedial_code})\n\n${lines.join("\n") || "No attendance yet"}`);
+}
+
+async function deleteClass(id) {
+    if (!confirm("Delete this class?")) return;
+
+    await fetch(`/api/faculty/delete-class/${id}/`, {
+        method: "POST",
+        headers: {
+            "X-CSRFToken": getCSRFToken()
+        }
+    });
+
+    loadClasses();
+}
+
+
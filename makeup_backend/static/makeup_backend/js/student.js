@@ -0,0 +1,114 @@
+
+class LayoutManager {
+  constructor() {
+    const toggle = document.querySelector('.nav-toggle');
+    const sidebar = document.querySelector('.sidebar');
+    const main = document.querySelector('.main-content');
+    if (toggle) {
+      toggle.addEventListener('click', () => {
+        sidebar?.classList.toggle('collapsed');
+        main?.classList.toggle('expanded');
+      });
+    }
+  }
+}
+
+
+// ==============================
+// 🔐 GET CSRF TOKEN
+// ==============================
+
+function getCSRFToken() {
+  return document.cookie.split('; ')
+    .find(row => row.startsWith('csrftoken'))
+    ?.split('=')[1];
+}
+
+
+// ==============================
+// 📊 LOAD STUDENT DASHBOARD (METRICS + HISTORY)
+// ==============================
+
+let historyCursor = null;
+
+async function loadStudentDashboard(cursor = null) {
+  const params = new URLSearchParams();
+  if (cursor) params.set("cursor", cursor);
+
+  const data = await fetchJSON("/api/student/dashboard/?" + params);
+  if (!data.records) return;
+
+  document.getElementById("totalSessions").innerText = data.total_sessions;
+  document.getElementById("attendanceRate").innerText = data.attendance_rate + "%";
+  document.getElementById("pendingSessions").innerText = data.pending_sessions;
+
+  const tbody = document.getElementById("attendanceHistoryBody");
+  if (!cursor) tbody.innerHTML = "";
+  data.records.forEach(record => {
+    const row = `
+      <tr>
+        <td>${record.code}</td>
+        <td>${record.date}</td>
+        <td>${record.time}</td>
+        <td><span class="badge badge-success">${record.status}</span></td>
+      </tr>
+    `;
+    tbody.innerHTML += row;
+  });
+
+  historyCursor = data.next_cursor;
+  document.getElementById("loadMoreHistory").style.display = historyCursor ? "" : "none";
+}
+
+
+// ==============================
+// 🚀 MARK ATTENDANCE
+// ==============================
+
+async function markAttendance() {
+  const codeInput = document.querySelector('[data-input="remedial-code"]');
+  const code = codeInput.value.trim().toUpperCase();
+
+  if (!code) {
+    alert("Please enter remedial code");
+    return;
+  }
+
+  const response = await fetch("/api/student/mark-attendance/", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "X-CSRFToken": getCSRFToken()
+    },
+    body: JSON.stringify({
+      remedial_code: code
+    })
+  });
+
+  const result = await response.json();
+
+  if (response.ok) {
+    alert("Attendance Marked Successfully");
+    codeInput.value = "";
+    loadStudentDashboard();
+  } else {
+    alert(result.message);
+  }
+}
+
+
+// ==============================
+// 🎯 INIT
+// ==============================
+
+document.addEventListener("DOMContentLoaded", function() {
+  new LayoutManager();
+  loadStudentDashboard();
+
+  document.getElementById("loadMoreHistory")
+    .addEventListener("click", () => loadStudentDashboard(historyCursor));
+
+  const submitBtn = document.querySelector('[data-action="submit-attendance"]');
+  submitBtn?.addEventListener("click", markAttendance);
+});
+
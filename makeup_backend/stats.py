@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+
+from .models import MakeUpClass, Student, Attendance, StatCounter
+
+
+# Counter name -> model it tracks. Row-level inserts/deletes are picked up
+# by the receivers in signals.py; paths that bypass signals (bulk_create,
+# raw SQL) must call bump() themselves.
+COUNTED_MODELS = {
+    "classes": MakeUpClass,
+    "students": Student,
+    "attendance": Attendance,
+}
+
+
+CounterState = namedtuple("CounterState", "value version updated_at")
+
+
+def _seed(name):
+    # No row yet (fresh table / flushed test DB): seed it from a real count,
+    # which already includes the change that triggered the caller.
+    return StatCounter.objects.get_or_create(
+        name=name,
+        defaults={"value": COUNTED_MODELS[name].objects.count()}
+    )
+
+
+def bump(name, delta):
+    if not delta:
+        return
+
+    updated = StatCounter.objects.filter(name=name).update(
+        value=F("value") + delta, version=F("version") + 1, updated_at=Now()
+    )
+    if updated:
+        return
+
+    _, created = _seed(name)
+    if not created:
+        bump(name, delta)
+
+
+def touch(name):
+    # A row of the counted table changed without changing the count.
+    updated = StatCounter.objects.filter(name=name).update(
+        version=F("version") + 1, updated_at=Now()
+    )
+    if not updated:
+        _, created = _seed(name)
+        if not created:
+            touch(name)
+
+
+def get_counters():
+    counters = {
+        name: CounterState(*row)
+        for name, *row in StatCounter.objects.filter(name__in=COUNTED_MODELS)
+        .values_list("name", "value", "version", "updated_at")
+    }
+
+    for name in COUNTED_MODELS:
+        if name not in counters:
+            counter, _ = _seed(name)
+            counters[name] = CounterState(counter.value, counter.version, counter.updated_at)
+
+    return counters
+
+
+async def aget_counters():
+    counters = {
+        name: CounterState(*row)
+        async for name, *row in StatCounter.objects.filter(name__in=COUNTED_MODELS)
+        .values_list("name", "value", "version", "updated_at")
+    }
+
+    if len(counters) < len(COUNTED_MODELS):
+        # Seeding missing rows is rare; reuse the sync path for it.
+        return await sync_to_async(get_counters)()
+    return counters
+
+
+def get_counts():
+    return {name: c.value for name, c in get_counters().items()}
+
+
+async def aget_counts():
+    return {name: c.value for name, c in (await aget_counters()).items()}
+
+
+def rebuild_counters(dry_run=False):
+    # Returns {name: (stored, actual)} for every counter that had drifted.
+    stored = dict(StatCounter.objects.values_list("name", "value"))
+    drift = {}
+
+    for name, model in COUNTED_MODELS.items():
+        actual = model.objects.count()
+        if stored.get(name) != actual:
+            drift[name] = (stored.get(name), actual)
+            if not dry_run:
+                StatCounter.objects.update_or_create(
+                    name=name, defaults={"value": actual}
+                )
+                touch(name)
+
+    return drift
+
+
+def reconcile_attendance_counts(dry_run=False):
+    # Returns {class_id: (stored, actual)} for every class whose
+    # attendance_count had drifted, found with one correlated COUNT per
+    # class. Fixes are applied as F() deltas, one UPDATE per batch, so marks
+    # landing meanwhile are not lost.
+    actual = Attendance.objects.filter(makeup_class=OuterRef("pk")).order_by()\
+        .values("makeup_class").annotate(n=Count("id")).values("n")
+    drift = {
+        pk: (stored, counted)
+        for pk, stored, counted in MakeUpClass.objects.annotate(
+            counted=Coalesce(Subquery(actual), 0)
+        ).exclude(attendance_count=F("counted")).values_list("id", "attendance_count", "counted")
+    }
+
+    if not dry_run:
+        items = list(drift.items())
+        for start in range(0, len(items), 500):
+            MakeUpClass.objects.add_attendance({
+                pk: counted - stored for pk, (stored, counted) in items[start:start + 500]
+            })
+
+    return drift
+
@@ -1,3 +1,1989 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+import threading
+from importlib import import_module, reload
+from collections import Counter
+from datetime import date, datetime as datetime_at, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipIf, skipUnless
+
+from asgiref.sync import sync_to_async
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.http import JsonResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    attendance, attendance_buffer, benchmarks, bookings, code_pool, codes, events, forecasting, pages,
+    pagination, recommendations, rollups, routers, scheduling, stats, throttling, views
+)
+from .instrumentation import QueryBudgetExceeded
+from .models import (
+    MakeUpClass, Student, Attendance, RemedialCode, TurnoutStat, MonthlyAttendanceRollup, DailyAttendanceRollup
+)
+
+
+# SQLite's shared in-memory test database fails concurrent writers with
+# "table is locked" instead of queueing them, so this needs a real server.
+@skipIf(connection.vendor == "sqlite", "needs a database with concurrent writers")
+class MarkAttendanceConcurrencyTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "CS101", email="cs101@example.com", password="pw", is_staff=True
+        )
+        self.makeup = MakeUpClass.objects.create(
+            subject="Maths", classroom="A1", date=date(2030, 1, 1), time=time(9, 0)
+        )
+
+    def test_parallel_marks_create_exactly_one_row(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        statuses = []
+        lock = threading.Lock()
+
+        def mark():
+            client = Client()
+            client.force_login(self.user)
+            try:
+                barrier.wait()
+                response = client.post(
+                    reverse("mark_attendance"),
+                    {"remedial_code": self.makeup.remedial_code},
+                    content_type="application/json",
+                )
+                with lock:
+                    statuses.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=mark) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(statuses.count(409), workers - 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are checked on PostgreSQL")
+class QueryPlanTests(TestCase):
+    # Runs every read API against a seeded dataset, EXPLAINs each query it
+    # issued and fails if any of them falls back to a sequential scan of a
+    # large table. Guards the indexes added for these access paths.
+    WATCHED_TABLES = (
+        Attendance._meta.db_table,
+        MakeUpClass._meta.db_table,
+        Student._meta.db_table,
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(9)
+        now = timezone.now()
+
+        cls.user = User.objects.create_user("STU0000", password="pw", is_staff=True)
+
+        students = Student.objects.bulk_create(
+            Student(name=f"Student {i}", roll_number=f"STU{i:04d}", email=f"stu{i}@example.com")
+            for i in range(5000)
+        )
+        # 27 classes a day, each in a distinct (room, hour) of the day's 40
+        # rooms x 10 hourly slots, so none trips the double-booking constraint.
+        slots = [(room, hour) for room in range(1, 41) for hour in range(8, 18)]
+        placed = [slot for _ in range(20000 // 27 + 1) for slot in rng.sample(slots, 27)]
+        classes = MakeUpClass.objects.bulk_create(
+            MakeUpClass(
+                subject=rng.choice(["Mathematics", "Physics", "Chemistry", "Biology"]),
+                classroom=f"R{placed[i][0]}",
+                date=(now - timedelta(days=720 - i // 27)).date(),
+                time=time(placed[i][1], 0),
+                remedial_code=f"RC-{i:06X}",
+            )
+            for i in range(20000)
+        )
+        Attendance.objects.bulk_create(
+            Attendance(student=student, makeup_class=makeup)
+            for makeup in classes
+            for student in rng.sample(students, 3)
+        )
+
+        cls.remedial_code = classes[-1].remedial_code
+
+        with connection.cursor() as cursor:
+            for table in cls.WATCHED_TABLES:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertNoSeqScans(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            if method == "post":
+                response = self.client.post(url, data, content_type="application/json")
+            else:
+                response = self.client.get(url, data)
+        self.assertLess(response.status_code, 500, url)
+
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN " + sql)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            for table in self.WATCHED_TABLES:
+                self.assertNotIn(
+                    f"Seq Scan on {table}", plan,
+                    f"{url} scans {table} sequentially:\n{sql}\n{plan}"
+                )
+
+    def test_dashboard(self):
+        self.assertNoSeqScans("get", reverse("dashboard_data"))
+
+    def test_faculty_classes(self):
+        url = reverse("faculty_classes")
+        self.assertNoSeqScans("get", url)
+        self.assertNoSeqScans("get", url, {"status": "active"})
+        self.assertNoSeqScans("get", url, {"subject": "Physics"})
+
+    def test_student_history_and_metrics(self):
+        self.assertNoSeqScans("get", reverse("student_history"))
+        self.assertNoSeqScans("get", reverse("student_metrics"))
+        self.assertNoSeqScans("get", reverse("student_dashboard"))
+
+    def test_ai_analytics(self):
+        self.assertNoSeqScans("get", reverse("ai_analytics"), {"granularity": "day"})
+
+    def test_mark_attendance(self):
+        self.assertNoSeqScans(
+            "post", reverse("mark_attendance"), {"remedial_code": self.remedial_code}
+        )
+
+
+class StatCounterTests(TestCase):
+    # The dashboard counters must equal a live COUNT(*) after every kind of
+    # write, including the paths that skip per-row signals.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            Student.objects.create(name=f"Student {i}", roll_number=f"SC{i:03d}", email=f"sc{i}@example.com")
+            for i in range(4)
+        ]
+        cls.classes = [
+            MakeUpClass.objects.create(
+                subject="Maths", classroom=f"C{i}", date=date(2030, 1, 7), time=time(9, 0)
+            )
+            for i in range(3)
+        ]
+        for makeup in cls.classes:
+            for student in cls.students:
+                Attendance.objects.create(student=student, makeup_class=makeup)
+
+    def assertCountsExact(self):
+        self.assertEqual(stats.get_counts(), {
+            "classes": MakeUpClass.objects.count(),
+            "students": Student.objects.count(),
+            "attendance": Attendance.objects.count(),
+        })
+
+    def test_cascade_deletes(self):
+        self.assertCountsExact()
+        self.classes[0].delete()
+        self.assertCountsExact()
+        self.students[0].delete()
+        self.assertCountsExact()
+        self.assertEqual(stats.get_counts()["attendance"], 6)
+
+    def test_bulk_inserts(self):
+        scheduling.schedule(scheduling.expand({
+            "subject": "Physics", "classrooms": ["B1", "B2"], "start_date": "2030-02-04",
+            "time": "10:00", "frequency": "weekly", "count": 3,
+        }))
+        self.assertCountsExact()
+
+        makeup = MakeUpClass.objects.get(classroom="B1", date=date(2030, 2, 4))
+        attendance.mark_bulk([(s.roll_number, makeup.remedial_code) for s in self.students])
+        self.assertCountsExact()
+        self.assertEqual(stats.get_counts()["classes"], 9)
+
+    def test_bulk_deletes(self):
+        Attendance.objects.filter(student=self.students[1]).delete()
+        self.assertCountsExact()
+        MakeUpClass.objects.filter(classroom__in=["C1", "C2"]).delete()
+        self.assertCountsExact()
+        Student.objects.filter(roll_number__in=["SC002", "SC003"]).delete()
+        self.assertCountsExact()
+        self.assertEqual(stats.get_counts(), {"classes": 1, "students": 2, "attendance": 1})
+
+
+class BulkAttendanceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC010", password="pw", is_staff=True)
+        cls.students = Student.objects.bulk_create(
+            Student(name=f"Student {i}", roll_number=f"BK{i:03d}", email=f"bk{i}@example.com")
+            for i in range(60)
+        )
+        cls.first, cls.second = [
+            MakeUpClass.objects.create(
+                subject="Maths", classroom=room, date=date(2030, 1, 7), time=time(9, 0)
+            )
+            for room in ("K1", "K2")
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_mixed_batch(self):
+        Attendance.objects.create(student=self.students[1], makeup_class=self.first)
+        code = self.first.remedial_code
+        records = [
+            ("BK000", code), ("BK001", code), ("BK000", code), ("BK002", self.second.remedial_code),
+            ("BK003", "RC-NOTACODE"), ("BK003", code_pool.generate()), ("NOBODY", code),
+        ]
+
+        response = self.client.post(
+            reverse("mark_attendance_bulk"),
+            {"records": [{"roll_number": r, "remedial_code": c} for r, c in records]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.json()["results"]], [
+            "created", "duplicate", "duplicate", "created", "invalid_code", "invalid_code",
+            "unknown_student",
+        ])
+        self.assertEqual(response.json()["summary"], {
+            "created": 2, "duplicate": 2, "invalid_code": 2, "unknown_student": 1,
+        })
+        self.assertEqual(Attendance.objects.count(), 3)
+        self.assertEqual(stats.get_counts()["attendance"], 3)
+        self.assertEqual(
+            dict(MakeUpClass.objects.values_list("id", "attendance_count")),
+            {self.first.id: 2, self.second.id: 1},
+        )
+
+    def test_rows_lost_to_another_insert_are_duplicates(self):
+        # Inserted after mark_bulk resolved its codes and students, as a
+        # concurrent request would; the INSERT's RETURNING leaves it out.
+        real_insert = attendance._insert
+
+        def racing_insert(marks):
+            Attendance.objects.create(student=self.students[5], makeup_class=self.first)
+            return real_insert(marks)
+
+        with mock.patch.object(attendance, "_insert", racing_insert):
+            results = attendance.mark_bulk([("BK005", self.first.remedial_code), ("BK006", self.first.remedial_code)])
+
+        self.assertEqual(results, ["duplicate", "created"])
+        self.assertEqual(stats.get_counts()["attendance"], 2)
+        self.assertEqual(MakeUpClass.objects.get(id=self.first.id).attendance_count, 2)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def queries(students, makeup):
+            with CaptureQueriesContext(connection) as ctx:
+                attendance.mark_bulk([(s.roll_number, makeup.remedial_code) for s in students])
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries(self.students[:5], self.first), queries(self.students[5:], self.second))
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write("roll_number,remedial_code\n")
+            for roll in ("BK010", "BK011", "BK010", "NOBODY"):
+                fh.write(f"{roll},{self.first.remedial_code}\n")
+        self.addCleanup(os.unlink, fh.name)
+
+        out, err = mock.Mock(), mock.Mock()
+        call_command("import_attendance", fh.name, chunk_size=2, stdout=out, stderr=err)
+
+        written = "".join(c.args[0] for c in out.write.call_args_list)
+        self.assertIn("created: 2", written)
+        self.assertIn("duplicate: 1", written)
+        self.assertIn("unknown_student: 1", written)
+        self.assertIn("line 5: NOBODY", err.write.call_args_list[0].args[0])
+        self.assertEqual(Attendance.objects.count(), 2)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as bad:
+            bad.write("roll,code\nBK010,RC-X\n")
+        self.addCleanup(os.unlink, bad.name)
+        with self.assertRaises(CommandError):
+            call_command("import_attendance", bad.name, stdout=out, stderr=err)
+
+
+class CodeCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Maths", classroom="Q1", date=date(2030, 1, 7), time=time(9, 0)
+        )
+
+    def setUp(self):
+        caches[codes.CACHE_ALIAS].clear()
+        codes.reset()
+        self.addCleanup(codes.reset)
+
+    def test_hits_come_from_the_local_then_shared_tier(self):
+        code = self.makeup.remedial_code
+        with self.assertNumQueries(1):
+            self.assertEqual(codes.resolve_class_id(code), self.makeup.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(codes.resolve_class_id(code), self.makeup.id)
+
+        codes._local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(codes.resolve_class_id(code), self.makeup.id)
+        self.assertEqual(
+            {k: codes.cache_stats()[k] for k in ("misses", "local_hits", "shared_hits")},
+            {"misses": 1, "local_hits": 1, "shared_hits": 1},
+        )
+
+    def test_unknown_codes_are_cached_negatively(self):
+        unknown = code_pool.generate()
+        with self.assertNumQueries(1):
+            self.assertIsNone(codes.resolve_class_id(unknown))
+        with self.assertNumQueries(0):
+            self.assertIsNone(codes.resolve_class_id(unknown))
+        self.assertEqual(codes.cache_stats()["negative_hits"], 1)
+        self.assertEqual(caches[codes.CACHE_ALIAS].get(codes._cache_key(unknown)), codes.NOT_FOUND)
+
+        # A class taking the code replaces the negative entry on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            makeup = MakeUpClass.objects.create(
+                subject="Maths", classroom="Q2", date=date(2030, 1, 7), time=time(9, 0),
+                remedial_code=unknown,
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(codes.resolve_class_id(unknown), makeup.id)
+
+    def test_edit_and_delete_invalidate(self):
+        code = self.makeup.remedial_code
+        codes.resolve_class_id(code)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.makeup.classroom = "Q9"
+            self.makeup.save()
+        self.assertIsNone(caches[codes.CACHE_ALIAS].get(codes._cache_key(code)))
+        with self.assertNumQueries(1):
+            self.assertEqual(codes.resolve_class_id(code), self.makeup.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.makeup.delete()
+        self.assertIsNone(codes.resolve_class_id(code))
+
+    def test_lru_evicts_least_recently_used_and_expired(self):
+        lru = codes.LRUCache(2)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        self.assertEqual(lru.get("a"), 1)
+        lru.set("c", 3, 60)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+
+        lru.set("d", 4, -1)
+        self.assertIsNone(lru.get("d"))
+        self.assertEqual(len(lru), 1)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC011", password="pw", is_staff=True)
+        cls.classes = [
+            MakeUpClass.objects.create(
+                subject="Physics" if i % 2 else "Maths", classroom=f"P{i}",
+                date=date(2030, 1, 7), time=time(9, 0),
+            )
+            for i in range(7)
+        ]
+        # Every row shares one created_at, so only the id orders them.
+        MakeUpClass.objects.update(created_at=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, limit=3, **({"cursor": cursor} if cursor else {}))
+            body = self.client.get(reverse("faculty_classes"), query).json()
+            ids.append([c["id"] for c in body["classes"]])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_equal_created_at_is_ordered_by_id(self):
+        pages = self.pages()
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), sorted((c.id for c in self.classes), reverse=True))
+
+    def test_pages_are_stable_across_inserts(self):
+        first = self.client.get(reverse("faculty_classes"), {"limit": 3}).json()
+        MakeUpClass.objects.create(
+            subject="Maths", classroom="P9", date=date(2030, 1, 8), time=time(9, 0)
+        )
+        second = self.client.get(
+            reverse("faculty_classes"), {"limit": 3, "cursor": first["next_cursor"]}
+        ).json()
+
+        ids = sorted((c.id for c in self.classes), reverse=True)
+        self.assertEqual([c["id"] for c in first["classes"]], ids[:3])
+        self.assertEqual([c["id"] for c in second["classes"]], ids[3:6])
+
+    def test_filters_combine_with_the_cursor(self):
+        pages = self.pages(subject="Physics")
+        self.assertEqual(
+            sum(pages, []),
+            sorted((c.id for c in self.classes if c.subject == "Physics"), reverse=True),
+        )
+        self.assertEqual([len(p) for p in pages], [3])
+
+        pages = self.pages(subject="Maths", date_from="2030-01-07")
+        self.assertEqual([len(p) for p in pages], [3, 1])
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in ("not-a-cursor", pagination.encode_cursor(timezone.now(), 1)[:-4] + "AAAA",
+                       "bm90IGEgY3Vyc29y"):
+            response = self.client.get(reverse("faculty_classes"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+        self.assertEqual(
+            self.client.get(reverse("faculty_classes"), {"limit": "0"}).status_code, 400
+        )
+
+
+class ClassStatusTests(TestCase):
+    # with_status() / active() / expired() must agree with the status
+    # property (the Python computation they replaced) at every moment,
+    # including around midnight and at each class's end.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classes = [
+            MakeUpClass.objects.create(
+                subject="Maths", classroom=f"M{i}", date=day, time=at, duration_minutes=minutes
+            )
+            for i, (day, at, minutes) in enumerate([
+                (date(2030, 1, 7), time(23, 0), 60),
+                (date(2030, 1, 7), time(23, 59), 60),
+                (date(2030, 1, 8), time(0, 0), 30),
+                (date(2030, 1, 8), time(0, 1), 90),
+            ])
+        ]
+
+    def test_generated_columns_match_python_spans(self):
+        for makeup in MakeUpClass.objects.all():
+            self.assertEqual(
+                (makeup.starts_at, makeup.ends_at),
+                bookings.class_span(makeup.date, makeup.time, makeup.duration_minutes),
+            )
+
+    def test_sql_status_matches_python(self):
+        midnight = timezone.make_aware(datetime_at(2030, 1, 8))
+        moments = [midnight + timedelta(seconds=s) for s in (-3600, -61, -60, -1, 0, 1, 59, 60, 61)]
+        moments += list(MakeUpClass.objects.values_list("ends_at", flat=True))
+
+        for now in moments:
+            with mock.patch("django.utils.timezone.now", return_value=now):
+                python = {m.id: m.status for m in MakeUpClass.objects.all()}
+            sql = dict(MakeUpClass.objects.with_status(now).values_list("id", "current_status"))
+            self.assertEqual(sql, python, now)
+            self.assertEqual(
+                set(MakeUpClass.objects.active(now).values_list("id", flat=True)),
+                {pk for pk, status in python.items() if status == "Active"},
+            )
+            self.assertEqual(
+                set(MakeUpClass.objects.expired(now).values_list("id", flat=True)),
+                {pk for pk, status in python.items() if status == "Expired"},
+            )
+
+
+class ExportTests(TestCase):
+
+    HEADER = "roll_number,student_name,subject,classroom,class_date,class_time,remedial_code,marked_at"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC012", password="pw", is_staff=True)
+        students = [
+            Student.objects.create(name=f"Student {i}", roll_number=f"EX{i:03d}", email=f"ex{i}@example.com")
+            for i in range(5)
+        ]
+        cls.first, cls.second = [
+            MakeUpClass.objects.create(
+                subject="Maths", classroom=room, date=date(2030, 1, 7), time=time(9, 0)
+            )
+            for room in ("E1", "E2")
+        ]
+        for student in students:
+            Attendance.objects.create(student=student, makeup_class=cls.first)
+        for student in students[:2]:
+            Attendance.objects.create(student=student, makeup_class=cls.second)
+        # One mark from an earlier day, for the date filters.
+        Attendance.objects.filter(student=students[0], makeup_class=cls.second)\
+            .update(marked_at=timezone.now() - timedelta(days=10))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def lines(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_csv_and_ndjson(self):
+        lines = self.lines(self.client.get(reverse("export_attendance")))
+        self.assertEqual(lines[0], self.HEADER)
+        self.assertEqual(len(lines), 1 + 7)
+        self.assertTrue(lines[1].startswith(f"EX000,Student 0,Maths,E1,2030-01-07,09:00:00,{self.first.remedial_code},"))
+
+        response = self.client.get(reverse("export_attendance"), {"format": "ndjson", "class_id": self.second.id})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in self.lines(response)]
+        self.assertEqual([r["roll_number"] for r in records], ["EX000", "EX001"])
+        self.assertEqual(set(records[0]), set(self.HEADER.split(",")))
+
+    def test_filters_and_errors(self):
+        today = timezone.localdate().isoformat()
+        lines = self.lines(self.client.get(reverse("export_attendance"), {"date_from": today}))
+        self.assertEqual(len(lines), 1 + 6)
+        lines = self.lines(self.client.get(reverse("export_attendance"), {"date_to": today, "class_id": self.second.id}))
+        self.assertEqual(len(lines), 1 + 2)
+
+        for params in ({"format": "xml"}, {"date_from": "07/01/2030"}):
+            self.assertEqual(self.client.get(reverse("export_attendance"), params).status_code, 400)
+
+    async def test_asgi_streams_an_async_iterator(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("export_attendance"))
+
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body.splitlines()[0], self.HEADER)
+        self.assertEqual(len(body.splitlines()), 1 + 7)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command("export_attendance", class_id=self.first.id, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], self.HEADER)
+        self.assertEqual(len(lines), 1 + 5)
+
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "attendance.ndjson")
+            call_command("export_attendance", format="ndjson", output=path)
+            with open(path) as fh:
+                records = [json.loads(line) for line in fh]
+        self.assertEqual(len(records), 7)
+        self.assertEqual({r["remedial_code"] for r in records}, {self.first.remedial_code, self.second.remedial_code})
+
+        with self.assertRaises(CommandError):
+            call_command("export_attendance", date_from="tomorrow", stdout=out)
+
+
+@override_settings(TIME_ZONE="Asia/Kolkata")
+class RollupTests(TestCase):
+    # The daily and monthly rollups must match a live GROUP BY over
+    # Attendance, bucketed in settings.TIME_ZONE, after every kind of write.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            Student.objects.create(name=f"Student {i}", roll_number=f"RU{i:03d}", email=f"ru{i}@example.com")
+            for i in range(3)
+        ]
+        cls.maths = MakeUpClass.objects.create(
+            subject="Maths", classroom="R1", date=date(2029, 12, 31), time=time(9, 0)
+        )
+        cls.physics = MakeUpClass.objects.create(
+            subject="Physics", classroom="R2", date=date(2029, 12, 31), time=time(9, 0)
+        )
+
+    def live(self):
+        grouped = Attendance.objects.annotate(
+            day=TruncDate("marked_at", tzinfo=timezone.get_current_timezone())
+        ).values("day", "makeup_class__subject").annotate(n=Count("id"))
+        daily, monthly = Counter(), Counter()
+        for row in grouped:
+            day, subject = row["day"], row["makeup_class__subject"]
+            daily[(day.year, day.month, day.day, subject)] += row["n"]
+            monthly[(day.year, day.month, subject)] += row["n"]
+        return daily, monthly
+
+    def stored(self):
+        daily = Counter({
+            (r.year, r.month, r.day, r.subject): r.count
+            for r in DailyAttendanceRollup.objects.exclude(count=0)
+        })
+        monthly = Counter({
+            (r.year, r.month, r.subject): r.count
+            for r in MonthlyAttendanceRollup.objects.exclude(count=0)
+        })
+        return daily, monthly
+
+    def assertRollupsExact(self):
+        self.assertEqual(self.stored(), self.live())
+
+    def test_month_bucket_across_year_boundary(self):
+        # 20:00 UTC on 31 December is 01:30 on 1 January in Kolkata.
+        new_year = datetime_at(2029, 12, 31, 20, 0, tzinfo=dt_timezone.utc)
+        old_year = datetime_at(2029, 12, 31, 17, 0, tzinfo=dt_timezone.utc)
+        attendance.insert_marks([
+            (self.students[0].id, self.maths.id, old_year),
+            (self.students[1].id, self.maths.id, new_year),
+            (self.students[2].id, self.maths.id, new_year),
+        ])
+
+        self.assertEqual(
+            set(MonthlyAttendanceRollup.objects.values_list("year", "month", "subject", "count")),
+            {(2029, 12, "Maths", 1), (2030, 1, "Maths", 2)},
+        )
+        self.assertEqual(
+            set(DailyAttendanceRollup.objects.values_list("year", "month", "day", "count")),
+            {(2029, 12, 31, 1), (2030, 1, 1, 2)},
+        )
+        self.assertRollupsExact()
+
+    def test_every_write_path_matches_live_aggregates(self):
+        for student in self.students:
+            Attendance.objects.create(student=student, makeup_class=self.maths)
+        attendance.mark_one(self.students[0].id, self.physics.id)
+        attendance.mark_bulk([(s.roll_number, self.physics.remedial_code) for s in self.students])
+        self.assertRollupsExact()
+
+        Attendance.objects.get(student=self.students[0], makeup_class=self.maths).delete()
+        self.assertRollupsExact()
+
+        self.physics.subject = "Chemistry"
+        self.physics.save()
+        self.assertRollupsExact()
+
+        self.students[1].delete()
+        self.assertRollupsExact()
+
+        Attendance.objects.filter(makeup_class=self.physics).delete()
+        self.maths.delete()
+        self.assertRollupsExact()
+        self.assertEqual(self.stored(), (Counter(), Counter()))
+
+    def test_rebuild_matches_live_aggregates(self):
+        attendance.insert_marks([
+            (student.id, makeup.id, datetime_at(2029, 12, 31, 12 + i, 0, tzinfo=dt_timezone.utc))
+            for i, student in enumerate(self.students)
+            for makeup in (self.maths, self.physics)
+        ])
+        self.physics.delete()
+        expected = self.stored()
+
+        DailyAttendanceRollup.objects.update(count=99)
+        MonthlyAttendanceRollup.objects.create(year=2000, month=1, subject="Stale", count=5)
+        rollups.rebuild()
+
+        self.assertEqual(self.stored(), expected)
+        self.assertRollupsExact()
+        self.assertFalse(MonthlyAttendanceRollup.objects.filter(subject="Physics").exclude(count=0).exists())
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    # Every budgeted view is exercised along its most expensive path (first
+    # visit by a new student, cache misses, cascades); any view going over
+    # its @query_budget raises QueryBudgetExceeded out of the test client.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU0001", password="pw", is_staff=True)
+        Student.objects.create(name="Existing", roll_number="STU0002", email="s2@example.com")
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Physics", classroom="R1",
+            date=timezone.localdate() - timedelta(days=1), time=time(9, 0),
+        )
+        stats.rebuild_counters()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, name, data, args=()):
+        return self.client.post(reverse(name, args=args), data, content_type="application/json")
+
+    def test_views_stay_within_budget(self):
+        responses = [
+            # Before any student_* view, so this is the first-visit path that
+            # also creates the Student row.
+            self.post("mark_attendance", {"remedial_code": self.makeup.remedial_code}),
+            self.client.get(reverse("student_history")),
+            self.client.get(reverse("student_metrics")),
+            self.client.get(reverse("student_dashboard")),
+            self.post("mark_attendance_bulk", {"records": [
+                {"roll_number": "STU0002", "remedial_code": self.makeup.remedial_code},
+            ]}),
+            self.client.get(reverse("dashboard_data")),
+            self.client.get(reverse("faculty_classes")),
+            self.client.get(reverse("class_roster", args=(self.makeup.id,))),
+            self.client.get(reverse("classroom_free_slots"), {
+                "classroom": "R1", "date_from": "2030-01-01", "date_to": "2030-01-31",
+            }),
+            self.client.get(reverse("ai_analytics"), {"granularity": "day"}),
+            self.client.get(reverse("slot_recommendations"), {"subject": "Physics"}),
+            self.client.get(reverse("forecast_turnout"), {"days": 90}),
+            self.client.get(reverse("export_attendance")),
+            self.post("create_class", {
+                "subject": "Biology", "classroom": "R2", "date": "2030-01-01", "time": "10:00",
+            }),
+            self.post("schedule_classes", {
+                "subject": "Biology", "classrooms": ["R2", "R3"], "start_date": "2030-01-01",
+                "time": "10:00", "frequency": "weekly", "count": 12,
+            }),
+            self.post("edit_class", {
+                "subject": "Chemistry", "classroom": "R1",
+                "date": self.makeup.date.isoformat(), "time": "09:00",
+            }, args=(self.makeup.id,)),
+            self.post("delete_class", {}, args=(self.makeup.id,)),
+        ]
+
+        for response in responses:
+            self.assertLess(response.status_code, 400, response.request["PATH_INFO"])
+            self.assertIn('desc="', response["Server-Timing"])
+
+    def test_over_budget_raises(self):
+        original = views.dashboard_data.query_budget
+        self.addCleanup(setattr, views.dashboard_data, "query_budget", original)
+        views.dashboard_data.query_budget = 0
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse("dashboard_data"))
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("dashboard_data"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('makeup_requests_total{view="dashboard_data"}', response.content.decode())
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class AsyncViewTests(TestCase):
+    # The async read APIs served through the ASGI request path, with the
+    # metrics middleware counting queries run in the sync executor thread.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU0003", password="pw", is_staff=True)
+        student = Student.objects.create(name="Async", roll_number="STU0003", email="s3@example.com")
+        makeup = MakeUpClass.objects.create(
+            subject="Biology", classroom="R3",
+            date=timezone.localdate() - timedelta(days=2), time=time(11, 0),
+        )
+        Attendance.objects.create(student=student, makeup_class=makeup)
+        stats.rebuild_counters()
+
+    async def test_read_apis(self):
+        await self.async_client.aforce_login(self.user)
+
+        history = await self.async_client.get(reverse("student_history"))
+        self.assertEqual([r["subject"] for r in history.json()["records"]], ["Biology"])
+
+        student_metrics = (await self.async_client.get(reverse("student_metrics"))).json()
+        self.assertEqual(student_metrics["total_sessions"], 1)
+        self.assertEqual(student_metrics["pending_sessions"], 0)
+
+        dashboard = await self.async_client.get(reverse("dashboard_data"))
+        self.assertEqual(dashboard.json()["total_attendance"], 1)
+        self.assertEqual(dashboard.json()["recent_activity"][0]["subject"], "Biology")
+        self.assertNotIn('desc="0 queries"', dashboard["Server-Timing"])
+
+        analytics = await self.async_client.get(reverse("ai_analytics"))
+        self.assertEqual(sum(b["attendance"] for b in analytics.json()["trend"]), 1)
+
+    async def test_staff_required(self):
+        response = await self.async_client.get(reverse("dashboard_data"))
+        self.assertRedirects(response, reverse("admin_login"), fetch_redirect_response=False)
+
+
+class StudentDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU0004", password="pw")
+        student = Student.objects.create(name="Dash", roll_number="STU0004", email="s4@example.com")
+        for day in range(5):
+            makeup = MakeUpClass.objects.create(
+                subject=f"Subject {day}", classroom="R4",
+                date=timezone.localdate() - timedelta(days=day + 1), time=time(9, 0),
+            )
+            Attendance.objects.create(student=student, makeup_class=makeup)
+        MakeUpClass.objects.create(
+            subject="Upcoming", classroom="R4",
+            date=timezone.localdate() + timedelta(days=3), time=time(9, 0),
+        )
+        stats.rebuild_counters()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_metrics_and_history_pages(self):
+        url = reverse("student_dashboard")
+        first = self.client.get(url, {"limit": 3}).json()
+
+        self.assertEqual(first["total_sessions"], 5)
+        self.assertEqual(first["pending_sessions"], 1)
+        self.assertEqual(len(first["records"]), 3)
+        self.assertIsNotNone(first["next_cursor"])
+
+        second = self.client.get(url, {"limit": 3, "cursor": first["next_cursor"]}).json()
+        self.assertEqual(second["total_sessions"], 5)
+        self.assertEqual(len(second["records"]), 2)
+        self.assertIsNone(second["next_cursor"])
+
+        subjects = [r["subject"] for r in first["records"] + second["records"]]
+        self.assertEqual(len(set(subjects)), 5)
+
+    def test_student_mapping_is_cached_on_the_session(self):
+        url = reverse("student_dashboard")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        student_table = Student._meta.db_table
+        self.assertFalse([q for q in ctx.captured_queries if student_table in q["sql"]])
+
+    def test_new_student_without_attendance(self):
+        self.client.force_login(User.objects.create_user("STU0005", password="pw"))
+        data = self.client.get(reverse("student_dashboard")).json()
+
+        self.assertEqual(data["records"], [])
+        self.assertEqual(data["total_sessions"], 0)
+        self.assertEqual(data["pending_sessions"], 6)
+        self.assertTrue(Student.objects.filter(roll_number="STU0005").exists())
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU0006", password="pw", is_staff=True)
+        cls.student = Student.objects.create(name="Cond", roll_number="STU0006", email="s6@example.com")
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Physics", classroom="R6",
+            date=timezone.localdate() - timedelta(days=1), time=time(9, 0),
+        )
+        Attendance.objects.create(student=cls.student, makeup_class=cls.makeup)
+        stats.rebuild_counters()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def revalidate(self, name, etag):
+        return self.client.get(reverse(name), headers={"if-none-match": etag})
+
+    def test_unchanged_data_answers_304_without_aggregates(self):
+        for name in ("dashboard_data", "faculty_classes", "student_history",
+                     "student_metrics", "student_dashboard", "ai_analytics"):
+            first = self.client.get(reverse(name))
+            self.assertEqual(first.status_code, 200, name)
+            self.assertIn("no-cache", first["Cache-Control"])
+
+            with CaptureQueriesContext(connection) as ctx:
+                again = self.revalidate(name, first["ETag"])
+            self.assertEqual(again.status_code, 304, name)
+            self.assertEqual(again["ETag"], first["ETag"])
+
+            for query in ctx.captured_queries:
+                self.assertNotIn(Attendance._meta.db_table, query["sql"], name)
+                self.assertNotIn("rollup", query["sql"], name)
+
+    def test_writes_change_the_etag(self):
+        dashboard = self.client.get(reverse("dashboard_data"))["ETag"]
+        history = self.client.get(reverse("student_history"))["ETag"]
+
+        other = MakeUpClass.objects.create(
+            subject="Biology", classroom="R7",
+            date=timezone.localdate() - timedelta(days=2), time=time(9, 0),
+        )
+        self.assertEqual(self.revalidate("dashboard_data", dashboard).status_code, 200)
+
+        dashboard = self.client.get(reverse("dashboard_data"))["ETag"]
+        Attendance.objects.create(student=self.student, makeup_class=other)
+        self.assertEqual(self.revalidate("dashboard_data", dashboard).status_code, 200)
+        self.assertEqual(self.revalidate("student_history", history).status_code, 200)
+
+        # Edits don't change any count but still invalidate.
+        history = self.client.get(reverse("student_history"))["ETag"]
+        self.makeup.subject = "Chemistry"
+        self.makeup.save()
+        self.assertEqual(self.revalidate("student_history", history).status_code, 200)
+
+    def test_etag_depends_on_query_and_user(self):
+        url = reverse("ai_analytics")
+        month = self.client.get(url)["ETag"]
+        day = self.client.get(url, {"granularity": "day"})["ETag"]
+        self.assertNotEqual(month, day)
+
+        self.client.force_login(User.objects.create_user("STU0007", password="pw", is_staff=True))
+        self.assertEqual(self.revalidate("ai_analytics", month).status_code, 200)
+
+
+class EventStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU0008", password="pw", is_staff=True)
+        cls.student = Student.objects.create(name="Live", roll_number="STU0008", email="s8@example.com")
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Physics", classroom="R8",
+            date=timezone.localdate(), time=time(23, 59),
+        )
+        stats.rebuild_counters()
+
+    def setUp(self):
+        self.addCleanup(events.broker.stop_listener)
+
+    @staticmethod
+    def parse(chunk):
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        return json.loads(chunk.removeprefix("data: "))
+
+    async def test_stream_sends_snapshot_then_events(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("event_stream"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        received = asyncio.Queue()
+
+        async def consume():
+            async for chunk in response.streaming_content:
+                await received.put(self.parse(chunk))
+
+        release = mock.patch.object(views, "_release_connections", wraps=views._release_connections)
+        with release as released:
+            client = asyncio.create_task(consume())
+            snapshot = await asyncio.wait_for(received.get(), 1)
+        self.assertEqual(snapshot["type"], "snapshot")
+        self.assertEqual(snapshot["counts"]["classes"], 1)
+        # The stream gives its connection back once the snapshot is read.
+        released.assert_called_once_with()
+
+        events.broker.deliver({"type": "class.deleted", "data": {"id": 1}, "counts": {}})
+        self.assertEqual((await asyncio.wait_for(received.get(), 1))["type"], "class.deleted")
+
+        # A disconnecting client cancels the response task.
+        client.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await client
+        self.assertEqual(events.broker.subscriber_count(), 0)
+
+    async def test_marks_are_published_on_commit(self):
+        queue = events.broker.subscribe()
+        self.addCleanup(events.broker.unsubscribe, queue)
+
+        def mark():
+            with self.captureOnCommitCallbacks(execute=True):
+                attendance.mark_one(self.student.id, self.makeup.id)
+
+        with mock.patch.object(events, "BACKEND", "local"):
+            await sync_to_async(mark)()
+
+        event = await asyncio.wait_for(queue.get(), 1)
+        self.assertEqual(event["type"], "attendance.marked")
+        self.assertEqual(event["data"]["classes"], {str(self.makeup.id): 1})
+        self.assertEqual(event["subjects"], {str(self.makeup.id): "Physics"})
+        self.assertEqual(event["counts"]["attendance"], 1)
+
+    def test_local_publish_without_subscribers_queries_nothing(self):
+        with mock.patch.object(events, "BACKEND", "local"), self.assertNumQueries(0):
+            events.publish({"type": "attendance.marked", "data": {}}, [self.makeup.id])
+
+    def test_wsgi_gets_snapshot_and_retry(self):
+        self.client.force_login(self.user)
+        body = self.client.get(reverse("event_stream")).content.decode()
+
+        retry, data = body.split("\n", 1)
+        self.assertTrue(retry.startswith("retry: "))
+        self.assertEqual(self.parse(data.strip())["type"], "snapshot")
+
+
+@skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY needs PostgreSQL")
+class PostgresEventTests(TransactionTestCase):
+
+    def test_notify_reaches_subscribers(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def subscribe():
+            return events.broker.subscribe()
+
+        queue = loop.run_until_complete(subscribe())
+        self.addCleanup(events.broker.unsubscribe, queue)
+        self.addCleanup(events.broker.stop_listener)
+        self.assertTrue(events.broker._listener.ready.wait(5))
+
+        makeup = MakeUpClass.objects.create(
+            subject="Biology", classroom="R9",
+            date=timezone.localdate(), time=time(23, 59),
+        )
+
+        event = loop.run_until_complete(asyncio.wait_for(queue.get(), 5))
+        self.assertEqual(event["type"], "class.created")
+        self.assertEqual(event["data"]["class"]["id"], makeup.id)
+        self.assertEqual(event["counts"]["classes"], 1)
+
+        # Subjects for a few hundred classes push the NOTIFY past its
+        # 8000-byte limit; subscribers get a resync instead of nothing.
+        MakeUpClass.objects.bulk_create(
+            MakeUpClass(
+                subject="S" * 90, classroom=f"N{i}", date=date(2030, 1, 7), time=time(10, 0),
+                remedial_code=f"RC-N{i:03d}",
+            )
+            for i in range(100)
+        )
+        events.emit("attendance.marked", {}, MakeUpClass.objects.filter(
+            classroom__startswith="N"
+        ).values_list("id", flat=True))
+
+        event = loop.run_until_complete(asyncio.wait_for(queue.get(), 5))
+        self.assertEqual(event, events.RESYNC)
+
+
+class CodePoolTests(TestCase):
+
+    def test_check_character_catches_typos(self):
+        code = code_pool.generate()
+        self.assertTrue(code_pool.is_valid(code))
+        self.assertEqual(len(code), code_pool.CODE_LENGTH)
+
+        body = code[len(code_pool.PREFIX):]
+        for i, ch in enumerate(body):
+            for other in code_pool.ALPHABET.replace(ch, ""):
+                typo = code_pool.PREFIX + body[:i] + other + body[i + 1:]
+                self.assertFalse(code_pool.is_valid(typo), typo)
+
+        self.assertTrue(code_pool.is_valid("RC-A3F2E1"))
+        self.assertFalse(code_pool.is_valid("RC-A3F2E"))
+        self.assertFalse(code_pool.is_valid(None))
+
+    def test_typos_are_rejected_without_a_query(self):
+        makeup = MakeUpClass.objects.create(
+            subject="Maths", classroom="A1", date=date(2030, 1, 1), time=time(9, 0)
+        )
+        code = makeup.remedial_code
+        typo = code[:-1] + code_pool.ALPHABET[code_pool.ALPHABET.index(code[-1]) - 1]
+
+        codes.reset()
+        with self.assertNumQueries(0):
+            self.assertIsNone(codes.resolve_class_id(typo))
+        self.assertEqual(codes.resolve_class_id(code), makeup.id)
+
+    def test_allocate_refills_an_empty_pool(self):
+        self.assertEqual(code_pool.free_count(), 0)
+
+        allocated = code_pool.allocate(3)
+
+        self.assertEqual(len(set(allocated)), 3)
+        self.assertTrue(all(code_pool.is_valid(c) for c in allocated))
+        self.assertEqual(code_pool.free_count(), code_pool.REFILL_BATCH - 3)
+
+        with self.assertNumQueries(1):
+            self.assertNotIn(code_pool.allocate(1)[0], allocated)
+
+    def test_classes_take_codes_from_the_pool(self):
+        code_pool.top_up(10)
+        makeup = MakeUpClass.objects.create(
+            subject="Maths", classroom="A1", date=date(2030, 1, 1), time=time(9, 0)
+        )
+
+        pooled = RemedialCode.objects.get(code=makeup.remedial_code)
+        self.assertIsNotNone(pooled.allocated_at)
+        self.assertEqual(code_pool.free_count(), 9)
+
+
+@skipIf(connection.vendor == "sqlite", "needs a database with concurrent writers")
+class CodePoolConcurrencyTests(TransactionTestCase):
+
+    def test_parallel_creates_get_distinct_codes(self):
+        code_pool.top_up(20)
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def create():
+            try:
+                barrier.wait()
+                MakeUpClass.objects.create(
+                    subject="Maths", classroom="A1", date=date(2030, 1, 1), time=time(9, 0)
+                )
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=create) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        created = MakeUpClass.objects.values_list("remedial_code", flat=True)
+        self.assertEqual(len(set(created)), workers)
+        self.assertEqual(
+            RemedialCode.objects.filter(allocated_at__isnull=False).count(), workers
+        )
+
+
+class ScheduleClassesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC001", password="pw", is_staff=True)
+        MakeUpClass.objects.create(
+            subject="Physics", classroom="R2", date=date(2030, 1, 14), time=time(10, 0)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def schedule(self, **rule):
+        return self.client.post(
+            reverse("schedule_classes"), rule, content_type="application/json"
+        )
+
+    def test_weekly_rule_across_rooms(self):
+        response = self.schedule(
+            subject="Maths", classrooms=["R1", "R2"], start_date="2030-01-07",
+            time="10:00", frequency="weekly", count=12, exclude_dates=["2030-02-04"],
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 22)
+        self.assertEqual(response.json()["summary"], {"created": 21, "conflict": 1})
+        self.assertEqual(
+            [r["status"] for r in results if r["date"] == "2030-01-14"],
+            ["created", "conflict"],
+        )
+
+        created = [r for r in results if r["status"] == "created"]
+        self.assertEqual(len({r["remedial_code"] for r in created}), 21)
+        self.assertTrue(all(code_pool.is_valid(r["remedial_code"]) for r in created))
+        self.assertEqual(MakeUpClass.objects.filter(subject="Maths").count(), 21)
+        self.assertEqual(stats.get_counts()["classes"], 22)
+        self.assertEqual(codes.resolve_class_id(created[0]["remedial_code"]), created[0]["id"])
+
+    def test_past_rows_are_skipped(self):
+        start = timezone.localdate() - timedelta(days=3)
+        response = self.schedule(
+            subject="Maths", classroom="R5", start_date=start.isoformat(),
+            time="10:00", frequency="daily", until=(start + timedelta(days=5)).isoformat(),
+        )
+
+        statuses = [r["status"] for r in response.json()["results"]]
+        self.assertEqual(statuses[:3], ["past"] * 3)
+        self.assertEqual(statuses[4:], ["created"] * 2)
+
+    def test_expand_weekdays_and_interval(self):
+        occurrences = scheduling.expand({
+            "subject": "Maths", "classroom": "R1", "start_date": "2030-01-02",
+            "time": "09:00", "frequency": "weekly", "interval": 2,
+            "weekdays": [0, 2], "count": 4,
+        })
+        self.assertEqual(
+            [o.date for o in occurrences],
+            [date(2030, 1, 2), date(2030, 1, 14), date(2030, 1, 16), date(2030, 1, 28)],
+        )
+
+    def test_invalid_rules(self):
+        for rule in (
+            {"classroom": "R1", "start_date": "2030-01-07", "time": "10:00"},
+            {"subject": "Maths", "classroom": "R1", "start_date": "2030-01-07",
+             "time": "10:00", "frequency": "weekly"},
+            {"subject": "Maths", "classroom": "R1", "start_date": "2030-01-07",
+             "time": "10:00", "frequency": "daily", "count": 1000},
+        ):
+            self.assertEqual(self.schedule(**rule).status_code, 400, rule)
+        self.assertEqual(MakeUpClass.objects.count(), 1)
+
+
+class DoubleBookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC002", password="pw", is_staff=True)
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Maths", classroom="R1", date=date(2030, 1, 7),
+            time=time(10, 0), duration_minutes=90,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, classroom, at, **extra):
+        return self.client.post(reverse("create_class"), {
+            "subject": "Physics", "classroom": classroom, "date": "2030-01-07", "time": at, **extra,
+        }, content_type="application/json")
+
+    def test_ends_at_follows_duration(self):
+        row = MakeUpClass.objects.values("starts_at", "ends_at").get(id=self.makeup.id)
+        self.assertEqual(row["ends_at"] - row["starts_at"], timedelta(minutes=90))
+
+    def test_overlapping_class_is_rejected(self):
+        clash = self.create("R1", "11:00")
+        self.assertEqual(clash.status_code, 409)
+        self.assertEqual([c["id"] for c in clash.json()["conflicts"]], [self.makeup.id])
+
+        self.assertEqual(self.create("R1", "11:30").status_code, 201)
+        self.assertEqual(self.create("R2", "10:00", duration=30).status_code, 201)
+        self.assertEqual(self.create("R1", "09:00", duration=61).status_code, 409)
+        self.assertEqual(self.create("R1", "09:00", duration=0).status_code, 400)
+
+    def test_edit_checks_other_classes_only(self):
+        other = MakeUpClass.objects.create(
+            subject="Physics", classroom="R1", date=date(2030, 1, 7), time=time(14, 0)
+        )
+
+        def edit(obj, at):
+            return self.client.post(reverse("edit_class", args=(obj.id,)), {
+                "subject": obj.subject, "classroom": "R1", "date": "2030-01-07", "time": at,
+            }, content_type="application/json")
+
+        self.assertEqual(edit(self.makeup, "10:30").status_code, 200)
+        self.assertEqual(edit(other, "11:00").status_code, 409)
+        self.makeup.refresh_from_db()
+        self.assertEqual(self.makeup.duration_minutes, 90)
+
+    def test_free_slots(self):
+        response = self.client.get(reverse("classroom_free_slots"), {
+            "classroom": "R1", "date_from": "2030-01-07", "date_to": "2030-01-08",
+            "duration": "60", "day_start": "08:00", "day_end": "18:00",
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["slots"], [
+            {"date": "2030-01-07", "start": "08:00", "end": "10:00"},
+            {"date": "2030-01-07", "start": "11:30", "end": "18:00"},
+            {"date": "2030-01-08", "start": "08:00", "end": "18:00"},
+        ])
+
+    def test_interval_index(self):
+        index = bookings.IntervalIndex()
+        base = timezone.make_aware(datetime_at(2030, 1, 1, 8))
+        for i in range(20000):
+            start = base + timedelta(hours=i)
+            index.add("R1", bookings.Booking(start, start + timedelta(minutes=45), i, "Maths"))
+
+        probe = base + timedelta(hours=12345, minutes=30)
+        self.assertEqual(
+            [b.id for b in index.conflicts("R1", probe, probe + timedelta(hours=1))], [12345, 12346]
+        )
+        probe -= timedelta(minutes=20)
+        self.assertEqual(
+            [b.id for b in index.conflicts("R1", probe, probe + timedelta(minutes=30))], [12345]
+        )
+        self.assertEqual(index.conflicts("R2", probe, probe + timedelta(hours=1)), [])
+
+    @skipUnless(connection.vendor == "postgresql", "the exclusion constraint is PostgreSQL only")
+    def test_database_rejects_double_booking(self):
+        with self.assertRaises(IntegrityError):
+            MakeUpClass.objects.create(
+                subject="Physics", classroom="R1", date=date(2030, 1, 7), time=time(11, 0)
+            )
+
+    @skipIf(connection.vendor == "postgresql", "the exclusion constraint prevents the clash")
+    def test_find_double_bookings(self):
+        clash = MakeUpClass.objects.create(
+            subject="Physics", classroom="R1", date=date(2030, 1, 7), time=time(11, 0)
+        )
+        self.assertEqual(list(bookings.find_double_bookings()), [(self.makeup.id, clash.id)])
+
+    def test_seed_load_never_double_books(self):
+        # Three days of history hold 40 rooms x 20 half-hour starts each, so
+        # random placement alone would clash many times over.
+        call_command(
+            "seed_load", students=10, classes=400, days=3, upcoming=0, density=0, seed=4,
+            stdout=mock.Mock(),
+        )
+        self.assertEqual(MakeUpClass.objects.count(), 401)
+        self.assertEqual(list(bookings.find_double_bookings()), [])
+
+
+class SlotRecommendationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC003", password="pw", is_staff=True)
+        students = [
+            Student.objects.create(name=f"S{i}", roll_number=f"REC{i:03d}", email=f"rec{i}@example.com")
+            for i in range(6)
+        ]
+        monday = date(2025, 1, 6)
+
+        # Physics does well in R1 on Monday mornings, poorly in R2 on Monday
+        # afternoons; R3 only ever hosted Maths, which nobody attended.
+        for week, (room, at, attended) in enumerate(
+            [("R1", time(9, 0), 6), ("R1", time(9, 0), 5), ("R2", time(14, 0), 1), ("R2", time(14, 0), 2)]
+        ):
+            makeup = MakeUpClass.objects.create(
+                subject="Physics", classroom=room, date=monday + timedelta(weeks=week), time=at
+            )
+            Attendance.objects.bulk_create(
+                Attendance(student=s, makeup_class=makeup) for s in students[:attended]
+            )
+        MakeUpClass.objects.create(subject="Maths", classroom="R3", date=monday, time=time(11, 0))
+        stats.rebuild_counters()
+
+    def setUp(self):
+        recommendations.reset()
+        self.addCleanup(recommendations.reset)
+        self.client.force_login(self.user)
+
+    def test_ranks_slots_by_expected_attendance(self):
+        response = self.client.get(reverse("slot_recommendations"), {"subject": "Physics"})
+
+        self.assertEqual(response.status_code, 200)
+        slots = response.json()["recommendations"]
+        self.assertEqual(
+            [(s["classroom"], s["day"], s["time"]) for s in slots],
+            [("R1", "Monday", "09:00"), ("R3", "Monday", "11:00"), ("R2", "Monday", "14:00")],
+        )
+        self.assertEqual(slots[0]["subject_classes"], 2)
+        self.assertEqual(slots[1]["subject_classes"], 0)
+
+        self.assertEqual(
+            self.client.get(reverse("slot_recommendations"), {"subject": "Physics", "limit": 1})
+            .json()["recommendations"][0]["classroom"], "R1"
+        )
+        self.assertEqual(self.client.get(reverse("slot_recommendations")).status_code, 400)
+
+    def test_booked_upcoming_classes_are_not_held(self):
+        url = reverse("slot_recommendations")
+        before = self.client.get(url, {"subject": "Physics"}).json()["recommendations"]
+
+        upcoming = timezone.localdate() + timedelta(days=7 - timezone.localdate().weekday())
+        scheduling.schedule(scheduling.expand({
+            "subject": "Physics", "classrooms": ["R1"], "start_date": upcoming.isoformat(),
+            "time": "09:00", "frequency": "weekly", "count": 12,
+        }))
+        after = self.client.get(url, {"subject": "Physics"}).json()["recommendations"]
+        self.assertEqual(after, before)
+
+        # Once one of them has started it counts, empty or not.
+        MakeUpClass.objects.filter(classroom="R1", date=upcoming).update(
+            date=upcoming - timedelta(weeks=52)
+        )
+        top = self.client.get(url, {"subject": "Physics"}).json()["recommendations"][0]
+        self.assertEqual((top["classroom"], top["subject_classes"]), ("R1", 3))
+        self.assertLess(top["expected_attendance"], before[0]["expected_attendance"])
+
+    def test_model_is_rebuilt_only_for_new_data(self):
+        url = reverse("slot_recommendations")
+        with mock.patch.object(recommendations, "load_rows", wraps=recommendations.load_rows) as load:
+            self.client.get(url, {"subject": "Physics"})
+            self.client.get(url, {"subject": "Maths"})
+            self.assertEqual(load.call_count, 1)
+
+            student = Student.objects.get(roll_number="REC005")
+            Attendance.objects.create(
+                student=student, makeup_class=MakeUpClass.objects.get(subject="Maths")
+            )
+            self.client.get(url, {"subject": "Physics"})
+            self.assertEqual(load.call_count, 2)
+
+    def test_cached_recommendation_is_fast(self):
+        rng = random.Random(7)
+        rows = [
+            (f"R{rng.randrange(60)}", f"Subject {rng.randrange(40)}", rng.randint(1, 7),
+             rng.randrange(8, 20), rng.randint(1, 5), rng.randrange(200))
+            for _ in range(50000)
+        ]
+        model = recommendations.SlotModel(rows)
+        model.recommend("Subject 3")
+
+        started = timezone.now()
+        for _ in range(20):
+            model.recommend("Subject 3")
+        self.assertLess((timezone.now() - started) / 20, timedelta(milliseconds=100))
+
+
+class TurnoutForecastTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC004", password="pw", is_staff=True)
+        cls.students = [
+            Student.objects.create(name=f"S{i}", roll_number=f"FC{i:03d}", email=f"fc{i}@example.com")
+            for i in range(8)
+        ]
+        cls.monday = timezone.localdate() - timedelta(days=timezone.localdate().weekday() + 7)
+
+    def setUp(self):
+        forecasting.reset()
+        self.addCleanup(forecasting.reset)
+        self.client.force_login(self.user)
+
+    def held(self, subject, day, at, attended):
+        makeup = MakeUpClass.objects.create(subject=subject, classroom="R1", date=day, time=at)
+        for student in self.students[:attended]:
+            attendance.mark_one(student.id, makeup.id)
+        return makeup
+
+    def stats(self):
+        return set(TurnoutStat.objects.values_list("subject", "weekday", "hour", "classes", "attended"))
+
+    def test_marks_update_statistics_incrementally(self):
+        first = self.held("Physics", self.monday, time(9, 0), 3)
+        self.held("Physics", self.monday - timedelta(weeks=1), time(9, 0), 5)
+        self.assertEqual(self.stats(), {("Physics", 1, 9, 2, 8)})
+
+        attendance.mark_bulk([("FC007", first.remedial_code)])
+        Attendance.objects.filter(makeup_class=first, student=self.students[0]).delete()
+        self.assertEqual(self.stats(), {("Physics", 1, 9, 2, 8)})
+
+        first.delete()
+        self.assertEqual(self.stats(), {("Physics", 1, 9, 1, 5)})
+
+        # A class nobody came to only counts once refit.
+        self.held("Physics", self.monday + timedelta(days=1), time(9, 0), 0)
+        incremental = self.stats()
+        forecasting.refit()
+        self.assertEqual(self.stats(), incremental | {("Physics", 2, 9, 1, 0)})
+
+    def test_deleting_empty_past_classes_keeps_statistics_non_negative(self):
+        at = time(7, 0)
+        self.held("Physics", self.monday, at, 1)
+        empty = [self.held("Physics", self.monday - timedelta(weeks=w), at, 0) for w in range(1, 5)]
+        self.assertEqual(self.stats(), {("Physics", 1, 7, 1, 1)})
+
+        # Only the attended class was counted as held, so only it is taken back.
+        for makeup in empty:
+            makeup.delete()
+        self.assertEqual(self.stats(), {("Physics", 1, 7, 1, 1)})
+
+        # Statistics that drifted negative anyway still forecast.
+        TurnoutStat.objects.update(classes=-3)
+        MakeUpClass.objects.create(
+            subject="Physics", classroom="R2", date=self.monday + timedelta(weeks=2), time=at
+        )
+        response = self.client.get(reverse("forecast_turnout"), {"days": 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["classes"]), 1)
+
+    def test_seed_load_fits_the_forecast(self):
+        call_command(
+            "seed_load", students=20, classes=15, days=30, upcoming=0, density=0.3, seed=6,
+            stdout=mock.Mock(),
+        )
+        seeded = self.stats()
+        self.assertTrue(seeded)
+        forecasting.refit()
+        self.assertEqual(self.stats(), seeded)
+
+    def test_marks_read_the_class_count(self):
+        makeup = self.held("Physics", self.monday, time(9, 0), 2)
+        # One upsert, held-ness read from attendance_count rather than a
+        # recount of the class's rows.
+        with self.assertNumQueries(1):
+            forecasting.add_marks({makeup.id: 1})
+        self.assertEqual(self.stats(), {("Physics", 1, 9, 1, 3)})
+
+    def test_migration_backfills_existing_classes(self):
+        self.held("Physics", self.monday, time(9, 0), 3)
+        self.held("Physics", self.monday + timedelta(days=1), time(9, 0), 0)
+        forecasting.refit()
+        fitted = self.stats()
+        TurnoutStat.objects.update(classes=0, attended=0)
+
+        backfill = import_module("makeup_backend.migrations.0013_backfill_turnoutstat")
+        backfill.backfill_turnout(django_apps, None)
+        self.assertEqual(self.stats(), fitted)
+
+    def test_forecast_follows_weekday_and_hour(self):
+        for week in range(4):
+            self.held("Physics", self.monday - timedelta(weeks=week), time(9, 0), 8)
+            self.held("Physics", self.monday - timedelta(weeks=week) + timedelta(days=4), time(16, 0), 2)
+
+        upcoming_monday = self.monday + timedelta(weeks=2)
+        MakeUpClass.objects.create(subject="Physics", classroom="R2", date=upcoming_monday, time=time(9, 0))
+        MakeUpClass.objects.create(
+            subject="Physics", classroom="R2", date=upcoming_monday + timedelta(days=4), time=time(16, 0)
+        )
+
+        response = self.client.get(reverse("forecast_turnout"), {"days": 30})
+        self.assertEqual(response.status_code, 200)
+        monday_class, friday_class = response.json()["classes"]
+        self.assertGreater(monday_class["expected_attendance"], 6)
+        self.assertLess(friday_class["expected_attendance"], 4)
+        self.assertEqual(monday_class["based_on_classes"], 8)
+
+        self.assertEqual(self.client.get(reverse("forecast_turnout"), {"days": 0}).status_code, 400)
+
+    def test_model_is_served_from_memory(self):
+        self.held("Physics", self.monday, time(9, 0), 4)
+        url = reverse("forecast_turnout")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"subject": "Physics"})
+        self.assertFalse(any("turnoutstat" in q["sql"].lower() for q in queries))
+
+        call_command("refit_forecast", stdout=mock.Mock())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"subject": "Physics"})
+        self.assertTrue(any("turnoutstat" in q["sql"].lower() for q in queries))
+
+
+class AttendanceBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU0100", password="pw", is_staff=True)
+        cls.student = Student.objects.create(name="Buffered", roll_number="STU0100", email="b@example.com")
+        cls.other = Student.objects.create(name="Other", roll_number="STU0101", email="o@example.com")
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Physics", classroom="R1", date=date(2030, 1, 7), time=time(9, 0)
+        )
+        stats.rebuild_counters()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.buffer = attendance_buffer.AttendanceBuffer(os.path.join(directory.name, "buffer.sqlite3"))
+        patcher = mock.patch.object(attendance_buffer, "buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_flush_keeps_mark_time_and_is_idempotent(self):
+        marked_at = timezone.now() - timedelta(minutes=5)
+        self.assertTrue(self.buffer.enqueue(self.student.id, self.makeup.id, marked_at))
+        self.assertFalse(self.buffer.enqueue(self.student.id, self.makeup.id))
+        self.assertTrue(self.buffer.enqueue(self.other.id, self.makeup.id))
+        self.assertTrue(self.buffer.enqueue(self.other.id, 999999))
+        self.assertEqual(self.buffer.stats()["pending"], 3)
+
+        self.assertEqual(self.buffer.drain(), 3)
+        row = Attendance.objects.get(student=self.student)
+        self.assertEqual(row.marked_at.replace(microsecond=0), marked_at.replace(microsecond=0))
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(stats.get_counts()["attendance"], 2)
+        self.assertEqual(self.buffer.stats()["pending"], 0)
+
+        # A batch flushed again (its process died before recording the
+        # flush) inserts nothing twice.
+        self.assertEqual(attendance.insert_marks([
+            (self.student.id, self.makeup.id, marked_at), (self.other.id, self.makeup.id, marked_at)
+        ]), 0)
+        self.assertEqual(stats.get_counts()["attendance"], 2)
+
+    def test_claims_of_a_crashed_flusher_are_retried(self):
+        self.buffer.enqueue(self.student.id, self.makeup.id)
+        self.assertEqual(len(self.buffer._claim(10)), 1)
+
+        # The claim is still fresh, so another flusher leaves it alone...
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertGreater(self.buffer.stats()["lag_seconds"], 0)
+
+        # ...until CLAIM_TIMEOUT has passed.
+        with mock.patch.object(attendance_buffer, "CLAIM_TIMEOUT", -1):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertTrue(Attendance.objects.filter(student=self.student).exists())
+
+    def test_failed_flush_releases_claim(self):
+        self.buffer.enqueue(self.student.id, self.makeup.id)
+        with mock.patch.object(attendance, "insert_marks", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.flush(), 1)
+
+    @mock.patch.object(attendance_buffer.AttendanceBuffer, "ensure_flusher")
+    def test_flusher_starts_with_the_app(self, ensure_flusher):
+        app = django_apps.get_app_config("makeup_backend")
+        app.ready()
+        ensure_flusher.assert_not_called()
+
+        with mock.patch.object(attendance_buffer, "ENABLED", True):
+            app.ready()
+        ensure_flusher.assert_called_once_with()
+
+    def test_flusher_drains_on_stop(self):
+        self.buffer.enqueue(self.student.id, self.makeup.id)
+        with mock.patch.object(self.buffer, "drain") as drain:
+            flusher = attendance_buffer.BufferFlusher(self.buffer)
+            flusher.start()
+            flusher.stop()
+        drain.assert_called()
+
+    @mock.patch.object(attendance_buffer, "ENABLED", True)
+    @mock.patch.object(attendance_buffer.AttendanceBuffer, "ensure_flusher")
+    def test_view_acknowledges_from_buffer(self, ensure_flusher):
+        self.client.force_login(self.user)
+        url = reverse("mark_attendance")
+        body = {"remedial_code": self.makeup.remedial_code}
+        self.client.post(url, body, content_type="application/json")
+        Attendance.objects.all().delete()
+        self.buffer._db().execute("DELETE FROM marks")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(any("attendance" in q["sql"].lower() for q in queries))
+        self.assertFalse(Attendance.objects.exists())
+        ensure_flusher.assert_called()
+
+        self.assertEqual(self.client.post(url, body, content_type="application/json").status_code, 409)
+        self.buffer.drain()
+        self.assertTrue(Attendance.objects.filter(student=self.student, makeup_class=self.makeup).exists())
+        self.assertIn(
+            "makeup_attendance_buffer_pending 0", self.client.get(reverse("metrics")).content.decode()
+        )
+
+
+class DatabaseRoutingTests(TestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_decorated_views_read_from_replica(self):
+        seen = {}
+
+        @routers.read_replica
+        def view(request):
+            seen["sync"] = self.router.db_for_read(Attendance)
+            return seen["sync"]
+
+        @routers.read_replica
+        async def async_view(request):
+            seen["async"] = await sync_to_async(self.router.db_for_read)(Attendance)
+
+        with mock.patch.object(routers, "replica_configured", return_value=True):
+            view(None)
+            asyncio.run(async_view(None))
+            self.assertIsNone(self.router.db_for_read(Attendance))
+
+        self.assertEqual(seen, {"sync": "replica", "async": "replica"})
+        self.assertEqual(self.router.db_for_write(Attendance), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate("replica", "makeup_backend"))
+
+    def test_replica_alias_must_point_elsewhere(self):
+        primary = connections.settings[DEFAULT_DB_ALIAS]
+        with mock.patch.dict(connections.settings, {"replica": dict(primary)}):
+            self.assertFalse(routers.replica_configured())
+        with mock.patch.dict(connections.settings, {"replica": {**primary, "HOST": "replica.internal"}}):
+            self.assertTrue(routers.replica_configured())
+        self.assertFalse(routers.replica_configured())
+
+    def test_database_settings_from_environment(self):
+        from makeup_class import settings as project_settings
+
+        with mock.patch.dict(os.environ, {"DB_HOST": "db.internal", "DB_CONN_MAX_AGE": "none"}):
+            database = project_settings._database("DB")
+        self.assertEqual(database["HOST"], "db.internal")
+        self.assertIsNone(database["CONN_MAX_AGE"])
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+
+        with mock.patch.dict(os.environ, {"DB_CONN_MAX_AGE": "0", "DB_REPLICA_HOST": "r1"}):
+            replica = project_settings._database("DB_REPLICA", fallback={"NAME": "primary"})
+        self.assertEqual((replica["HOST"], replica["NAME"]), ("r1", "primary"))
+        self.assertEqual(replica["CONN_MAX_AGE"], 0)
+
+    def test_asgi_defaults_to_a_connection_per_request(self):
+        from makeup_class import asgi, settings as project_settings
+
+        with mock.patch.dict(os.environ):
+            os.environ.pop("DB_CONN_MAX_AGE", None)
+            reload(asgi)
+            self.assertEqual(project_settings._database("DB")["CONN_MAX_AGE"], 0)
+
+            os.environ["DB_CONN_MAX_AGE"] = "30"
+            reload(asgi)
+            self.assertEqual(project_settings._database("DB")["CONN_MAX_AGE"], 30)
+
+    def test_connection_reuse_benchmark(self):
+        with mock.patch.object(connection, "close"):
+            report = benchmarks.bench_connection_reuse(iterations=5)
+        self.assertEqual(set(report["results"]), {"per_request", "persistent"})
+
+
+class ClassRosterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC005", password="pw", is_staff=True)
+        cls.students = [
+            Student.objects.create(name=f"Student {i}", roll_number=f"RS{i:03d}", email=f"rs{i}@example.com")
+            for i in range(5)
+        ]
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Physics", classroom="R1", date=date(2030, 1, 7), time=time(9, 0)
+        )
+        cls.other = MakeUpClass.objects.create(
+            subject="Maths", classroom="R2", date=date(2030, 1, 7), time=time(9, 0)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def counts(self):
+        return dict(MakeUpClass.objects.values_list("id", "attendance_count"))
+
+    def test_every_marking_path_keeps_the_count(self):
+        attendance.mark_one(self.students[0].id, self.makeup.id)
+        attendance.mark_bulk([
+            ("RS001", self.makeup.remedial_code), ("RS002", self.makeup.remedial_code),
+            ("RS001", self.other.remedial_code),
+        ])
+        attendance.insert_marks([(self.students[3].id, self.makeup.id, timezone.now())])
+        Attendance.objects.create(student=self.students[4], makeup_class=self.other)
+        self.assertEqual(self.counts(), {self.makeup.id: 4, self.other.id: 2})
+
+        Attendance.objects.filter(student=self.students[4]).delete()
+        self.students[1].delete()
+        self.assertEqual(self.counts(), {self.makeup.id: 3, self.other.id: 0})
+
+    def test_editing_a_stale_instance_keeps_the_count(self):
+        stale = MakeUpClass.objects.get(id=self.makeup.id)
+        attendance.mark_one(self.students[0].id, self.makeup.id)
+        stale.classroom = "R9"
+        stale.save()
+
+        self.makeup.refresh_from_db()
+        self.assertEqual((self.makeup.classroom, self.makeup.attendance_count), ("R9", 1))
+
+    def test_seed_load_fills_the_count(self):
+        call_command(
+            "seed_load", students=20, classes=15, days=30, upcoming=0, density=0.3, seed=5,
+            stdout=mock.Mock(),
+        )
+        self.assertEqual(stats.reconcile_attendance_counts(dry_run=True), {})
+        self.assertTrue(MakeUpClass.objects.filter(attendance_count__gt=0).exists())
+
+    def test_reconcile_repairs_drift(self):
+        attendance.mark_one(self.students[0].id, self.makeup.id)
+        MakeUpClass.objects.filter(id=self.makeup.id).update(attendance_count=7)
+
+        self.assertEqual(
+            stats.reconcile_attendance_counts(dry_run=True), {self.makeup.id: (7, 1)}
+        )
+        call_command("reconcile_attendance_counts", stdout=mock.Mock())
+        self.assertEqual(self.counts(), {self.makeup.id: 1, self.other.id: 0})
+        self.assertEqual(stats.reconcile_attendance_counts(), {})
+
+    def test_roster_pages_and_listing_skips_the_join(self):
+        for student in self.students:
+            attendance.mark_one(student.id, self.makeup.id)
+
+        url = reverse("class_roster", args=(self.makeup.id,))
+        first = self.client.get(url, {"limit": 3}).json()
+        self.assertEqual(first["class"]["attendance_count"], 5)
+        self.assertEqual(len(first["students"]), 3)
+        rest = self.client.get(url, {"limit": 3, "cursor": first["next_cursor"]}).json()
+        self.assertIsNone(rest["next_cursor"])
+        self.assertEqual(
+            sorted(s["roll_number"] for s in first["students"] + rest["students"]),
+            [s.roll_number for s in self.students],
+        )
+        self.assertEqual(
+            self.client.get(reverse("class_roster", args=(999999,))).status_code, 404
+        )
+
+        # The roster shows student names, so renaming one invalidates it.
+        etag = self.client.get(url, {"limit": 10}).headers["ETag"]
+        self.assertEqual(self.client.get(url, {"limit": 10}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.students[0].name = "Renamed"
+        self.students[0].save()
+        renamed = self.client.get(url, {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(renamed.status_code, 200)
+        self.assertIn("Renamed", [s["name"] for s in renamed.json()["students"]])
+
+        with CaptureQueriesContext(connection) as queries:
+            listing = self.client.get(reverse("faculty_classes")).json()
+        self.assertEqual(
+            {c["id"]: c["attendance_count"] for c in listing["classes"]},
+            {self.makeup.id: 5, self.other.id: 0},
+        )
+        self.assertFalse(any("makeup_backend_attendance" in q["sql"] for q in queries))
+
+
+class ThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("STU042", password="pw", is_staff=True)
+        cls.makeup = MakeUpClass.objects.create(
+            subject="Physics", classroom="T1", date=date(2030, 1, 7), time=time(9, 0)
+        )
+
+    def setUp(self):
+        throttling.reset()
+        self.addCleanup(throttling.reset)
+        self.client.force_login(self.user)
+
+    def post_code(self, client, code):
+        return client.post(
+            reverse("mark_attendance"), json.dumps({"remedial_code": code}),
+            content_type="application/json",
+        )
+
+    def test_benchmarks_run_unthrottled_and_flag_non_2xx(self):
+        report = benchmarks.run(iterations=15, only=["admin_login", "mark_attendance"])
+        results = report["results"]
+
+        self.assertEqual(results["mark_attendance"]["statuses"], {"201": 15})
+        # A logged-in user is redirected from the login page, and says so.
+        self.assertEqual(benchmarks.non_2xx(results), {"admin_login": {"302": 15}})
+        self.assertTrue(throttling.ENABLED)
+        self.assertEqual(throttling.throttle_stats()["rejected_local"], 0)
+
+        out = StringIO()
+        call_command("bench_api", iterations=2, only=["admin_login"], stdout=out)
+        self.assertIn("admin_login 302 x2", out.getvalue())
+
+    def test_guessing_is_cut_off_without_queries(self):
+        for _ in range(10):
+            self.assertEqual(self.post_code(self.client, "RC-ABCDEFGH").status_code, 404)
+
+        with self.assertNumQueries(0):
+            blocked = self.post_code(self.client, self.makeup.remedial_code)
+        self.assertEqual(blocked.status_code, 429)
+        self.assertGreaterEqual(int(blocked["Retry-After"]), 1)
+
+        # Another session from the same address still has its own bucket.
+        other = Client()
+        other.force_login(self.user)
+        self.assertEqual(self.post_code(other, self.makeup.remedial_code).status_code, 201)
+        self.assertEqual(throttling.throttle_stats()["rejected_local"], 1)
+
+    def test_ip_bucket_catches_rotating_sessions(self):
+        view = throttling.throttle(lambda request: JsonResponse({}), user="5/m", ip="2/m", scope="t")
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.9")
+
+        statuses = []
+        for n in range(3):
+            request.COOKIES = {settings.SESSION_COOKIE_NAME: f"session-{n}"}
+            statuses.append(view(request).status_code)
+        self.assertEqual(statuses, [200, 200, 429])
+
+        with mock.patch.object(throttling, "IP_HEADER", "HTTP_X_FORWARDED_FOR"):
+            request.META["HTTP_X_FORWARDED_FOR"] = "203.0.113.5, 10.0.0.1"
+            self.assertEqual(view(request).status_code, 200)
+
+    def test_bucket_refills_at_its_rate(self):
+        buckets = throttling.TokenBuckets(10)
+        capacity, per_second = throttling.parse_rate("2/m")
+        self.assertEqual(buckets.take("k", capacity, per_second, now=0), 0)
+        self.assertEqual(buckets.take("k", capacity, per_second, now=0), 0)
+        self.assertAlmostEqual(buckets.take("k", capacity, per_second, now=0), 30)
+        self.assertAlmostEqual(buckets.take("k", capacity, per_second, now=15), 15)
+        self.assertEqual(buckets.take("k", capacity, per_second, now=30), 0)
+        with self.assertRaises(ValueError):
+            throttling.parse_rate("5/fortnight")
+
+    def test_shared_cache_limits_across_processes(self):
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        limits = [("user", *throttling.parse_rate("2/m"))]
+        request = RequestFactory().get("/")
+        request.COOKIES = {settings.SESSION_COOKIE_NAME: "shared"}
+
+        with mock.patch.object(throttling, "CACHE_ALIAS", "default"):
+            for _ in range(3):
+                # A fresh local store per call stands in for another worker.
+                with mock.patch.object(throttling, "_local", throttling.TokenBuckets(10)):
+                    wait = throttling.check(request, "shared", limits)
+            self.assertGreater(wait, 0)
+            self.assertEqual(throttling.throttle_stats()["rejected_shared"], 1)
+
+            # The rejection drained this worker's bucket; the retry stays local.
+            with mock.patch.object(throttling, "_local", throttling.TokenBuckets(10)):
+                throttling.check(request, "shared", limits)
+                self.assertGreater(throttling.check(request, "shared", limits), 0)
+        self.assertEqual(throttling.throttle_stats()["rejected_local"], 1)
+
+
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class PageShellTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("FAC077", password="pw", is_staff=True)
+
+    def setUp(self):
+        pages.clear()
+        throttling.reset()
+        self.addCleanup(pages.clear)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.user)
+
+    def test_shell_is_rendered_once_and_carries_a_live_csrf_token(self):
+        with mock.patch.object(pages, "render_to_string", wraps=pages.render_to_string) as rendered:
+            for name in ("dashboard", "faculty", "student", "ai", "faculty"):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(rendered.call_count, 4)
+        self.assertEqual(pages.shell_stats()["shells"], 4)
+        self.assertEqual(rendered.call_args.args[1], {"csrf_token": pages.CSRF_PLACEHOLDER})
+
+        html = response.content.decode()
+        self.assertNotIn(pages.CSRF_PLACEHOLDER, html)
+        # The shared helpers load once, ahead of the page's own script.
+        self.assertLess(
+            html.index('src="/static/makeup_backend/js/common.js"'),
+            html.index('src="/static/makeup_backend/js/faculty.js"'),
+        )
+        token = html.split('name="csrfmiddlewaretoken" value="')[1].split('"')[0]
+
+        # Past the CSRF check (403 otherwise) to the code lookup.
+        posted = self.client.post(
+            reverse("mark_attendance"), json.dumps({"remedial_code": "RC-UNKNOWN"}),
+            content_type="application/json", HTTP_X_CSRFTOKEN=token,
+        )
+        self.assertEqual(posted.status_code, 404)
+
+    def test_repeat_visit_revalidates_to_304(self):
+        first = self.client.get(reverse("faculty"))
+        self.assertEqual(first["Cache-Control"], f"private, max-age={pages.MAX_AGE}")
+        self.assertIn("Cookie", first["Vary"])
+
+        again = self.client.get(reverse("faculty"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        # A new CSRF secret (a fresh login) invalidates the cached page.
+        self.client.cookies.pop(settings.CSRF_COOKIE_NAME)
+        fresh = self.client.get(reverse("faculty"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], first["ETag"])
+
+    def test_assets_get_hashed_names(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, STORAGES={
+            **settings.STORAGES,
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"},
+        }):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            html = self.client.get(reverse("dashboard")).content.decode()
+        self.assertRegex(html, r'/static/makeup_backend/css/dashboard\.[0-9a-f]{12}\.css')
+        self.assertRegex(html, r'/static/makeup_backend/js/dashboard\.[0-9a-f]{12}\.js')
+        self.assertRegex(html, r'/static/makeup_backend/js/common\.[0-9a-f]{12}\.js')
+
+    def test_disabled_renders_every_time(self):
+        with mock.patch.object(pages, "ENABLED", False):
+            response = self.client.get(reverse("student"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(pages.shell_stats()["shells"], 0)
 
-# Create your tests here.
@@ -0,0 +1,210 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+
+# Token-bucket throttling for endpoints that can be hammered, remedial code
+# guessing above all. Limits are set per endpoint where the route is
+# declared (makeup_backend/urls.py):
+#
+#     path(..., throttle(views.mark_attendance, user="10/m", ip="120/m"), ...)
+#
+# A bucket holds up to N tokens and refills at N per period; each request
+# takes one from its client's bucket and from its IP's bucket, and is
+# answered 429 (with Retry-After) once either is empty. The check runs
+# before the view and reads nothing but the request headers. The "user" is
+# the session cookie, not request.user, since loading the session or user
+# would cost a query: a client without a cookie, or one rotating them, is
+# held by its IP bucket alone.
+#
+# Buckets live in a bounded in-process LRU. With CACHE_ALIAS set, a request
+# the local bucket lets through is also charged to a bucket in that shared
+# cache, so the limit holds across workers; a shared rejection drains the
+# local bucket, so the client's next attempts are turned away locally again
+# without a cache round trip. Shared updates are read-then-write, so racing
+# workers can let a few extra requests through.
+THROTTLE = getattr(settings, "THROTTLE", {})
+
+ENABLED = THROTTLE.get("ENABLED", True)
+CACHE_ALIAS = THROTTLE.get("CACHE_ALIAS")
+# META key of a header carrying the client address (e.g.
+# "HTTP_X_FORWARDED_FOR" behind a proxy); its first entry is used.
+IP_HEADER = THROTTLE.get("IP_HEADER")
+LOCAL_SIZE = THROTTLE.get("LOCAL_SIZE", 10000)
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    # "10/m" -> (capacity 10, refill 10 / 60 tokens per second).
+    count, _, period = rate.partition("/")
+    seconds = PERIODS.get(period[:1].lower())
+    if seconds is None or int(count) < 1:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '10/m'")
+    return int(count), int(count) / seconds
+
+
+def _refill(tokens, stamp, capacity, per_second, now):
+    return min(capacity, tokens + (now - stamp) * per_second)
+
+
+class TokenBuckets:
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per_second, now=None):
+        # Returns 0 if a token was taken, else seconds until one is due.
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, stamp = self._data.get(key, (capacity, now))
+            tokens = _refill(tokens, stamp, capacity, per_second, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / per_second
+            self._data[key] = (tokens - 1 if not wait else tokens, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return wait
+
+    def drain(self, key, tokens, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if key in self._data:
+                self._data[key] = (tokens, now)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = TokenBuckets(LOCAL_SIZE)
+
+_stats_lock = threading.Lock()
+_stats = {"allowed": 0, "rejected_local": 0, "rejected_shared": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _take_shared(key, capacity, per_second):
+    # Wall-clock stamps, since the entry is shared between processes.
+    cache = caches[CACHE_ALIAS]
+    now = time.time()
+    tokens, stamp = cache.get(f"throttle:{key}") or (capacity, now)
+    tokens = _refill(tokens, stamp, capacity, per_second, now)
+    wait = 0.0 if tokens >= 1 else (1 - tokens) / per_second
+    cache.set(
+        f"throttle:{key}", (tokens - 1 if not wait else tokens, now),
+        math.ceil(capacity / per_second) + 1,
+    )
+    return wait, tokens
+
+
+def client_ip(request):
+    if IP_HEADER:
+        forwarded = request.META.get(IP_HEADER, "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _session_key(request):
+    cookie = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not cookie:
+        return None
+    return hashlib.blake2b(cookie.encode(), digest_size=12).hexdigest()
+
+
+def check(request, scope, limits):
+    # ``limits``: [("user" | "ip", capacity, per_second)]. Returns 0 if the
+    # request may proceed, else the seconds to wait before retrying.
+    if not ENABLED:
+        return 0
+
+    keys = []
+    for kind, capacity, per_second in limits:
+        ident = _session_key(request) if kind == "user" else client_ip(request)
+        if ident:
+            keys.append((f"{scope}:{kind}:{ident}", capacity, per_second))
+
+    # Each bucket is charged even when another one rejects, so a client
+    # can't keep one bucket full by overdrawing the other.
+    wait = max((_local.take(*key) for key in keys), default=0)
+    if wait:
+        _count("rejected_local")
+        return wait
+
+    if CACHE_ALIAS:
+        for key, capacity, per_second in keys:
+            shared_wait, tokens = _take_shared(key, capacity, per_second)
+            if shared_wait:
+                _local.drain(key, tokens)
+                wait = max(wait, shared_wait)
+        if wait:
+            _count("rejected_shared")
+            return wait
+
+    _count("allowed")
+    return 0
+
+
+def _too_many(wait):
+    response = JsonResponse({"message": "Too many attempts, try again later"}, status=429)
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
+
+
+def throttle(view_func, *, user=None, ip=None, scope=None):
+    # Wraps a view in urls.py; ``user`` / ``ip`` are rates such as "10/m".
+    scope = scope or view_func.__name__
+    limits = [
+        (kind, *parse_rate(rate))
+        for kind, rate in (("user", user), ("ip", ip))
+        if rate
+    ]
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            wait = check(request, scope, limits)
+            if wait:
+                return _too_many(wait)
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        wait = check(request, scope, limits)
+        if wait:
+            return _too_many(wait)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def throttle_stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot["buckets"] = len(_local)
+    return snapshot
+
+
+def reset():
+    _local.clear()
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -1,12 +1,13 @@
 from django.urls import path
 from . import views
+from .throttling import throttle
 
 urlpatterns = [
 
     # ==========================
     # 🔐 Authentication
     # ==========================
-    path('admin-login/', views.admin_login_view, name='admin_login'),
+    path('admin-login/', throttle(views.admin_login_view, user="10/m", ip="30/m"), name='admin_login'),
     path('admin-logout/', views.admin_logout_view, name='admin_logout'),
 
     # ==========================
@@ -21,24 +22,42 @@ urlpatterns = [
     # 📊 Dashboard APIs
     # ==========================
     path('api/dashboard/', views.dashboard_data, name='dashboard_data'),
+    path('api/dashboard/code-cache/', views.code_cache_stats, name='code_cache_stats'),
+    path('api/events/', views.event_stream, name='event_stream'),
+    path('metrics/', views.metrics, name='metrics'),
 
     # ==========================
     # 👨‍🏫 Faculty APIs
     # ==========================
     path('api/faculty/create-class/', views.create_makeup_class, name='create_class'),
+    path('api/faculty/schedule-classes/', views.schedule_classes, name='schedule_classes'),
     path('api/faculty/classes/', views.faculty_classes, name='faculty_classes'),
+    path('api/faculty/classes/<int:class_id>/attendance/', views.class_roster, name='class_roster'),
+    path('api/faculty/free-slots/', views.classroom_free_slots, name='classroom_free_slots'),
 
     # ==========================
     # 👨‍🎓 Student APIs
     # ==========================
-    path('api/student/mark-attendance/', views.mark_attendance, name='mark_attendance'),
+    # Remedial codes are short; cap guesses per session and per address
+    # (a whole class may share one NAT address).
+    path('api/student/mark-attendance/', throttle(views.mark_attendance, user="10/m", ip="120/m"),
+         name='mark_attendance'),
+    path('api/student/mark-attendance/bulk/', views.mark_attendance_bulk, name='mark_attendance_bulk'),
     path('api/student/history/', views.student_attendance_history, name='student_history'),
     path('api/student/metrics/', views.student_metrics, name='student_metrics'),
+    path('api/student/dashboard/', views.student_dashboard, name='student_dashboard'),
+
+    # ==========================
+    # 📤 Export APIs
+    # ==========================
+    path('api/attendance/export/', views.export_attendance, name='export_attendance'),
 
     # ==========================
     # 🤖 AI APIs
     # ==========================
     path('api/ai/analytics/', views.ai_analytics, name='ai_analytics'),
+    path('api/ai/recommendations/', views.slot_recommendations, name='slot_recommendations'),
+    path('api/ai/forecast/', views.forecast_turnout, name='forecast_turnout'),
     path('api/faculty/delete-class/<int:class_id>/', views.delete_class, name='delete_class'),
     path('api/faculty/edit-class/<int:class_id>/', views.edit_class, name='edit_class'),
 ]
\ No newline at end of file
@@ -1,15 +1,30 @@
+import asyncio
+import hmac
 import json
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
-from django.db.models import Count
-from django.db.models.functions import ExtractMonth
-
-from .models import MakeUpClass, Student, Attendance
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import (
+    MakeUpClass, Student, Attendance, MonthlyAttendanceRollup, DailyAttendanceRollup
+)
+from . import (
+    attendance, attendance_buffer, bookings, codes, events, exports, forecasting, instrumentation, pages,
+    pagination, recommendations, scheduling, stats, throttling
+)
+from .conditional import versioned
+from .instrumentation import query_budget
+from .routers import read_replica
 
 
 # =====================================================
@@ -47,6 +62,15 @@ def admin_logout_view(request):
 # =====================================================
 
 def staff_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated or not user.is_staff:
+                return redirect("admin_login")
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated or not request.user.is_staff:
@@ -61,50 +85,67 @@ def staff_required(view_func):
 
 @staff_required
 def dashboard(request):
-    return render(request, "index.html")
+    return pages.render_shell(request, "index.html")
 
 
 @staff_required
 def faculty(request):
-    return render(request, "faculty.html")
+    return pages.render_shell(request, "faculty.html")
 
 
 @staff_required
 def student(request):
-    return render(request, "student.html")
+    return pages.render_shell(request, "student.html")
 
 
 @staff_required
 def ai(request):
-    return render(request, "ai_insights.html")
+    return pages.render_shell(request, "ai_insights.html")
 
 
 # =====================================================
 # 📊 API: DASHBOARD DATA (FULLY DB DRIVEN)
 # =====================================================
 
-@staff_required
-def dashboard_data(request):
-    total_classes = MakeUpClass.objects.count()
-    total_students = Student.objects.count()
-    total_attendance = Attendance.objects.count()
-
-    attendance_rate = 0
-    if total_students > 0 and total_classes > 0:
-        max_possible = total_students * total_classes
-        attendance_rate = round((total_attendance / max_possible) * 100, 2)
-
-    recent_activity = Attendance.objects.select_related("makeup_class")\
+# The read-heavy JSON APIs below are async: under ASGI a worker serves many
+# of them at once without a thread each. Under WSGI Django runs them in a
+# per-request event loop, so one codebase serves both. What async does not
+# buy is parallel SQL within a request: the async ORM runs every query on
+# the request's one thread-sensitive executor thread and connection, so
+# gathering them would still execute them one at a time. Each view therefore
+# awaits its few queries in order and keeps their number down instead: the
+# student views reuse the session's cached Student id (see STUDENT LOOKUP),
+# and the totals come from @versioned's read of the counter rows, which is
+# all a client holding a current ETag pays before its 304.
+
+async def _recent_activity():
+    recent = Attendance.objects.select_related("makeup_class")\
         .order_by("-marked_at")[:5]
 
-    activity_data = [
+    return [
         {
             "subject": a.makeup_class.subject,
             "date": a.marked_at.strftime("%Y-%m-%d %H:%M")
         }
-        for a in recent_activity
+        async for a in recent
     ]
 
+
+@query_budget(4)
+@staff_required
+@read_replica
+@versioned("classes", "students", "attendance")
+async def dashboard_data(request):
+    activity_data = await _recent_activity()
+    total_classes = request.counters["classes"].value
+    total_students = request.counters["students"].value
+    total_attendance = request.counters["attendance"].value
+
+    attendance_rate = 0
+    if total_students > 0 and total_classes > 0:
+        max_possible = total_students * total_classes
+        attendance_rate = round((total_attendance / max_possible) * 100, 2)
+
     return JsonResponse({
         "total_classes": total_classes,
         "total_students": total_students,
@@ -114,16 +155,134 @@ def dashboard_data(request):
     })
 
 
+# =====================================================
+# 🎯 API: REMEDIAL CODE CACHE STATS
+# =====================================================
+
+@staff_required
+def code_cache_stats(request):
+    return JsonResponse(codes.cache_stats())
+
+
+# =====================================================
+# 📡 API: LIVE EVENTS (SERVER-SENT EVENTS)
+# =====================================================
+
+# Seconds an EventSource waits before reconnecting when served over WSGI.
+WSGI_EVENT_RETRY = 15
+
+
+async def _snapshot():
+    return {"type": "snapshot", "counts": await stats.aget_counts()}
+
+
+def _release_connections():
+    # A snapshot is a stream's only query, but the connection it used would
+    # stay open on the stream's executor thread for as long as the client
+    # does. Close it, so open dashboards hold no connections beyond the
+    # process's one LISTEN connection.
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+async def _stream_snapshot():
+    snapshot = await _snapshot()
+    await sync_to_async(_release_connections)()
+    return snapshot
+
+
+async def _event_source():
+    queue = events.broker.subscribe()
+    try:
+        yield events.format_sse(await _stream_snapshot())
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), events.KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event["type"] == "resync":
+                event = await _stream_snapshot()
+            yield events.format_sse(event)
+    finally:
+        events.broker.unsubscribe(queue)
+
+
+@query_budget(3)
+@staff_required
+async def event_stream(request):
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker can't hold streams open; send the current counters
+        # and let EventSource reconnect after a while instead.
+        body = f"retry: {WSGI_EVENT_RETRY * 1000}\n" + events.format_sse(await _snapshot())
+        return HttpResponse(body, content_type="text/event-stream")
+
+    response = StreamingHttpResponse(_event_source(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# =====================================================
+# 📈 METRICS (PROMETHEUS TEXT FORMAT)
+# =====================================================
+
+def metrics(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    authorized = request.user.is_authenticated and request.user.is_staff
+
+    if not authorized and token:
+        supplied = request.headers.get("Authorization", "")
+        authorized = hmac.compare_digest(supplied, f"Bearer {token}")
+
+    if not authorized:
+        return HttpResponse(status=403)
+
+    cache = codes.cache_stats()
+    extra = {
+        f"makeup_code_cache_{name}": cache[name]
+        for name in ("local_hits", "shared_hits", "negative_hits", "misses", "hit_ratio")
+    }
+    extra.update(
+        (f"makeup_throttle_{name}", value) for name, value in throttling.throttle_stats().items()
+    )
+    if attendance_buffer.ENABLED:
+        extra.update(attendance_buffer.metrics())
+
+    return HttpResponse(
+        instrumentation.render_prometheus(extra),
+        content_type="text/plain; version=0.0.4"
+    )
+
+
 # =====================================================
 # 👨‍🏫 API: CREATE MAKE-UP CLASS
 # =====================================================
 
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 
 
+def _double_booked(conflicts=()):
+    return JsonResponse({
+        "message": "Classroom already booked at that time",
+        "conflicts": bookings.describe(conflicts)
+    }, status=409)
+
+
+def _booking_conflicts(classroom, day, start_time, duration, exclude_id=None):
+    # A 409 response listing the classes already in the room, or None. On
+    # PostgreSQL a booking racing past this check is stopped by the
+    # exclusion constraint, which the callers answer with _double_booked().
+    start, end = bookings.class_span(day, start_time, duration)
+    conflicts = bookings.find_conflicts(classroom, start, end, exclude_id=exclude_id)
+    return _double_booked(conflicts) if conflicts else None
+
+
+@query_budget(8)
 @require_POST
 @staff_required
 def create_makeup_class(request):
@@ -142,13 +301,23 @@ def create_makeup_class(request):
 
         date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
         time_obj = datetime.strptime(time_str, "%H:%M").time()
+        duration = bookings.parse_duration(data.get("duration"))
 
-        makeup = MakeUpClass.objects.create(
-            subject=subject,
-            classroom=classroom,
-            date=date_obj,
-            time=time_obj
-        )
+        clashes = _booking_conflicts(classroom, date_obj, time_obj, duration)
+        if clashes:
+            return clashes
+
+        try:
+            with transaction.atomic():
+                makeup = MakeUpClass.objects.create(
+                    subject=subject,
+                    classroom=classroom,
+                    date=date_obj,
+                    time=time_obj,
+                    duration_minutes=duration
+                )
+        except IntegrityError:
+            return _double_booked()
 
         return JsonResponse({
             "message": "Class created",
@@ -159,33 +328,196 @@ def create_makeup_class(request):
     except Exception as e:
         print("ERROR:", e)
         return JsonResponse({"message": str(e)}, status=400)
+# =====================================================
+# 👨‍🏫 API: SCHEDULE CLASSES (BULK / RECURRING)
+# =====================================================
+
+@query_budget(8)
+@require_POST
+@staff_required
+def schedule_classes(request):
+    try:
+        occurrences = scheduling.expand(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+
+    try:
+        results = scheduling.schedule(occurrences)
+    except IntegrityError:
+        # A class was booked into one of the rooms after the overlap check.
+        return _double_booked()
+
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+
+    return JsonResponse({"results": results, "summary": summary})
+
+
 # =====================================================
 # 👨‍🏫 API: FACULTY CLASS LIST
 # =====================================================
 
+def _filter_classes(classes, params):
+    status = params.get("status")
+    if status:
+        if status.lower() == "active":
+            classes = classes.active()
+        elif status.lower() == "expired":
+            classes = classes.expired()
+        else:
+            raise ValueError("status must be active or expired")
+
+    filters = Q()
+    if params.get("date_from"):
+        filters &= Q(date__gte=datetime.strptime(params["date_from"], "%Y-%m-%d").date())
+    if params.get("date_to"):
+        filters &= Q(date__lte=datetime.strptime(params["date_to"], "%Y-%m-%d").date())
+    if params.get("subject"):
+        filters &= Q(subject=params["subject"])
+
+    return classes.filter(filters)
+
+
+def _next_status_change(request):
+    # Class status flips from Active to Expired as time passes, so the
+    # representation also depends on the next upcoming start.
+    next_start = MakeUpClass.objects.active().order_by("starts_at")\
+        .values_list("starts_at", flat=True).first()
+    return str(next_start)
+
+
+@query_budget(5)
 @staff_required
+@versioned("classes", "attendance", extra=_next_status_change)
 def faculty_classes(request):
 
-    classes = MakeUpClass.objects.annotate(
-        student_count=Count("attendance")
-    ).order_by("-created_at")
+    # attendance_count is the denormalized column, so a page is one index
+    # range scan of MakeUpClass with no join to Attendance.
+    try:
+        classes = _filter_classes(MakeUpClass.objects.all(), request.GET)
+        classes = classes.with_status().values(
+            "id", "subject", "date", "time", "duration_minutes", "classroom",
+            "remedial_code", "created_at", "current_status", "attendance_count"
+        )
+        rows, next_cursor = pagination.paginate(classes, request.GET)
+    except ValueError as e:
+        return JsonResponse({"message": str(e)}, status=400)
 
     data = [
         {
-            "id": c.id,
-            "subject": c.subject,
-            "date": c.date.strftime("%Y-%m-%d"),
-            "time": c.time.strftime("%H:%M"),
-            "classroom": c.classroom,
-            "remedial_code": c.remedial_code,
-            "attendance_count": c.student_count,
-            "status": c.status
+            "id": c["id"],
+            "subject": c["subject"],
+            "date": c["date"].strftime("%Y-%m-%d"),
+            "time": c["time"].strftime("%H:%M"),
+            "classroom": c["classroom"],
+            "remedial_code": c["remedial_code"],
+            "duration": c["duration_minutes"],
+            "attendance_count": c["attendance_count"],
+            "status": c["current_status"]
         }
-        for c in classes
+        for c in rows
     ]
 
-    return JsonResponse({"classes": data})
+    return JsonResponse({"classes": data, "next_cursor": next_cursor})
+
+# =====================================================
+# 👨‍🏫 API: CLASS ATTENDANCE ROSTER
+# =====================================================
+
+ROSTER_PAGE = 100
+
+
+@query_budget(5)
+@staff_required
+@read_replica
+@versioned("attendance", "classes", "students")
+def class_roster(request, class_id):
+    makeup = MakeUpClass.objects.filter(id=class_id).values(
+        "id", "subject", "remedial_code", "attendance_count"
+    ).first()
+    if makeup is None:
+        return JsonResponse({"message": "Class not found"}, status=404)
+
+    # Keyset pages of attendance_class_marked_idx, newest first.
+    roster = Attendance.objects.filter(makeup_class_id=class_id).values(
+        "id", "marked_at", "student__name", "student__roll_number"
+    )
+    try:
+        rows, next_cursor = pagination.paginate(
+            roster, request.GET, order=("marked_at", "id"), default_limit=ROSTER_PAGE
+        )
+    except ValueError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+
+    return JsonResponse({
+        "class": makeup,
+        "students": [
+            {
+                "name": row["student__name"],
+                "roll_number": row["student__roll_number"],
+                "marked_at": timezone.localtime(row["marked_at"]).strftime("%Y-%m-%d %H:%M"),
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+    })
+
+
+# =====================================================
+# 🏫 API: CLASSROOM FREE SLOTS
+# =====================================================
+
+FREE_SLOT_MAX_DAYS = 62
+
+
+@query_budget(4)
+@staff_required
+@versioned("classes")
+def classroom_free_slots(request):
+    classroom = request.GET.get("classroom")
+    if not classroom:
+        return JsonResponse({"message": "classroom required"}, status=400)
+
+    try:
+        date_from = datetime.strptime(request.GET.get("date_from", ""), "%Y-%m-%d").date()
+        date_to = request.GET.get("date_to")
+        date_to = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else date_from
+        day_start = datetime.strptime(request.GET.get("day_start", "08:00"), "%H:%M").time()
+        day_end = datetime.strptime(request.GET.get("day_end", "20:00"), "%H:%M").time()
+        duration = request.GET.get("duration")
+        duration = bookings.parse_duration(int(duration) if duration else None)
+    except ValueError:
+        return JsonResponse(
+            {"message": "date_from / date_to must be YYYY-MM-DD, day_start / day_end HH:MM "
+                        "and duration a number of minutes"},
+            status=400
+        )
+
+    if not 0 <= (date_to - date_from).days < FREE_SLOT_MAX_DAYS:
+        return JsonResponse(
+            {"message": f"date_to must be within {FREE_SLOT_MAX_DAYS} days after date_from"},
+            status=400
+        )
+    if day_end <= day_start:
+        return JsonResponse({"message": "day_end must be after day_start"}, status=400)
+
+    slots = bookings.free_slots(classroom, date_from, date_to, duration, day_start, day_end)
+
+    return JsonResponse({
+        "classroom": classroom,
+        "duration": duration,
+        "slots": [
+            {
+                "date": timezone.localtime(start).strftime("%Y-%m-%d"),
+                "start": timezone.localtime(start).strftime("%H:%M"),
+                "end": timezone.localtime(end).strftime("%H:%M"),
+            }
+            for start, end in slots
+        ]
+    })
 
+@query_budget(13)
 @require_POST
 @staff_required
 def delete_class(request, class_id):
@@ -196,6 +528,7 @@ def delete_class(request, class_id):
     except MakeUpClass.DoesNotExist:
         return JsonResponse({"message": "Class not found"}, status=404)
     
+@query_budget(15)
 @require_POST
 @staff_required
 def edit_class(request, class_id):
@@ -210,16 +543,73 @@ def edit_class(request, class_id):
         obj.classroom = data.get("classroom")
         obj.date = datetime.strptime(data.get("date"), "%Y-%m-%d").date()
         obj.time = datetime.strptime(data.get("time"), "%H:%M").time()
-        obj.save()
+        obj.duration_minutes = bookings.parse_duration(data.get("duration", obj.duration_minutes))
+
+        clashes = _booking_conflicts(
+            obj.classroom, obj.date, obj.time, obj.duration_minutes, exclude_id=obj.id
+        )
+        if clashes:
+            return clashes
+
+        try:
+            with transaction.atomic():
+                obj.save()
+        except IntegrityError:
+            return _double_booked()
 
         return JsonResponse({"message": "Updated successfully"})
     except Exception as e:
         return JsonResponse({"message": str(e)}, status=400)
 
+
+# =====================================================
+# 👨‍🎓 STUDENT LOOKUP
+# =====================================================
+
+# The request.user -> Student mapping is cached on the session, so only a
+# student's first request pays for the get_or_create (a write-capable
+# query); later reads go straight to their attendance rows.
+STUDENT_SESSION_KEY = "student_id"
+
+
+def _student_defaults(user):
+    return {"name": user.username, "email": user.email}
+
+
+def _student_id(request):
+    student_id = request.session.get(STUDENT_SESSION_KEY)
+    if student_id is None:
+        student, _ = Student.objects.get_or_create(
+            roll_number=request.user.username,
+            defaults=_student_defaults(request.user)
+        )
+        student_id = student.id
+        request.session[STUDENT_SESSION_KEY] = student_id
+    return student_id
+
+
+async def _astudent_id(request, user):
+    student_id = await request.session.aget(STUDENT_SESSION_KEY)
+    if student_id is None:
+        student, _ = await Student.objects.aget_or_create(
+            roll_number=user.username,
+            defaults=_student_defaults(user)
+        )
+        student_id = student.id
+        await request.session.aset(STUDENT_SESSION_KEY, student_id)
+    return student_id
+
+
 # =====================================================
 # 👨‍🎓 API: MARK ATTENDANCE
 # =====================================================
 
+# A student's first mark is the costliest path (QueryBudgetTests measures
+# it): session and user, the code lookup, the Student get_or_create and its
+# counter, then mark_one's INSERT with the attendance counter, the class's
+# attendance_count, both rollups and the forecast, plus the savepoints
+# around each write and the session save that caches the student id.
+@query_budget(19)
 @require_POST
 @staff_required
 def mark_attendance(request):
@@ -230,30 +620,34 @@ def mark_attendance(request):
         if not code:
             return JsonResponse({"message": "Remedial code required"}, status=400)
 
-        try:
-            makeup = MakeUpClass.objects.get(remedial_code=code)
-        except MakeUpClass.DoesNotExist:
+        class_id = codes.resolve_class_id(code)
+        if class_id is None:
             return JsonResponse({"message": "Invalid Remedial Code"}, status=404)
 
-        student, _ = Student.objects.get_or_create(
-            roll_number=request.user.username,
-            defaults={
-                "name": request.user.username,
-                "email": request.user.email
-            }
-        )
+        student_id = _student_id(request)
+
+        if attendance_buffer.ENABLED:
+            # Write-behind: the mark is durable in the local buffer and
+            # reaches Attendance with the flusher's next batch.
+            if not attendance_buffer.mark(student_id, class_id):
+                return JsonResponse({"message": "Attendance already marked"}, status=409)
+            return JsonResponse({"message": "Attendance recorded", "queued": True}, status=202)
 
-        if Attendance.objects.filter(student=student, makeup_class=makeup).exists():
+        try:
+            created = attendance.mark_one(student_id, class_id)
+        except IntegrityError:
+            # The class was deleted after its code was resolved, or the
+            # student behind the cached session mapping was removed.
+            codes.forget(code)
+            request.session.pop(STUDENT_SESSION_KEY, None)
+            return JsonResponse({"message": "Invalid Remedial Code"}, status=404)
+
+        if not created:
             return JsonResponse(
                 {"message": "Attendance already marked"},
                 status=409
             )
 
-        Attendance.objects.create(
-            student=student,
-            makeup_class=makeup
-        )
-
         return JsonResponse(
             {"message": "Attendance marked successfully"},
             status=201
@@ -263,34 +657,101 @@ def mark_attendance(request):
         return JsonResponse({"message": str(e)}, status=500)
 
 
+# =====================================================
+# 👨‍🎓 API: BULK MARK ATTENDANCE
+# =====================================================
+
+BULK_ATTENDANCE_LIMIT = 5000
+
+
+@query_budget(13)
+@require_POST
+@staff_required
+def mark_attendance_bulk(request):
+    try:
+        data = json.loads(request.body)
+        records = data.get("records")
+
+        if not isinstance(records, list) or not records:
+            return JsonResponse({"message": "Records required"}, status=400)
+
+        if len(records) > BULK_ATTENDANCE_LIMIT:
+            return JsonResponse(
+                {"message": f"At most {BULK_ATTENDANCE_LIMIT} records per request"},
+                status=400
+            )
+
+        pairs = [(r["roll_number"], r["remedial_code"]) for r in records]
+
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse(
+            {"message": "Each record needs roll_number and remedial_code"},
+            status=400
+        )
+
+    results = attendance.mark_bulk(pairs)
+
+    summary = {}
+    for status in results:
+        summary[status] = summary.get(status, 0) + 1
+
+    return JsonResponse({
+        "results": [
+            {"roll_number": roll, "remedial_code": code, "status": status}
+            for (roll, code), status in zip(pairs, results)
+        ],
+        "summary": summary
+    })
+
+
 # =====================================================
 # 👨‍🎓 API: STUDENT HISTORY
 # =====================================================
 
-@login_required
-def student_attendance_history(request):
+STUDENT_HISTORY_PAGE = 20
 
-    student, _ = Student.objects.get_or_create(
-        roll_number=request.user.username,
-        defaults={
-            "name": request.user.username,
-            "email": request.user.email
-        }
-    )
+HISTORY_FIELDS = (
+    "id", "marked_at", "makeup_class__remedial_code", "makeup_class__subject",
+    "makeup_class__date", "makeup_class__time",
+)
+
+
+def _history_record(row):
+    return {
+        "code": row["makeup_class__remedial_code"],
+        "subject": row["makeup_class__subject"],
+        "date": row["makeup_class__date"].strftime("%Y-%m-%d"),
+        "time": row["makeup_class__time"].strftime("%H:%M"),
+        "status": "Present"
+    }
+
+
+def _student_summary(attended_sessions, total_sessions):
+    attendance_rate = 0
+    if total_sessions > 0:
+        attendance_rate = round((attended_sessions / total_sessions) * 100, 2)
+
+    return {
+        "total_sessions": attended_sessions,
+        "attendance_rate": attendance_rate,
+        "pending_sessions": total_sessions - attended_sessions
+    }
+
+
+@query_budget(12)
+@login_required
+@read_replica
+@versioned("attendance", "classes")
+async def student_attendance_history(request):
+    student_id = await _astudent_id(request, await request.auser())
 
     attendance_records = Attendance.objects.filter(
-        student=student
-    ).select_related("makeup_class").order_by("-marked_at")
+        student_id=student_id
+    ).order_by("-marked_at").values(*HISTORY_FIELDS)
 
     data = [
-        {
-            "code": record.makeup_class.remedial_code,
-            "subject": record.makeup_class.subject,
-            "date": record.makeup_class.date.strftime("%Y-%m-%d"),
-            "time": record.makeup_class.time.strftime("%H:%M"),
-            "status": "Present"
-        }
-        for record in attendance_records
+        _history_record(row)
+        async for row in attendance_records.aiterator()
     ]
 
     return JsonResponse({"records": data})
@@ -300,47 +761,241 @@ def student_attendance_history(request):
 # 👨‍🎓 API: STUDENT METRICS
 # =====================================================
 
+@query_budget(11)
 @login_required
-def student_metrics(request):
+@read_replica
+@versioned("attendance", "classes")
+async def student_metrics(request):
+    student_id = await _astudent_id(request, await request.auser())
+    attended_sessions = await Attendance.objects.filter(student_id=student_id).acount()
+
+    return JsonResponse(
+        _student_summary(attended_sessions, request.counters["classes"].value)
+    )
 
-    student, _ = Student.objects.get_or_create(
-        roll_number=request.user.username,
-        defaults={
-            "name": request.user.username,
-            "email": request.user.email
-        }
+
+# =====================================================
+# 👨‍🎓 API: STUDENT DASHBOARD (METRICS + HISTORY PAGE)
+# =====================================================
+
+@query_budget(13)
+@login_required
+@read_replica
+@versioned("attendance", "classes")
+async def student_dashboard(request):
+    student_id = await _astudent_id(request, await request.auser())
+    attended = Attendance.objects.filter(student_id=student_id)
+
+    # The student's total rides along as a scalar subquery on the page
+    # query, so metrics and history cost one round trip.
+    page = attended.values(*HISTORY_FIELDS).annotate(
+        attended_sessions=Subquery(
+            attended.order_by().values("student_id").annotate(n=Count("id")).values("n")
+        ),
     )
 
-    total_sessions = MakeUpClass.objects.count()
-    attended_sessions = Attendance.objects.filter(student=student).count()
+    try:
+        rows, next_cursor = await pagination.apaginate(
+            page, request.GET, order=("marked_at", "id"),
+            default_limit=STUDENT_HISTORY_PAGE
+        )
+    except ValueError as e:
+        return JsonResponse({"message": str(e)}, status=400)
 
-    attendance_rate = 0
-    if total_sessions > 0:
-        attendance_rate = round((attended_sessions / total_sessions) * 100, 2)
+    if rows:
+        attended_sessions = rows[0]["attended_sessions"]
+    else:
+        attended_sessions = await attended.acount()
 
     return JsonResponse({
-        "total_sessions": attended_sessions,
-        "attendance_rate": attendance_rate,
-        "pending_sessions": total_sessions - attended_sessions
+        **_student_summary(attended_sessions, request.counters["classes"].value),
+        "records": [_history_record(row) for row in rows],
+        "next_cursor": next_cursor
     })
 
 
+# =====================================================
+# 📤 API: ATTENDANCE EXPORT (STREAMING)
+# =====================================================
+
+@query_budget(2)
+@staff_required
+def export_attendance(request):
+    export_format = request.GET.get("format", "csv").lower()
+    if export_format not in exports.EXPORT_FORMATS:
+        return JsonResponse({"message": "format must be csv or ndjson"}, status=400)
+
+    # Under ASGI the response must be an async iterator to stream; a sync
+    # one would be read to the end into memory before the first byte.
+    served_async = isinstance(request, ASGIRequest)
+    try:
+        rows = (exports.aexport_rows if served_async else exports.export_rows)(
+            date_from=request.GET.get("date_from"),
+            date_to=request.GET.get("date_to"),
+            class_id=request.GET.get("class_id"),
+        )
+    except ValueError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+
+    lines = (exports.arender if served_async else exports.render)(export_format, rows)
+    response = StreamingHttpResponse(lines, content_type=exports.RENDERERS[export_format][1])
+    response["Content-Disposition"] = f'attachment; filename="attendance.{export_format}"'
+    return response
+
+
 # =====================================================
 # 🤖 API: AI ANALYTICS (POSTGRES SAFE)
 # =====================================================
 
+def _bucket_range(date_from, date_to, keys):
+    # Lexicographic (year, month[, day]) bounds over the rollup key columns.
+    def bound(value, op):
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+        parts = [(k, getattr(day, k)) for k in keys]
+        q = Q()
+        for i, (key, v) in enumerate(parts):
+            prefix = {k: pv for k, pv in parts[:i]}
+            last = i == len(parts) - 1
+            q |= Q(**prefix, **{f"{key}__{op}{'e' if last else ''}": v})
+        return q
+
+    filters = Q()
+    if date_from:
+        filters &= bound(date_from, "gt")
+    if date_to:
+        filters &= bound(date_to, "lt")
+    return filters
+
+
+@query_budget(4)
 @staff_required
-def ai_analytics(request):
+@read_replica
+@versioned("attendance", "classes")
+async def ai_analytics(request):
+
+    granularity = request.GET.get("granularity", "month").lower()
+    if granularity == "month":
+        rollup, keys = MonthlyAttendanceRollup, ("year", "month")
+    elif granularity == "day":
+        rollup, keys = DailyAttendanceRollup, ("year", "month", "day")
+    else:
+        return JsonResponse({"message": "granularity must be month or day"}, status=400)
+
+    try:
+        buckets = rollup.objects.filter(_bucket_range(
+            request.GET.get("date_from"), request.GET.get("date_to"), keys
+        ))
+    except ValueError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+
+    if request.GET.get("subject"):
+        buckets = buckets.filter(subject=request.GET["subject"])
 
-    monthly_data = Attendance.objects.annotate(
-        month=ExtractMonth("marked_at")
-    ).values("month").annotate(
-        count=Count("id")
-    ).order_by("month")
+    trend = buckets.values(*keys).annotate(
+        count=Sum("count")
+    ).order_by(*keys)
 
     data = [
-        {"month": m["month"], "attendance": m["count"]}
-        for m in monthly_data
+        {
+            **{k: b[k] for k in keys},
+            "period": "-".join(f"{b[k]:02d}" for k in keys),
+            "attendance": b["count"]
+        }
+        async for b in trend
     ]
 
-    return JsonResponse({"trend": data})
\ No newline at end of file
+    return JsonResponse({"granularity": granularity, "trend": data})
+
+
+# =====================================================
+# 🤖 API: AI ROOM / SLOT RECOMMENDATIONS
+# =====================================================
+
+RECOMMENDATION_LIMIT = 10
+RECOMMENDATION_MAX_LIMIT = 50
+
+
+@query_budget(5)
+@staff_required
+@read_replica
+@versioned("attendance", "classes", extra=_next_status_change)
+def slot_recommendations(request):
+    subject = request.GET.get("subject", "").strip()
+    if not subject:
+        return JsonResponse({"message": "subject required"}, status=400)
+
+    try:
+        limit = int(request.GET.get("limit", RECOMMENDATION_LIMIT))
+    except ValueError:
+        return JsonResponse({"message": "limit must be an integer"}, status=400)
+    if not 1 <= limit <= RECOMMENDATION_MAX_LIMIT:
+        return JsonResponse(
+            {"message": f"limit must be 1 to {RECOMMENDATION_MAX_LIMIT}"}, status=400
+        )
+
+    # What produced this response's ETag also keys the model, so it is only
+    # rebuilt after attendance or classes change, or once a class starts.
+    model = recommendations.get_model((
+        request.counters["attendance"].version,
+        request.counters["classes"].version,
+        request.version_extra,
+    ))
+
+    return JsonResponse({
+        "subject": subject,
+        "recommendations": model.recommend(subject, limit),
+    })
+
+
+# =====================================================
+# 🤖 API: AI TURNOUT FORECAST
+# =====================================================
+
+FORECAST_DAYS = 14
+FORECAST_MAX_DAYS = 90
+FORECAST_MAX_CLASSES = 200
+
+
+def _forecast_window(request):
+    # Upcoming classes drop out as they start, and the window slides daily.
+    return f"{_next_status_change(request)}|{timezone.localdate()}"
+
+
+@query_budget(6)
+@staff_required
+@read_replica
+@versioned("attendance", "classes", extra=_forecast_window)
+def forecast_turnout(request):
+    try:
+        days = int(request.GET.get("days", FORECAST_DAYS))
+    except ValueError:
+        return JsonResponse({"message": "days must be an integer"}, status=400)
+    if not 1 <= days <= FORECAST_MAX_DAYS:
+        return JsonResponse({"message": f"days must be 1 to {FORECAST_MAX_DAYS}"}, status=400)
+
+    today = timezone.localdate()
+    upcoming = MakeUpClass.objects.active().filter(date__lt=today + timedelta(days=days))
+    if request.GET.get("subject"):
+        upcoming = upcoming.filter(subject=request.GET["subject"])
+
+    model = forecasting.get_model(
+        (request.counters["attendance"].version, request.counters["classes"].version)
+    )
+
+    data = []
+    for c in upcoming.order_by("starts_at", "id").values(
+        "id", "subject", "classroom", "date", "time"
+    )[:FORECAST_MAX_CLASSES]:
+        expected, based_on = model.predict(c["subject"], c["date"].isoweekday(), c["time"].hour)
+        data.append({
+            "id": c["id"],
+            "subject": c["subject"],
+            "classroom": c["classroom"],
+            "date": c["date"].strftime("%Y-%m-%d"),
+            "time": c["time"].strftime("%H:%M"),
+            "expected_attendance": round(expected, 1),
+            "based_on_classes": based_on,
+        })
+
+    return JsonResponse({"days": days, "classes": data})
+
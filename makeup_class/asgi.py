@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "makeup_class.settings")
 
+# Under ASGI, sync ORM work runs in per-request executor threads, so a
+# persistent connection is kept per thread rather than reused, and they pile
+# up. Open one per request unless DB_CONN_MAX_AGE says otherwise.
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
+
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "makeup_backend.instrumentation.QueryMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -56,13 +58,20 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # Compiled templates are kept per process; the dev server's
+            # autoreloader resets them when a template file changes.
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
         },
     },
 ]
@@ -73,17 +82,144 @@ WSGI_APPLICATION = "makeup_class.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connection settings come from the environment (defaults in brackets):
+#   DB_NAME [makeup_dbs], DB_USER [postgres], DB_PASSWORD, DB_HOST [localhost],
+#   DB_PORT [5432]
+#   DB_CONN_MAX_AGE [60]      seconds a connection is reused across requests
+#                             (0 = one per request, "none" = forever); the
+#                             default is 0 under ASGI (see asgi.py), where
+#                             persistent connections pile up per thread
+#   DB_CONN_HEALTH_CHECKS [1] ping a reused connection before each request
+#   DB_REPLICA_HOST           adds a "replica" alias (DB_REPLICA_NAME / _USER /
+#                             _PASSWORD / _PORT default to the primary's) that
+#                             the read-only analytics and history views read
+#                             from (makeup_backend/routers.py)
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(int(default))).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_max_age(name, default):
+    value = os.environ.get(name, str(default)).strip().lower()
+    return None if value == "none" else int(value)
+
+
+def _database(prefix, fallback=None):
+    fallback = fallback or {}
+
+    def env(key, default):
+        return os.environ.get(f"{prefix}_{key}", fallback.get(key, default))
+
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env("NAME", "makeup_dbs"),
+        "USER": env("USER", "postgres"),
+        "PASSWORD": env("PASSWORD", "123"),
+        "HOST": env("HOST", "localhost"),
+        "PORT": env("PORT", "5432"),
+        "CONN_MAX_AGE": _env_max_age("DB_CONN_MAX_AGE", 60),
+        "CONN_HEALTH_CHECKS": _env_flag("DB_CONN_HEALTH_CHECKS", True),
+    }
+    return database
+
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'makeup_dbs',
-        'USER': 'postgres',
-        'PASSWORD': '123',
-        'HOST': 'localhost',
-        'PORT': '5432',
+    "default": _database("DB"),
+}
+
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **_database("DB_REPLICA", fallback=DATABASES["default"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["makeup_backend.routers.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Point "default" at Redis or Memcached in production so every worker
+# shares the same entries.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
+# remedial_code -> class lookups (makeup_backend/codes.py). Timeouts are in
+# seconds; NEGATIVE_TIMEOUT applies to codes that matched no class.
+REMEDIAL_CODE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 60 * 60,
+    "NEGATIVE_TIMEOUT": 30,
+    "LOCAL_SIZE": 4096,
+    "LOCAL_TIMEOUT": 5 * 60,
+}
+
+# Request throttling (makeup_backend/throttling.py); rates are set per
+# endpoint in makeup_backend/urls.py. Buckets are kept in process, and also
+# in the CACHE_ALIAS cache when set (a shared Redis/Memcached "default"
+# makes the limits hold across workers). IP_HEADER names the META key
+# carrying the client address behind a proxy, e.g. "HTTP_X_FORWARDED_FOR".
+THROTTLE = {
+    "ENABLED": True,
+    "CACHE_ALIAS": None,
+    "IP_HEADER": None,
+    "LOCAL_SIZE": 10000,
+}
+
+# Remedial code pool (makeup_backend/code_pool.py). Codes are PREFIX +
+# LENGTH characters of ALPHABET + a check character. `manage.py
+# refill_code_pool` keeps POOL_SIZE free codes; an empty pool is refilled
+# inline REFILL_BATCH codes at a time. LEGACY_PATTERN (or None) matches codes
+# issued before the pool and still accepted.
+REMEDIAL_CODE_POOL = {
+    "PREFIX": "RC-",
+    "ALPHABET": "23456789ABCDEFGHJKLMNPQRSTUVWXYZ",
+    "LENGTH": 7,
+    "POOL_SIZE": 5000,
+    "REFILL_BATCH": 500,
+    "LEGACY_PATTERN": r"RC-[0-9A-F]{6}",
+}
+
+# Live events pushed to /api/events/ (makeup_backend/events.py). BACKEND is
+# "auto" (LISTEN/NOTIFY on PostgreSQL, in-process otherwise), "postgres" or
+# "local". KEEPALIVE is in seconds; QUEUE_SIZE bounds each stream's backlog.
+LIVE_EVENTS = {
+    "BACKEND": "auto",
+    "CHANNEL": "makeup_events",
+    "KEEPALIVE": 15,
+    "QUEUE_SIZE": 100,
+}
+
+# Write-behind attendance marking (makeup_backend/attendance_buffer.py).
+# With ENABLED, mark_attendance appends to the SQLite file at PATH and
+# answers 202; a flusher thread moves up to BATCH_SIZE marks into the
+# database every FLUSH_INTERVAL seconds. CLAIM_TIMEOUT (seconds) is how long
+# a batch claimed by a crashed process waits before it is flushed again;
+# flushed marks are kept RETENTION seconds to answer re-submits.
+ATTENDANCE_BUFFER = {
+    "ENABLED": False,
+    "PATH": BASE_DIR / "var" / "attendance-buffer.sqlite3",
+    "FLUSH_INTERVAL": 0.5,
+    "BATCH_SIZE": 1000,
+    "CLAIM_TIMEOUT": 60,
+    "RETENTION": 24 * 60 * 60,
+    "SYNCHRONOUS": "FULL",
+}
+
+
+# Request instrumentation (makeup_backend/instrumentation.py)
+# QUERY_BUDGET_STRICT turns a view going over its @query_budget into an
+# exception instead of a log warning; the test suite enables it.
+# METRICS_TOKEN, if set, lets a scraper read /metrics/ with
+# "Authorization: Bearer <token>" instead of a staff session.
+
+QUERY_BUDGET_STRICT = False
+METRICS_TOKEN = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -121,3 +257,24 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# collectstatic writes content-hashed copies (faculty.3f2a9c.js) and a
+# manifest that {% static %} resolves through, so the web server can serve
+# STATIC_ROOT with "Cache-Control: public, max-age=31536000, immutable".
+# Run `manage.py collectstatic` on every deploy when DEBUG is off.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage",
+    },
+}
+
+# Rendered page shells (makeup_backend/pages.py). The dashboard, faculty,
+# student and AI pages are rendered once per role and process; browsers
+# may reuse one for MAX_AGE seconds and revalidate it with its ETag.
+PAGE_SHELLS = {
+    "ENABLED": True,
+    "MAX_AGE": 60 * 60,
+}